@@ -0,0 +1,337 @@
+import os
+import re
+import sys
+import json
+import glob
+import time
+import calendar
+import argparse
+import threading
+from array import array
+from collections import Counter
+
+ACCESS_LOG = "/var/log/icecast2/access.log"
+ACCESS_LOG_CACHE = "access_log.cache"
+CHUNK_SIZE = 4 * 1024 * 1024
+CURVE_RESOLUTION = 300
+
+# Icecast writes one combined-format line per finished connection, stamped
+# at disconnect time and followed by the seconds the client stayed:
+# 1.2.3.4 - - [18/Oct/2026:10:00:00 +0000] "GET /live HTTP/1.1" 200 4711 "ref" "agent" 3600
+LINE = re.compile(
+    rb'^\S+ \S+ \S+ \[(?P<date>[^:\]]+):(?P<time>\d\d:\d\d:\d\d) (?P<tz>[+-]\d{4})\] '
+    rb'"(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" (?P<status>\d{3}) (?P<bytes>\d+|-) '
+    rb'"(?P<referrer>[^"]*)" "(?P<agent>[^"]*)" (?P<duration>\d+)'
+)
+MONTHS = {m.encode(): i for i, m in enumerate(
+    ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), 1)}
+NOT_LISTENERS = (b"/admin", b"/status", b"/favicon.ico", b"/server_version")
+STATIC_SUFFIXES = (b".xsl", b".css", b".html", b".png", b".jpg", b".ico", b".js")
+
+
+class StringTable:
+    # Interns repeated strings (mounts, agents, referrers) to small ints so
+    # each session row is a handful of numbers in flat arrays
+    def __init__(self, values=()):
+        self.values = list(values)
+        self._ids = {v: i for i, v in enumerate(self.values)}
+
+    def find(self, value):
+        return self._ids.get(value)
+
+    def id(self, value):
+        i = self._ids.get(value)
+        if i is None:
+            i = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+
+class SessionColumns:
+    COLUMNS = (("end", "d"), ("duration", "l"), ("bytes", "q"), ("mount", "l"), ("agent", "l"), ("referrer", "l"))
+
+    def __init__(self):
+        for name, code in self.COLUMNS:
+            setattr(self, name, array(code))
+        self.mounts = StringTable()
+        self.agents = StringTable()
+        self.referrers = StringTable(["-"])
+
+    def __len__(self):
+        return len(self.end)
+
+    def append(self, end, duration, nbytes, mount, agent, referrer):
+        self.end.append(end)
+        self.duration.append(duration)
+        self.bytes.append(nbytes)
+        self.mount.append(self.mounts.id(mount))
+        self.agent.append(self.agents.id(agent))
+        self.referrer.append(self.referrers.id(referrer))
+
+    def save(self, path, files):
+        header = {
+            "version": 1,
+            "rows": len(self),
+            "files": files,
+            "mounts": self.mounts.values,
+            "agents": self.agents.values,
+            "referrers": self.referrers.values,
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            data = json.dumps(header).encode()
+            f.write(len(data).to_bytes(8, "little"))
+            f.write(data)
+            for name, _ in self.COLUMNS:
+                getattr(self, name).tofile(f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        columns = cls()
+        with open(path, "rb") as f:
+            size = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(size))
+            if header.get("version") != 1:
+                raise ValueError("unknown cache version")
+            for name, _ in cls.COLUMNS:
+                getattr(columns, name).fromfile(f, header["rows"])
+        columns.mounts = StringTable(header["mounts"])
+        columns.agents = StringTable(header["agents"])
+        columns.referrers = StringTable(header["referrers"])
+        return columns, header["files"]
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+class AccessLogAnalyzer:
+    # Reads access.log and its rotated siblings (access.log.old,
+    # access.log.<date>) once: per-file progress is kept by inode and byte
+    # offset, so later updates only parse what was appended. Sessions live
+    # in columnar arrays that are saved to a cache file between runs.
+    def __init__(self, path=ACCESS_LOG, cache_file=ACCESS_LOG_CACHE):
+        self.path = path
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        self._columns = None
+        self._files = {}
+        self._day_cache = {}
+        self.last_update = None
+
+    def configure(self, path, cache_file):
+        with self._lock:
+            if (path, cache_file) != (self.path, self.cache_file):
+                self.path = path
+                self.cache_file = cache_file
+                self._columns = None
+                self._files = {}
+
+    def _ensure_loaded(self):
+        if self._columns is not None:
+            return
+        self._columns = SessionColumns()
+        self._files = {}
+        if self.cache_file and os.path.exists(self.cache_file):
+            try:
+                self._columns, self._files = SessionColumns.load(self.cache_file)
+            except (OSError, ValueError, EOFError) as e:
+                print(f"Ignoring access log cache {self.cache_file}: {e}")
+                self._columns, self._files = SessionColumns(), {}
+
+    def _log_files(self):
+        candidates = [self.path] + glob.glob(glob.escape(self.path) + ".*")
+        files = []
+        for name in candidates:
+            if name.endswith((".gz", ".bz2", ".xz", ".zst", ".tmp")):
+                continue
+            try:
+                st = os.stat(name)
+            except OSError:
+                continue
+            files.append((st.st_mtime, name, st))
+        # Oldest first so sessions are appended roughly in time order
+        return [(name, st) for _, name, st in sorted(files)]
+
+    def update(self):
+        # Parses whatever is new; returns the number of sessions added
+        with self._lock:
+            self._ensure_loaded()
+            added = 0
+            seen = {}
+            for name, st in self._log_files():
+                key = str(st.st_ino)
+                offset = self._files.get(key, 0)
+                if st.st_size < offset:
+                    # Truncated in place: start over on this file
+                    offset = 0
+                if st.st_size > offset:
+                    n, offset = self._parse(name, offset)
+                    added += n
+                seen[key] = offset
+            self._files = seen
+            if added and self.cache_file:
+                try:
+                    self._columns.save(self.cache_file, self._files)
+                except OSError as e:
+                    print(f"Access log cache write error: {e}")
+            self.last_update = time.time()
+            return added
+
+    def _timestamp(self, date, clock, tz):
+        day = self._day_cache.get(date)
+        if day is None:
+            d, m, y = date.split(b"/")
+            day = self._day_cache[date] = calendar.timegm((int(y), MONTHS[m], int(d), 0, 0, 0))
+        seconds = int(clock[0:2]) * 3600 + int(clock[3:5]) * 60 + int(clock[6:8])
+        offset = (int(tz[1:3]) * 3600 + int(tz[3:5]) * 60) * (1 if tz[:1] == b"+" else -1)
+        return day + seconds - offset
+
+    def _parse(self, name, offset):
+        columns = self._columns
+        match = LINE.match
+        added = 0
+        with open(name, "rb") as f:
+            f.seek(offset)
+            tail = b""
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                data = tail + chunk
+                end = data.rfind(b"\n")
+                if end < 0:
+                    tail = data
+                    continue
+                tail = data[end + 1:]
+                # Only complete lines count as consumed
+                offset = f.tell() - len(tail)
+                for line in data[:end].split(b"\n"):
+                    m = match(line)
+                    if m is None or m.group("status") != b"200" or m.group("method") != b"GET":
+                        continue
+                    path = m.group("path").split(b"?", 1)[0]
+                    if path == b"/" or path.startswith(NOT_LISTENERS) or path.endswith(STATIC_SUFFIXES):
+                        continue
+                    nbytes = m.group("bytes")
+                    columns.append(
+                        self._timestamp(m.group("date"), m.group("time"), m.group("tz")),
+                        int(m.group("duration")),
+                        int(nbytes) if nbytes != b"-" else 0,
+                        path.decode("utf-8", "replace"),
+                        m.group("agent").decode("utf-8", "replace"),
+                        m.group("referrer").decode("utf-8", "replace") or "-",
+                    )
+                    added += 1
+        return added, offset
+
+    def report(self, since=None, until=None, mount=None, top=10, resolution=CURVE_RESOLUTION):
+        with self._lock:
+            self._ensure_loaded()
+            c = self._columns
+            mount_id = c.mounts.find(mount) if mount else None
+            if mount and mount_id is None:
+                rows = []
+            elif mount_id is None and since is None and until is None:
+                rows = range(len(c))
+            else:
+                rows = [
+                    i for i in range(len(c))
+                    if (mount_id is None or c.mount[i] == mount_id)
+                    and (since is None or c.end[i] >= since)
+                    and (until is None or c.end[i] - c.duration[i] <= until)
+                ]
+            if isinstance(rows, range):
+                # Whole columns: let the C implementations do the work
+                durations, sizes = sorted(c.duration), sorted(c.bytes)
+                agents, referrers, mounts = Counter(c.agent), Counter(c.referrer), Counter(c.mount)
+            else:
+                durations = sorted(c.duration[i] for i in rows)
+                sizes = sorted(c.bytes[i] for i in rows)
+                agents = Counter(c.agent[i] for i in rows)
+                referrers = Counter(c.referrer[i] for i in rows)
+                mounts = Counter(c.mount[i] for i in rows)
+            referrers.pop(0, None)
+            curve = self._concurrency(rows, since, until, resolution)
+            return {
+                "sessions": len(rows),
+                "listener_hours": round(sum(durations) / 3600, 1),
+                "duration_avg": round(sum(durations) / len(durations), 1) if durations else None,
+                "duration_p50": _percentile(durations, 0.5),
+                "duration_p90": _percentile(durations, 0.9),
+                "bytes_total": sum(sizes),
+                "bytes_per_session_avg": round(sum(sizes) / len(sizes)) if sizes else None,
+                "bytes_per_session_p50": _percentile(sizes, 0.5),
+                "peak_concurrent": max((n for _, n in curve), default=0),
+                "concurrency": curve,
+                "mounts": {c.mounts.values[k]: n for k, n in mounts.most_common()},
+                "top_agents": [[c.agents.values[k], n] for k, n in agents.most_common(top)],
+                "top_referrers": [[c.referrers.values[k], n] for k, n in referrers.most_common(top)],
+                "files": len(self._files),
+                "rows_total": len(c),
+                "updated_at": self.last_update,
+            }
+
+    def _concurrency(self, rows, since, until, resolution):
+        # Listeners connected at each resolution boundary, from a difference
+        # array over sessions: O(sessions + buckets), no sort
+        c = self._columns
+        if not rows:
+            return []
+        if isinstance(rows, range):
+            ends, durations = c.end, c.duration
+        else:
+            ends = [c.end[i] for i in rows]
+            durations = [c.duration[i] for i in rows]
+        first = since if since is not None else min(e - d for e, d in zip(ends, durations))
+        last = until if until is not None else max(ends)
+        t0 = first - first % resolution
+        buckets = int((last - t0) // resolution) + 2
+        diff = [0] * (buckets + 1)
+        for end, duration in zip(ends, durations):
+            # First and last boundary strictly inside [start, end)
+            a = max(int(-((t0 - end + duration) // resolution)), 0)
+            b = min(int(-((t0 - end) // resolution)), buckets)
+            if a < b:
+                diff[a] += 1
+                diff[b] -= 1
+        curve = []
+        active = 0
+        for k in range(buckets):
+            active += diff[k]
+            curve.append((t0 + k * resolution, active))
+        return curve
+
+
+access_log = AccessLogAnalyzer()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize an Icecast access.log")
+    parser.add_argument("path", nargs="?", default=ACCESS_LOG)
+    parser.add_argument("--cache", default=ACCESS_LOG_CACHE)
+    parser.add_argument("--mount")
+    parser.add_argument("--hours", type=float, help="only sessions from the last N hours")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    analyzer = AccessLogAnalyzer(args.path, args.cache)
+    started = time.perf_counter()
+    added = analyzer.update()
+    parsed = time.perf_counter() - started
+    since = time.time() - args.hours * 3600 if args.hours else None
+    report = analyzer.report(since=since, mount=args.mount)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"parsed {added} new sessions in {parsed:.2f} s, queried in {time.perf_counter() - started - parsed:.2f} s")
+    for key, value in report.items():
+        if key != "concurrency":
+            print(f"{key:>22}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
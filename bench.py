@@ -0,0 +1,320 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import icecast_net
+import icecast_status
+from butt_process import ButtSupervisor
+from fake_icecast import FakeIcecast
+from icecast_status import StatusCache, StatusSnapshot, extract_bytes, mount_stats, source_list
+
+# Benchmarks of the controller's hot paths against the local fake Icecast:
+#   python bench.py                  # run everything, append to bench_results.jsonl
+#   python bench.py --only stats --quick --no-save
+# Each run is compared with the previous one in the results file (or
+# --baseline) and metrics that got worse by more than --threshold are
+# reported; --fail-on-regression turns that into exit status 1.
+
+BENCH_RESULTS = "bench_results.jsonl"
+REGRESSION_THRESHOLD = 0.25
+SOURCE_COUNTS = (1, 10, 100, 1000)
+LOG_SCAN = 20
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def summarize(samples):
+    return {
+        "p50_ms": round(percentile(samples, 0.5) * 1000, 3),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 3),
+    }
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_stats(quick=False):
+    # The update_live_stats path: parse a status document into a snapshot,
+    # then look one mount up; plus the same fetch end to end over HTTP
+    results = {}
+    fake = FakeIcecast()
+    port = fake.start()
+    try:
+        for count in SOURCE_COUNTS:
+            fake.set_sources(count)
+            document = fake.icestats("127.0.0.1", port)
+            icestats = document["icestats"]
+            mount = f"/stream{count - 1}" if count > 1 else "/live"
+            repeat = max(20, 2000 // count) // (4 if quick else 1)
+
+            def parse():
+                snapshot = StatusSnapshot("127.0.0.1", port, 200, icestats, time.monotonic())
+                mount_stats(snapshot, mount)
+
+            results[f"stats_parse[{count}]"] = summarize(timed(parse, repeat))
+            results[f"extract_bytes[{count}]"] = summarize(
+                timed(lambda: [extract_bytes(s) for s in source_list(icestats)], repeat))
+            cache = StatusCache(ttl=0)
+            results[f"stats_fetch[{count}]"] = summarize(
+                timed(lambda: icecast_status.mount_stats(cache.get("127.0.0.1", port), mount), max(repeat // 4, 10)))
+    finally:
+        fake.stop()
+    return results
+
+
+def bench_metadata(quick=False):
+    # One push is updinfo and updmeta in parallel; "fallback" makes the admin
+    # credentials fail first so the source-password retry is included
+    results = {}
+    repeat = 25 if quick else 100
+    for label, latency in (("metadata_push", 0.0), ("metadata_push_20ms", 0.02)):
+        fake = FakeIcecast(latency=latency)
+        port = fake.start()
+        try:
+            samples = timed(lambda: icecast_net.push_metadata(
+                "127.0.0.1", port, "/live", "Title", "Description", "Genre", ("admin", "hackme"), "hackme"), repeat)
+            results[label] = summarize(samples)
+        finally:
+            fake.stop()
+    fake = FakeIcecast(admin=("admin", "other"))
+    port = fake.start()
+    try:
+        def push_with_fallback():
+            # Forget the remembered credential so every push starts with admin
+            with icecast_net._metadata_lock:
+                icecast_net._metadata_auth.clear()
+            icecast_net.push_metadata("127.0.0.1", port, "/live", "Title", "", "", ("admin", "wrong"), "hackme")
+
+        results["metadata_push_fallback"] = summarize(timed(push_with_fallback, repeat))
+    finally:
+        fake.stop()
+    return results
+
+
+def bench_api(quick=False, concurrency=(1, 16)):
+    # The settings API in its own server thread, hammered by each number of
+    # clients in turn with a 9:1 mix of GET and POST /settings; every client
+    # keeps its own keep-alive connection
+    import requests
+    from icecast_api import api_server
+    from config_store import config_store
+    directory = tempfile.mkdtemp(prefix="bench-api-")
+    config_store.set_path(os.path.join(directory, "config.json"))
+    config_store.save({"host": "127.0.0.1", "port": "8000", "mountpoint": "/live"})
+    api_server.port = 0
+    api_server.start({"api_access_log": False})
+    results = {}
+    local = threading.local()
+
+    def call(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            if i % 10:
+                ok = session.get(api_server.url("/settings"), timeout=10).ok
+            else:
+                ok = session.post(api_server.url("/settings"), json={"stream_title": f"Title {i}"}, timeout=10).ok
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    try:
+        for clients in concurrency:
+            total = (200 if quick else 1000) * (1 if clients == 1 else 2)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(clients) as pool:
+                outcomes = list(pool.map(call, range(total)))
+            elapsed = time.perf_counter() - started
+            result = summarize([t for t, _ in outcomes])
+            result["rps"] = round(total / elapsed, 1)
+            result["errors"] = sum(1 for _, ok in outcomes if not ok)
+            results[f"settings_api[{clients}]"] = result
+    finally:
+        api_server.stop()
+        config_store.stop()
+    return results
+
+
+def bench_butt(quick=False, command=None):
+    # Launch to first output line and stop() to exit. Without --butt-command
+    # a Python stand-in is used: it measures the supervisor, not BUTT itself.
+    command = command or [sys.executable, "-c", "import sys, time; print('ready', flush=True); time.sleep(600)"]
+    supervisor = ButtSupervisor()
+    start_samples, ready_samples, stop_samples = [], [], []
+    for _ in range(3 if quick else 10):
+        supervisor.log.clear()
+        started = time.perf_counter()
+        supervisor.start(command, auto_restart=False)
+        start_samples.append(time.perf_counter() - started)
+        # Ready is the child's first own line; the supervisor logs its
+        # "started pid" line before the child has run at all
+        deadline = time.monotonic() + 10
+        while not any(" [supervisor] " not in line for line in supervisor.log_tail(LOG_SCAN)) \
+                and time.monotonic() < deadline:
+            time.sleep(0.001)
+        ready_samples.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        supervisor.stop()
+        stop_samples.append(time.perf_counter() - started)
+    return {"butt_start": summarize(start_samples), "butt_ready": summarize(ready_samples),
+            "butt_stop": summarize(stop_samples)}
+
+
+def bench_startup(quick=False):
+    # Fresh interpreters: importing the controller module, and the window
+    # launched offscreen until the startup report (time to "window shown"
+    # and to everything having started, background work included)
+    here = os.path.dirname(os.path.abspath(__file__))
+    script = os.path.join(here, "icecast_butt_controller.py")
+    directory = tempfile.mkdtemp(prefix="bench-startup-")
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen", ICECAST_API_PORT="0")
+    import_samples, shown_samples, ready_samples = [], [], []
+    for _ in range(3 if quick else 10):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import icecast_butt_controller"], cwd=here, check=True)
+        import_samples.append(time.perf_counter() - started)
+        try:
+            out = subprocess.run([sys.executable, script, "--exit-after-startup"], cwd=directory, env=env,
+                                 capture_output=True, text=True, timeout=60).stdout
+        except subprocess.TimeoutExpired:
+            continue
+        for line in out.splitlines():
+            if line.startswith("window shown"):
+                shown_samples.append(float(line.split()[2]) / 1000)
+            elif line.startswith("total"):
+                ready_samples.append(float(line.split()[1]) / 1000)
+    results = {"startup_import": summarize(import_samples)}
+    if shown_samples:
+        results["startup_window_shown"] = summarize(shown_samples)
+        results["startup_ready"] = summarize(ready_samples)
+    return results
+
+
+BENCHMARKS = {
+    "stats": bench_stats,
+    "metadata": bench_metadata,
+    "api": bench_api,
+    "butt": bench_butt,
+    "startup": bench_startup,
+}
+
+
+def flatten(results):
+    flat = {}
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            flat[f"{name}.{metric}"] = value
+    return flat
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    # Times and error counts should go down, requests per second up
+    rows = []
+    old = flatten(baseline)
+    for key, value in flatten(current).items():
+        before = old.get(key)
+        if before is None:
+            rows.append((key, None, value, None, False))
+            continue
+        if key.endswith(".rps"):
+            change = (before - value) / before if before else 0.0
+        elif key.endswith(".errors"):
+            change = 1.0 if value > before else 0.0
+        else:
+            # Sub-0.05 ms differences are timer noise
+            change = (value - before) / before if before and abs(value - before) > 0.05 else 0.0
+        rows.append((key, before, value, change, change > threshold))
+    return rows
+
+
+def revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def load_baseline(path):
+    # Last run recorded in a results file
+    last = None
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        last = json.loads(line)
+                    except ValueError:
+                        continue
+    except FileNotFoundError:
+        return None
+    return last
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the controller's hot paths against a fake Icecast")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="run just these (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations")
+    parser.add_argument("--output", default=BENCH_RESULTS, help="results file; one JSON line per run is appended")
+    parser.add_argument("--baseline", help="compare with the last run in this file instead of --output")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--butt-command", nargs=argparse.REMAINDER, help="real encoder command line for the butt benchmark")
+    args = parser.parse_args(argv)
+    results = {}
+    for name in args.only or BENCHMARKS:
+        print(f"Running {name}...", file=sys.stderr)
+        if name == "butt":
+            results.update(bench_butt(args.quick, args.butt_command))
+        else:
+            results.update(BENCHMARKS[name](args.quick))
+    record = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": revision(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} {os.cpu_count()} cpus",
+        "quick": args.quick,
+        "results": results,
+    }
+    baseline = load_baseline(args.baseline or args.output)
+    regressions = 0
+    rows = compare(results, baseline["results"], args.threshold) if baseline else [
+        (key, None, value, None, False) for key, value in flatten(results).items()]
+    if baseline:
+        print(f"Compared with {baseline.get('revision') or 'unknown'} from {baseline.get('time')}")
+    for key, before, value, change, regressed in rows:
+        delta = "" if change is None else f"{change * 100:+.0f}%"
+        print(f"{key:<40} {'' if before is None else before:>12} {value:>12} {delta:>7}{'  REGRESSION' if regressed else ''}")
+        regressions += regressed
+    if not args.no_save:
+        with open(args.output, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"Saved to {args.output}")
+    if regressions:
+        print(f"{regressions} metrics regressed by more than {args.threshold * 100:.0f}%")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+
+from icecast_metrics import latency
+
+LOG_LINES = 500
+
+
+def detect_butt_path():
+    # Check PATH
+    path = shutil.which("butt")
+    if path:
+        return path
+
+    # Check common locations
+    common_paths = [
+        r"C:\Program Files (x86)\butt\butt.exe",
+        r"C:\Program Files\butt\butt.exe",
+        os.path.expanduser(r"~\AppData\Local\butt\butt.exe")
+    ]
+    for p in common_paths:
+        if os.path.exists(p):
+            return p
+
+    return "butt" # Default fallback
+
+
+def build_butt_command(settings):
+    host = (settings.get("host") or "localhost").strip()
+    try:
+        port = int(str(settings.get("port") or "8000").strip())
+    except ValueError:
+        port = 8000
+    mount = (settings.get("mountpoint") or "/live").strip()
+    if not mount.startswith("/"):
+        mount = "/" + mount
+
+    # Assuming 'butt' is in the system's PATH unless a full path is configured
+    butt_exe = (settings.get("butt_path") or "").strip() or detect_butt_path()
+    return [
+        butt_exe,
+        "-s", settings.get("source_password", ""),
+        "-h", host,
+        "-p", str(port),
+        "-m", mount,
+        "-t", settings.get("stream_title", ""),
+        "-d", settings.get("stream_description", ""),
+        "-g", settings.get("stream_genre", ""),
+        "-b", str(settings.get("bitrate", "128")),
+        "-c", str(settings.get("channels", "2")),
+        "-r", str(settings.get("samplerate", "44100")),
+        "-D" # Run in daemon mode (non-interactive)
+    ]
+
+
+class ButtSupervisor:
+    # Owns the BUTT process. Its output is drained continuously into a
+    # bounded buffer (an unread PIPE fills up and stalls the encoder), a
+    # monitor thread blocks in wait() so an exit is seen immediately, and an
+    # unexpected exit is restarted with exponential backoff.
+    def __init__(self, log_lines=LOG_LINES, min_backoff=2.0, max_backoff=60.0, stable_after=60.0):
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.log = deque(maxlen=log_lines)
+        self.process = None
+        self.command = None
+        self.started_at = None
+        self.restarts = 0
+        self.last_exit_code = None
+        self.auto_restart = True
+        self._backoff = min_backoff
+        self._lock = threading.Lock()
+        # Serializes spawns; start() bumps the generation so a restart still
+        # waiting out its backoff knows it was overtaken and stands down
+        self._spawn_lock = threading.Lock()
+        self._generation = 0
+        self._stopping = threading.Event()
+        self._listeners = []
+
+    def subscribe(self, callback):
+        # callback(event, info) from supervisor threads; event is one of
+        # started, exited, restarting, failed, stopped
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _emit(self, event, info=None):
+        for callback in list(self._listeners):
+            try:
+                callback(event, info)
+            except Exception as e:
+                print(f"BUTT supervisor listener error: {e}")
+
+    def running(self):
+        process = self.process
+        return process is not None and process.poll() is None
+
+    def status(self):
+        running = self.running()
+        return {
+            "running": running,
+            "pid": self.process.pid if running else None,
+            "uptime": time.time() - self.started_at if running and self.started_at else 0.0,
+            "restarts": self.restarts,
+            "last_exit_code": self.last_exit_code,
+        }
+
+    def log_tail(self, n=100):
+        with self._lock:
+            return list(self.log)[-n:]
+
+    def start(self, command, auto_restart=True):
+        # Raises FileNotFoundError / OSError when BUTT cannot be launched
+        with self._spawn_lock:
+            if self.running():
+                raise RuntimeError("BUTT is already running")
+            self._generation += 1
+            self.command = list(command)
+            self.auto_restart = auto_restart
+            self._backoff = self.min_backoff
+            self._stopping.clear()
+            with latency.timer("butt_start"):
+                self._spawn()
+
+    def restart(self, command, timeout=10.0):
+        # Replaces the running BUTT with one started from a new command line
+        # (e.g. another server during failover); keeps the auto-restart mode
+        self.stop(timeout)
+        self.start(command, self.auto_restart)
+
+    def _spawn(self):
+        process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+        )
+        self.process = process
+        self.started_at = time.time()
+        self._append_log(f"[supervisor] started pid {process.pid}")
+        self._emit("started", {"pid": process.pid})
+        threading.Thread(target=self._drain, args=(process,), name="butt-output", daemon=True).start()
+        threading.Thread(target=self._monitor, args=(process,), name="butt-monitor", daemon=True).start()
+
+    def _append_log(self, line):
+        with self._lock:
+            self.log.append(f"{time.strftime('%H:%M:%S')} {line}")
+
+    def _drain(self, process):
+        try:
+            for line in process.stdout:
+                self._append_log(line.rstrip("\n"))
+        except (OSError, ValueError):
+            pass
+
+    def _monitor(self, process):
+        generation = self._generation
+        code = process.wait()
+        if process is not self.process:
+            return
+        self.last_exit_code = code
+        ran_for = time.time() - (self.started_at or time.time())
+        self._append_log(f"[supervisor] exited with code {code} after {ran_for:.0f} s")
+        if self._stopping.is_set():
+            self._emit("stopped", {"code": code})
+            return
+        self._emit("exited", {"code": code, "ran_for": ran_for})
+        if not self.auto_restart:
+            return
+        if ran_for >= self.stable_after:
+            self._backoff = self.min_backoff
+        delay = self._backoff
+        self._backoff = min(self._backoff * 2, self.max_backoff)
+        self._emit("restarting", {"delay": delay})
+        # A stop() during the backoff cancels the restart
+        if self._stopping.wait(delay):
+            return
+        with self._spawn_lock:
+            # start() ran during the backoff: its process is the one to keep
+            if generation != self._generation or process is not self.process:
+                return
+            try:
+                self.restarts += 1
+                self._spawn()
+            except (OSError, ValueError) as e:
+                self._append_log(f"[supervisor] restart failed: {e}")
+                self._emit("failed", {"error": str(e)})
+
+    def stop(self, timeout=10.0):
+        # Terminate, give BUTT timeout seconds to exit, then kill it
+        self._stopping.set()
+        process = self.process
+        if process is None or process.poll() is not None:
+            return False
+        with latency.timer("butt_stop") as t:
+            process.terminate()
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self._append_log("[supervisor] did not exit in time, killing")
+                t.outcome, t.error = "killed", "TimeoutExpired"
+                process.kill()
+                process.wait()
+        return True
+
+
+butt_supervisor = ButtSupervisor()
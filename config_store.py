@@ -0,0 +1,217 @@
+import json
+import os
+import tempfile
+import threading
+
+from icecast_metrics import latency
+
+CONFIG_FILE = "config.json"
+CONFIG_WATCH_INTERVAL = 1.0
+
+# Known settings: key -> (accepted types, check or None). Unknown keys are
+# kept as they are so newer configs survive a round-trip through older code.
+_STRING = (str,)
+_NUMBER_OR_STRING = (int, float, str)
+
+
+def _port(value):
+    return str(value).strip().isdigit() and 0 < int(str(value).strip()) < 65536
+
+
+def _number(value):
+    try:
+        return float(value) >= 0
+    except (TypeError, ValueError):
+        return False
+
+
+def _positive_int(value):
+    return str(value).strip().isdigit() and int(str(value).strip()) > 0
+
+
+def _servers(value):
+    return all(isinstance(s, dict) and s.get("host") and _port(s.get("port", "")) for s in value)
+
+
+SCHEMA = {
+    "admin_user": (_STRING, None),
+    "admin_password": (_STRING, None),
+    "source_password": (_STRING, None),
+    "relay_password": (_STRING, None),
+    "host": (_STRING, lambda v: bool(v.strip())),
+    "port": ((int, str), _port),
+    "butt_path": (_STRING, None),
+    "stream_title": (_STRING, None),
+    "stream_description": (_STRING, None),
+    "stream_genre": (_STRING, None),
+    "bitrate": ((int, str), _positive_int),
+    "channels": ((int, str), lambda v: str(v).strip() in ("1", "2")),
+    "samplerate": ((int, str), _positive_int),
+    "mountpoint": (_STRING, lambda v: bool(v.strip().strip("/"))),
+    "status_ttl": (_NUMBER_OR_STRING, _number),
+    "servers": ((list,), _servers),
+    "history_file": (_STRING, None),
+    "now_playing_file": (_STRING, None),
+    "now_playing_state": (_STRING, None),
+    "api_host": (_STRING, None),
+    "api_port": ((int, str), _port),
+    "api_access_log": ((bool,), None),
+    "access_log": (_STRING, None),
+    "access_log_cache": (_STRING, None),
+    "failover_enabled": ((bool,), None),
+    "backup_host": (_STRING, None),
+    "backup_port": ((int, str), lambda v: str(v).strip() == "" or _port(v)),
+    "backup_mountpoint": (_STRING, None),
+    "failover_timeout": (_NUMBER_OR_STRING, _number),
+    "icecast_config": (_STRING, None),
+    "relays": ((list,), _servers),
+}
+
+# The GUI keeps these as text; numbers posted to /settings are stored the same way
+_AS_TEXT = ("port", "bitrate", "channels", "samplerate", "api_port", "backup_port")
+
+
+class ConfigError(ValueError):
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def validate(settings):
+    # Returns a normalized copy; raises ConfigError listing every problem
+    if not isinstance(settings, dict):
+        raise ConfigError(["settings must be a JSON object"])
+    errors = []
+    clean = dict(settings)
+    for key, value in settings.items():
+        spec = SCHEMA.get(key)
+        if spec is None:
+            continue
+        types, check = spec
+        if (isinstance(value, bool) and bool not in types) or not isinstance(value, types):
+            errors.append(f"{key}: expected {' or '.join(t.__name__ for t in types)}")
+        elif check is not None and not check(value):
+            errors.append(f"{key}: invalid value {value!r}")
+        elif key in _AS_TEXT:
+            clean[key] = str(value).strip()
+    if errors:
+        raise ConfigError(errors)
+    return clean
+
+
+class ConfigStore:
+    # The one place config.json is read and written. Reads come from memory
+    # and cost a stat() to notice edits made outside this process; writes are
+    # validated, serialized, and land via a temp file + rename so readers
+    # never see a half-written file.
+    def __init__(self, path=CONFIG_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._cache = None
+        self._stamp = None
+        # Stamp of a broken file the watcher already complained about; kept
+        # apart from _stamp so load() still raises for it
+        self._reported = None
+        self._listeners = []
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def set_path(self, path):
+        with self._lock:
+            if path != self.path:
+                self.path = path
+                self._cache = None
+                self._stamp = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def load(self):
+        # A copy of the current settings; FileNotFoundError when there is no
+        # config yet, ValueError when the file on disk is not valid.
+        with self._lock:
+            stamp = self._stat()
+            if stamp is None:
+                self._cache = None
+                self._stamp = None
+                raise FileNotFoundError(self.path)
+            if stamp != self._stamp or self._cache is None:
+                with open(self.path, "r") as f:
+                    self._cache = validate(json.load(f))
+                self._stamp = stamp
+            return json.loads(json.dumps(self._cache))
+
+    def save(self, settings, source=None):
+        clean = validate(settings)
+        with self._lock, latency.timer("config_save"):
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(clean, f, indent=4)
+                    f.flush()
+                    os.fsync(f.fileno())
+                if os.path.exists(self.path):
+                    os.chmod(tmp, os.stat(self.path).st_mode & 0o777)
+                os.replace(tmp, self.path)
+            except BaseException:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                raise
+            self._cache = clean
+            self._stamp = self._stat()
+        self._notify(clean, source)
+        return clean
+
+    def subscribe(self, fn):
+        # fn(settings, source) after every change: source is what the saver
+        # passed to save(), or "file" for an edit made outside this process.
+        self._listeners.append(fn)
+        self._ensure_watcher()
+
+    def unsubscribe(self, fn):
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def _notify(self, settings, source):
+        for fn in list(self._listeners):
+            try:
+                fn(json.loads(json.dumps(settings)), source)
+            except Exception as e:
+                print(f"Config listener error: {e}")
+
+    def _ensure_watcher(self):
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="config-watch", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(CONFIG_WATCH_INTERVAL):
+            with self._lock:
+                stamp = self._stat()
+                if stamp == self._stamp or stamp == self._reported:
+                    continue
+                try:
+                    settings = self.load()
+                except FileNotFoundError:
+                    continue
+                except (OSError, ValueError) as e:
+                    print(f"Ignoring invalid {self.path}: {e}")
+                    # Don't report the same broken file every second
+                    self._reported = stamp
+                    continue
+            self._notify(settings, "file")
+
+
+config_store = ConfigStore()
@@ -0,0 +1,238 @@
+import threading
+import time
+
+import icecast_config
+from butt_process import build_butt_command, butt_supervisor
+from icecast_metrics import latency
+from icecast_status import normalize_mount, source_bytes, status_cache
+
+FAILOVER_TIMEOUT = 10.0
+# Checks run at this interval or the status cache TTL, whichever is longer;
+# health comes from the shared cache, so this never adds upstream fetches
+FAILOVER_CHECK = 1.0
+# Icecast refreshes a source's byte counters only this often; a counter that
+# has not moved for less than that says nothing about the stream
+SOURCE_STATS_INTERVAL = 5.0
+FAILOVER_MIN_TIMEOUT = SOURCE_STATS_INTERVAL
+FAILOVER_GRACE = 15.0
+FAILBACK_AFTER = 60.0
+
+
+def _target(host, port, mount):
+    try:
+        port = int(str(port).strip())
+    except ValueError:
+        port = 8000
+    return ((host or "localhost").strip(), port, normalize_mount(mount or "/live"))
+
+
+def command_target(command):
+    # (host, port, mount) a BUTT command line streams to
+    try:
+        return _target(command[command.index("-h") + 1], command[command.index("-p") + 1], command[command.index("-m") + 1])
+    except (ValueError, IndexError):
+        return None
+
+
+class FailoverMonitor:
+    # Watches the mount BUTT is streaming to and moves BUTT to the backup
+    # target when the source has been unhealthy for `timeout` seconds:
+    # server unreachable, mount missing, or its source byte counter frozen
+    # for longer than Icecast's stats interval. Detection takes at most
+    # timeout + one check interval (the status TTL) + one status fetch (plus
+    # the stats interval for a frozen counter). After an outage of the primary *server*, BUTT moves back once
+    # the primary has answered for FAILBACK_AFTER seconds in a row.
+    def __init__(self, supervisor=butt_supervisor, cache=status_cache):
+        self.supervisor = supervisor
+        self.cache = cache
+        self.settings = {}
+        self.enabled = False
+        self.timeout = FAILOVER_TIMEOUT
+        self.failovers = 0
+        self.last_reason = ""
+        self.last_switch = None
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._thread = None
+        self._stop = threading.Event()
+        self._last_healthy = time.monotonic()
+        self._last_bytes = None
+        self._progress_at = None
+        self._primary_up_since = None
+        self._failback = False
+        supervisor.subscribe(self._on_butt_event)
+
+    def subscribe(self, fn):
+        # fn(event, info): "failover" / "failback" with from, to and reason
+        self._listeners.append(fn)
+
+    def unsubscribe(self, fn):
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def configure(self, settings):
+        with self._lock:
+            self.settings = dict(settings)
+            self.enabled = bool(settings.get("failover_enabled")) and bool(
+                (settings.get("backup_host") or "").strip() or (settings.get("backup_mountpoint") or "").strip())
+            try:
+                self.timeout = float(settings.get("failover_timeout", FAILOVER_TIMEOUT))
+            except (TypeError, ValueError):
+                self.timeout = FAILOVER_TIMEOUT
+            self.timeout = max(self.timeout, FAILOVER_MIN_TIMEOUT)
+            if self.enabled and self.backup() == self.primary():
+                # Switching would restart BUTT in the same place on every timeout
+                print("Failover disabled: the backup target is the same as the primary")
+                self.enabled = False
+        config_path = (settings.get("icecast_config") or "").strip()
+        if config_path:
+            try:
+                icecast_config.apply_fallback(settings, config_path)
+            except (OSError, SyntaxError) as e:
+                print(f"Could not update fallback-mount in {config_path}: {e}")
+        if self.enabled and (self._thread is None or not self._thread.is_alive()):
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="failover", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def primary(self):
+        s = self.settings
+        return _target(s.get("host"), s.get("port") or "8000", s.get("mountpoint"))
+
+    def backup(self):
+        s = self.settings
+        return _target(s.get("backup_host") or s.get("host"), s.get("backup_port") or s.get("port") or "8000",
+                       s.get("backup_mountpoint") or s.get("mountpoint"))
+
+    def active(self):
+        target = command_target(self.supervisor.command or [])
+        if target is not None and target == self.backup() and target != self.primary():
+            return "backup"
+        return "primary"
+
+    def status(self):
+        primary, backup = self.primary(), self.backup()
+        return {
+            "enabled": self.enabled,
+            "active": self.active(),
+            "primary": f"{primary[0]}:{primary[1]}{primary[2]}",
+            "backup": f"{backup[0]}:{backup[1]}{backup[2]}",
+            "timeout": self.timeout,
+            "unhealthy_for": round(max(time.monotonic() - self._last_healthy, 0), 1),
+            "failovers": self.failovers,
+            "last_reason": self.last_reason,
+            "last_switch": self.last_switch,
+        }
+
+    def _on_butt_event(self, event, info):
+        if event == "started":
+            # A fresh source gets FAILOVER_GRACE seconds to appear on the server
+            self._last_healthy = time.monotonic() + FAILOVER_GRACE
+            self._last_bytes = None
+            self._progress_at = None
+
+    def _run(self):
+        while not self._stop.wait(max(FAILOVER_CHECK, self.cache.ttl)):
+            if not self.enabled:
+                continue
+            try:
+                with latency.timer("failover_check"):
+                    self.check()
+            except Exception as e:
+                print(f"Failover check error: {e}")
+
+    def _health(self, target, now):
+        host, port, mount = target
+        try:
+            snapshot = self.cache.get(host, port)
+        except Exception as e:
+            return False, False, f"{host}:{port} unreachable ({type(e).__name__})"
+        if not snapshot.ok:
+            return False, False, f"{host}:{port} returned HTTP {snapshot.status_code}"
+        record = snapshot.mount(mount)
+        if record is None:
+            return False, True, f"mount {mount} missing on {host}:{port}"
+        current = source_bytes(record)
+        if self._last_bytes is None or current != self._last_bytes:
+            # First sight, growth, or a counter that went backwards because
+            # Icecast (or the source) restarted: progress starts over from here
+            self._last_bytes = current
+            self._progress_at = now
+        elif now - self._progress_at >= SOURCE_STATS_INTERVAL:
+            return False, True, f"no source data on {mount} for {now - self._progress_at:.0f} s"
+        return True, True, current
+
+    def check(self, now=None):
+        now = time.monotonic() if now is None else now
+        if not self.supervisor.running():
+            self._last_healthy = max(self._last_healthy, now)
+            return None
+        active = self.active()
+        target = self.backup() if active == "backup" else self.primary()
+        healthy, reachable, detail = self._health(target, now)
+        if healthy:
+            self._last_healthy = max(self._last_healthy, now)
+            if active == "backup" and self._failback:
+                return self._maybe_failback(now)
+            return None
+        if now - self._last_healthy < self.timeout:
+            return None
+        other = "primary" if active == "backup" else "backup"
+        # Only an unreachable primary server is worth returning to later;
+        # a mount-level problem would just fail again
+        self._failback = other == "backup" and not reachable
+        return self._switch(other, detail)
+
+    def _maybe_failback(self, now):
+        host, port, _ = self.primary()
+        try:
+            up = self.cache.get(host, port).ok
+        except Exception:
+            up = False
+        if not up:
+            self._primary_up_since = None
+            return None
+        if self._primary_up_since is None:
+            self._primary_up_since = now
+        if now - self._primary_up_since < FAILBACK_AFTER:
+            return None
+        self._failback = False
+        return self._switch("primary", f"{host}:{port} reachable again", event="failback")
+
+    def _switch(self, to, reason, event="failover"):
+        target = self.backup() if to == "backup" else self.primary()
+        settings = dict(self.settings, host=target[0], port=str(target[1]), mountpoint=target[2])
+        previous = self.active()
+        previous_command = list(self.supervisor.command or [])
+        print(f"Failover: {previous} -> {to}: {reason}")
+        try:
+            self.supervisor.restart(build_butt_command(settings))
+        except Exception as e:
+            # Never leave BUTT stopped: go back to what was streaming and
+            # try again after another full timeout
+            print(f"Failover to {to} failed: {e}")
+            if previous_command and not self.supervisor.running():
+                try:
+                    self.supervisor.start(previous_command, self.supervisor.auto_restart)
+                except Exception as e2:
+                    print(f"Could not restart BUTT on the {previous} target: {e2}")
+            self.last_reason = f"switch to {to} failed: {e}"
+            self._last_healthy = time.monotonic()
+            return None
+        self.failovers += event == "failover"
+        self.last_reason = reason
+        self.last_switch = time.time()
+        self._primary_up_since = None
+        info = {"from": previous, "to": to, "reason": reason}
+        for fn in list(self._listeners):
+            try:
+                fn(event, info)
+            except Exception as e:
+                print(f"Failover listener error: {e}")
+        return info
+
+
+failover_monitor = FailoverMonitor()
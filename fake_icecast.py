@@ -0,0 +1,224 @@
+import sys
+import json
+import time
+import base64
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from icecast_status import normalize_mount
+
+# Local stand-in for the parts of Icecast the controller talks to:
+#   python fake_icecast.py --port 8000 --sources 200 --latency 0.05 --error-rate 0.1
+# /status-json.xsl with any number of sources (one source is a bare object,
+# as in Icecast), /status.xsl, and /admin/metadata behind admin or source
+# credentials. Latency and errors can be injected for every request.
+
+
+class FakeIcecast:
+    def __init__(self, sources=1, bitrate=128, admin=("admin", "hackme"), source_password="hackme",
+                 latency=0.0, jitter=0.0, error_rate=0.0, error_status=500, seed=None):
+        self.bitrate = bitrate
+        self.admin = admin
+        self.source_password = source_password
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.started = time.time()
+        self.requests = {"status": 0, "metadata": 0, "unauthorized": 0, "errors": 0}
+        self.metadata = {}
+        self.server = None
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._fail_next = 0
+        self.set_sources(sources)
+
+    def set_sources(self, count, listeners=10):
+        with self._lock:
+            self.mounts = {f"/stream{i}" if i else "/live": listeners + i % 7 for i in range(count)}
+
+    def fail_next(self, count=1):
+        # The next `count` requests fail regardless of error_rate
+        with self._lock:
+            self._fail_next += count
+
+    def icestats(self, host="127.0.0.1", port=8000):
+        now = time.time()
+        elapsed = now - self.started
+        start = time.strftime("%Y-%m-%dT%H:%M:%S+0000", time.gmtime(self.started))
+        with self._lock:
+            mounts = dict(self.mounts)
+            metadata = dict(self.metadata)
+        sources = []
+        for mount, listeners in mounts.items():
+            meta = metadata.get(mount, {})
+            sent = int(elapsed * self.bitrate * 125 * listeners)
+            sources.append({
+                "audio_info": f"bitrate={self.bitrate};channels=2;samplerate=44100",
+                "bitrate": self.bitrate,
+                "genre": meta.get("genre", "Various"),
+                "listener_peak": listeners + 3,
+                "listeners": listeners,
+                "listenurl": f"http://{host}:{port}{mount}",
+                "server_description": meta.get("description", "Fake stream"),
+                "server_name": mount.strip("/"),
+                "server_type": "audio/mpeg",
+                "stream_start": time.strftime("%a, %d %b %Y %H:%M:%S +0000", time.gmtime(self.started)),
+                "stream_start_iso8601": start,
+                "title": meta.get("title", ""),
+                "total_bytes_read": int(elapsed * self.bitrate * 125),
+                "total_bytes_sent": sent,
+            })
+        icestats = {
+            "admin": "admin@example.com",
+            "host": host,
+            "location": "Fake",
+            "server_id": "Icecast 2.4.4 (fake)",
+            "server_start_iso8601": start,
+        }
+        if sources:
+            icestats["source"] = sources[0] if len(sources) == 1 else sources
+        return {"icestats": icestats}
+
+    def start(self, host="127.0.0.1", port=0):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; with Nagle on, a
+            # keep-alive client waits for a delayed ACK (~40 ms) on each one
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                fake._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="fake-icecast", daemon=True).start()
+        return self.server.server_address[1]
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def _send(self, handler, status, body, content_type="text/plain", headers=None):
+        body = body if isinstance(body, bytes) else body.encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        if handler.command != "HEAD":
+            handler.wfile.write(body)
+
+    def _authorized(self, handler):
+        header = handler.headers.get("Authorization", "")
+        if not header.startswith("Basic "):
+            return False
+        try:
+            user, _, password = base64.b64decode(header[6:]).decode().partition(":")
+        except (ValueError, UnicodeDecodeError):
+            return False
+        return (user, password) == tuple(self.admin) or (user == "source" and password == self.source_password)
+
+    def _handle(self, handler):
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        url = urlparse(handler.path)
+        with self._lock:
+            fail = self._fail_next > 0 or (self.error_rate and self._random.random() < self.error_rate)
+            if self._fail_next > 0:
+                self._fail_next -= 1
+            if fail:
+                self.requests["errors"] += 1
+        if fail:
+            self._send(handler, self.error_status, "Injected error\n")
+            return
+        if url.path == "/status-json.xsl":
+            with self._lock:
+                self.requests["status"] += 1
+            host, port = handler.server.server_address[:2]
+            body = json.dumps(self.icestats(host, port)).encode()
+            # Byte counters move every second, so the ETag does too
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if handler.headers.get("If-None-Match") == etag:
+                self._send(handler, 304, b"", headers={"ETag": etag})
+                return
+            self._send(handler, 200, body, "application/json", {"ETag": etag})
+        elif url.path == "/status.xsl":
+            with self._lock:
+                mounts = list(self.mounts)
+            self._send(handler, 200, "<html><body>" + "".join(f"<h3>Mount Point {m}</h3>" for m in mounts)
+                       + "</body></html>", "text/html")
+        elif url.path == "/admin/metadata":
+            self._metadata(handler, parse_qs(url.query))
+        else:
+            self._send(handler, 404, "Not found\n")
+
+    def _metadata(self, handler, params):
+        with self._lock:
+            self.requests["metadata"] += 1
+        if not self._authorized(handler):
+            with self._lock:
+                self.requests["unauthorized"] += 1
+            self._send(handler, 401, "Authentication required\n", headers={"WWW-Authenticate": 'Basic realm="Icecast2 Server"'})
+            return
+        mount = normalize_mount(params.get("mount", [""])[0])
+        with self._lock:
+            known = mount in self.mounts
+        if not known:
+            self._send(handler, 400, "<iceresponse><message>Source does not exist</message><return>0</return></iceresponse>",
+                       "text/xml")
+            return
+        mode = params.get("mode", [""])[0]
+        with self._lock:
+            meta = self.metadata.setdefault(mount, {})
+            if mode == "updinfo":
+                meta["title"] = params.get("song", [""])[0]
+            elif mode == "updmeta":
+                for key in ("title", "description", "genre"):
+                    if key in params:
+                        meta[key] = params[key][0]
+        self._send(handler, 200, "<iceresponse><message>Metadata update successful</message><return>1</return></iceresponse>",
+                   "text/xml")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local stand-in Icecast server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--sources", type=int, default=1)
+    parser.add_argument("--bitrate", type=int, default=128)
+    parser.add_argument("--admin-user", default="admin")
+    parser.add_argument("--admin-password", default="hackme")
+    parser.add_argument("--source-password", default="hackme")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds, random")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=500)
+    args = parser.parse_args(argv)
+    fake = FakeIcecast(args.sources, args.bitrate, (args.admin_user, args.admin_password), args.source_password,
+                       args.latency, args.jitter, args.error_rate, args.error_status)
+    port = fake.start(args.host, args.port)
+    print(f"Fake Icecast on http://{args.host}:{port} with {args.sources} sources")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,414 @@
+import os
+import time
+import socket
+import threading
+from flask import Flask, Response, request, jsonify, g, stream_with_context
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+import icecast_config
+import icecast_status
+import stream_probe
+from butt_process import butt_supervisor
+from config_store import config_store, ConfigError
+from icecast_metadata import metadata_queue
+from now_playing import now_playing_feed
+from live_events import live_feed
+from access_log import access_log
+from failover import failover_monitor
+from relay_topology import topology_monitor
+from icecast_status import status_cache
+from icecast_metrics import metrics_store, throughput, latency, profiler, PrometheusWriter
+from startup import startup_cache, startup_clock
+
+# Flask Server Implementation
+server = Flask(__name__)
+
+@server.route('/', methods=['GET'])
+def index():
+    return jsonify({"ok": True, "routes": ["/settings", "/throughput", "/metrics", "/butt", "/probe", "/nowplaying", "/events", "/analytics", "/failover", "/capacity", "/topology", "/diagnostics"]})
+
+SETTINGS_HOST = '127.0.0.1'
+SETTINGS_PORT = 8001
+
+@server.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+@server.after_request
+def _log_request(response):
+    started = g.get("request_started")
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        latency.observe(f"api {request.endpoint or 'unknown'}", elapsed, "ok" if response.status_code < 500 else "error")
+        if api_server.access_log:
+            print(f"API {request.method} {request.full_path.rstrip('?')} {response.status_code} {elapsed * 1000:.1f} ms")
+    return response
+
+@server.route('/settings', methods=['GET', 'POST'])
+def settings():
+    if request.method == 'GET':
+        try:
+            return jsonify(config_store.load())
+        except FileNotFoundError:
+            return jsonify({"error": "Config file not found"}), 404
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    elif request.method == 'POST':
+        new_settings = request.get_json(silent=True)
+        try:
+            config_store.save(new_settings, source="api")
+            return jsonify({"message": "Settings saved successfully"})
+        except ConfigError as e:
+            return jsonify({"error": "Invalid settings", "details": e.errors}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+@server.route('/throughput', methods=['GET'])
+def throughput_stats():
+    rates = throughput.rates()
+    total = sum(r["bytes_per_sec"] for r in rates.values())
+    return jsonify({
+        "mounts": rates,
+        "total": {
+            "bytes_per_sec": round(total, 1),
+            "kbps": round(total * 8 / 1000, 1),
+            "gb_per_day": round(total * 86400 / 1e9, 2),
+            "gb_per_month": round(total * 86400 * 30 / 1e9, 1),
+        },
+    })
+
+@server.route('/metrics', methods=['GET'])
+def metrics():
+    # Everything here comes from memory; a scrape never reaches Icecast
+    out = PrometheusWriter()
+    now = time.time()
+    out.declare("icecast_up", "gauge", "Whether the last status-json.xsl fetch succeeded.")
+    out.declare("icecast_status_age_seconds", "gauge", "Age of the cached status snapshot.")
+    for snapshot in status_cache.snapshots():
+        labels = {"server": f"{snapshot.host}:{snapshot.port}"}
+        out.sample("icecast_up", 1 if snapshot.ok else 0, labels)
+        out.sample("icecast_status_age_seconds", f"{snapshot.age():.3f}", labels)
+    mount_metrics = [
+        ("icecast_mount_listeners", "gauge", "Current listeners on the mount.", lambda r: r.listeners),
+        ("icecast_mount_listener_peak", "gauge", "Peak listeners on the mount.", lambda r: r.peak),
+        ("icecast_mount_bytes_total", "counter", "Bytes reported by Icecast for the mount.", lambda r: r.bytes),
+        ("icecast_mount_bitrate_kbps", "gauge", "Stream bitrate of the mount.", lambda r: r.bitrate),
+        ("icecast_mount_source_uptime_seconds", "gauge", "Seconds since the source connected.", lambda r: r.uptime(now)),
+    ]
+    snapshots = [snapshot for snapshot in status_cache.snapshots() if snapshot.ok]
+    for name, kind, help_text, value_of in mount_metrics:
+        out.declare(name, kind, help_text)
+        for snapshot in snapshots:
+            for mount, record in snapshot.mounts.items():
+                value = value_of(record)
+                if value is None:
+                    continue
+                out.sample(name, f"{value:g}" if isinstance(value, float) else value,
+                           {"server": f"{snapshot.host}:{snapshot.port}", "mount": mount})
+    out.declare("icecast_mount_throughput_bytes_per_second", "gauge", "Outbound rate derived from byte counter deltas.")
+    for key, rate in throughput.rates().items():
+        server_key, _, mount = key.partition("/")
+        out.sample("icecast_mount_throughput_bytes_per_second", rate["bytes_per_sec"],
+                   {"server": server_key, "mount": "/" + mount, "estimated": str(rate["estimated"]).lower()})
+    out.histogram("icecast_controller_operation_duration_seconds",
+                  "Duration of controller operations such as status fetches and metadata pushes.",
+                  latency.histograms())
+    out.declare("icecast_controller_operation_errors_total", "counter", "Failed controller operations by error type.")
+    for operation, summary in sorted(latency.summary().items()):
+        for error_type, count in sorted(summary["error_types"].items()):
+            out.sample("icecast_controller_operation_errors_total", count, {"operation": operation, "type": error_type})
+    probe = dict(stream_probe.last_result)
+    if probe:
+        labels = {"url": probe["url"]}
+        out.declare("stream_probe_healthy", "gauge", "Whether the last listener probe received audio at the expected bitrate.")
+        out.sample("stream_probe_healthy", 1 if probe["healthy"] else 0, labels)
+        for name, key, help_text in (
+            ("stream_probe_connect_seconds", "connect_ms", "TCP connect time of the last listener probe."),
+            ("stream_probe_ttfb_seconds", "ttfb_ms", "Time to first response byte of the last listener probe."),
+        ):
+            if probe[key] is not None:
+                out.declare(name, "gauge", help_text)
+                out.sample(name, f"{probe[key] / 1000:.4f}", labels)
+        out.declare("stream_probe_burst_bytes", "gauge", "Bytes delivered in the initial burst of the last listener probe.")
+        out.sample("stream_probe_burst_bytes", probe["burst_bytes"], labels)
+        out.declare("stream_probe_effective_kbps", "gauge", "Steady-state bitrate measured by the last listener probe.")
+        out.sample("stream_probe_effective_kbps", probe["effective_kbps"], labels)
+    butt = butt_supervisor.status()
+    out.declare("butt_running", "gauge", "Whether the BUTT encoder process is running.")
+    out.sample("butt_running", 1 if butt["running"] else 0)
+    out.declare("butt_uptime_seconds", "gauge", "Seconds since BUTT was (re)started.")
+    out.sample("butt_uptime_seconds", f"{butt['uptime']:.0f}")
+    out.declare("butt_restarts_total", "counter", "Automatic BUTT restarts after an unexpected exit.")
+    out.sample("butt_restarts_total", butt["restarts"])
+    failover = failover_monitor.status()
+    out.declare("failover_backup_active", "gauge", "Whether BUTT is streaming to the backup target.")
+    out.sample("failover_backup_active", 1 if failover["active"] == "backup" else 0)
+    out.declare("failovers_total", "counter", "Automatic switches from a failing target to the other one.")
+    out.sample("failovers_total", failover["failovers"])
+    topology = topology_monitor.status()
+    out.declare("relay_node_listeners", "gauge", "Listeners per master/edge node of the relay topology.")
+    out.declare("relay_node_up", "gauge", "Whether the node carries the mount.")
+    out.declare("relay_lag_seconds", "gauge", "Delay until the last title change reached the edge.")
+    for node in topology["nodes"]:
+        labels = {"node": node["node"], "role": node["role"]}
+        out.sample("relay_node_listeners", node["listeners"], labels)
+        out.sample("relay_node_up", 1 if node["state"] in ("ok", "behind") else 0, labels)
+        if node["lag"] is not None:
+            out.sample("relay_lag_seconds", node["lag"], labels)
+    out.declare("live_event_clients", "gauge", "Connected /events clients.")
+    out.sample("live_event_clients", live_feed.clients())
+    queue = metadata_queue.stats()
+    out.declare("metadata_updates_total", "counter", "Metadata updates by what the queue did with them.")
+    for result in ("pushed", "skipped", "coalesced"):
+        out.sample("metadata_updates_total", queue[result], {"result": result})
+    return Response(out.text(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@server.route('/butt', methods=['GET'])
+def butt_status():
+    try:
+        lines = int(request.args.get("lines", 50))
+    except ValueError:
+        return jsonify({"error": "lines must be a whole number"}), 400
+    if lines < 0:
+        return jsonify({"error": "lines must not be negative"}), 400
+    status = butt_supervisor.status()
+    status["log"] = butt_supervisor.log_tail(lines) if lines else []
+    return jsonify(status)
+
+@server.route('/events', methods=['GET'])
+def events():
+    # Server-Sent Events: a snapshot, then listener/metadata/mount/now-playing
+    # changes as the controller's own status poll sees them
+    response = Response(stream_with_context(live_feed.stream()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    # Read-only stats; lets dashboards on other origins use EventSource
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+@server.route('/analytics', methods=['GET'])
+def analytics():
+    # Listener sessions from Icecast's access.log; only new bytes are parsed
+    try:
+        hours = float(request.args.get("hours", 0))
+        resolution = max(int(request.args.get("resolution", 300)), 60)
+        top = int(request.args.get("top", 10))
+    except ValueError:
+        return jsonify({"error": "hours, resolution and top must be numbers"}), 400
+    try:
+        added = access_log.update()
+    except OSError as e:
+        return jsonify({"error": str(e)}), 500
+    report = access_log.report(
+        since=time.time() - hours * 3600 if hours else None,
+        mount=icecast_status.normalize_mount(request.args["mount"]) if request.args.get("mount") else None,
+        top=top,
+        resolution=resolution,
+    )
+    report["parsed_sessions"] = added
+    return jsonify(report)
+
+@server.route('/failover', methods=['GET'])
+def failover_status():
+    return jsonify(failover_monitor.status())
+
+@server.route('/diagnostics', methods=['GET'])
+def diagnostics():
+    # Per-operation latency percentiles, outcomes and error types, plus the
+    # sampling profiler's state and hottest functions, and how this launch's
+    # startup time was spent
+    return jsonify({"operations": latency.summary(), "profiler": profiler.status(), "hot": profiler.top(20),
+                    "startup": startup_clock.summary()})
+
+@server.route('/diagnostics/profiler', methods=['GET', 'POST'])
+def diagnostics_profiler():
+    # POST {"enabled": true, "interval": 0.005, "reset": true} switches the
+    # sampler; GET returns the collapsed stacks for a flame graph
+    if request.method == 'GET':
+        return Response(profiler.collapsed(), content_type="text/plain; charset=utf-8")
+    body = request.get_json(silent=True) or {}
+    if body.get("reset"):
+        profiler.reset()
+    if "enabled" in body:
+        try:
+            if body["enabled"]:
+                profiler.start(body.get("interval"))
+            else:
+                profiler.stop()
+        except (TypeError, ValueError):
+            return jsonify({"error": "interval must be a number of seconds"}), 400
+    return jsonify(profiler.status())
+
+@server.route('/topology', methods=['GET'])
+def topology():
+    # Last result of the relay monitor; ?refresh=1 checks every node now
+    if request.args.get("refresh"):
+        return jsonify(topology_monitor.check())
+    return jsonify(topology_monitor.status())
+
+@server.route('/capacity', methods=['GET'])
+def capacity():
+    # Limits and bandwidth for a target load; ?format=xml returns the
+    # complete icecast.xml instead of the plan
+    try:
+        listeners = int(request.args["listeners"]) if request.args.get("listeners") else None
+        headroom = float(request.args.get("headroom", icecast_config.HEADROOM))
+    except ValueError:
+        return jsonify({"error": "listeners and headroom must be numbers"}), 400
+    try:
+        settings = config_store.load()
+    except (FileNotFoundError, ValueError):
+        settings = {}
+    result = icecast_config.plan_for_settings(settings, listeners, headroom, icecast_config.history_peaks(metrics_store))
+    if request.args.get("format") == "xml":
+        try:
+            tree = icecast_config.render(result, result["base"])
+        except (OSError, SyntaxError) as e:
+            return jsonify({"error": str(e)}), 500
+        return Response(icecast_config.tostring(tree), mimetype="application/xml")
+    return jsonify(result)
+
+@server.route('/nowplaying', methods=['GET'])
+def nowplaying():
+    return jsonify(now_playing_feed.status())
+
+@server.route('/probe', methods=['GET', 'POST'])
+def probe():
+    # GET returns the last result; POST runs a new listener probe
+    if request.method == 'POST':
+        params = request.get_json(silent=True) or {}
+        if not isinstance(params, dict):
+            return jsonify({"error": "body must be a JSON object"}), 400
+        try:
+            config = config_store.load()
+        except (OSError, ValueError):
+            config = {}
+        host = params.get("host") or config.get("host", "localhost")
+        mount = icecast_status.normalize_mount(params.get("mount") or config.get("mountpoint", "/live"))
+        expected = params.get("expected_kbps") or config.get("bitrate")
+        try:
+            port = int(params.get("port") or config.get("port", 8000))
+            duration = float(params.get("duration", stream_probe.PROBE_DURATION))
+            expected = int(expected) if expected else None
+        except (TypeError, ValueError):
+            return jsonify({"error": "port, duration and expected_kbps must be numbers"}), 400
+        if not 0 < port < 65536:
+            return jsonify({"error": "port must be between 1 and 65535"}), 400
+        if not 0 < duration <= stream_probe.PROBE_MAX_DURATION:
+            return jsonify({"error": f"duration must be more than 0 and at most {stream_probe.PROBE_MAX_DURATION:g} seconds"}), 400
+        return jsonify(stream_probe.probe_stream(host, port, mount, duration=duration, expected_kbps=expected))
+    return jsonify(stream_probe.last_result or {"error": "no probe has run yet"})
+
+class _QuietHandler(WSGIRequestHandler):
+    # Request lines are logged with timings by _log_request instead
+    def log_request(self, code="-", size="-"):
+        pass
+
+
+def _activated_fd():
+    # systemd-style socket activation: the listening socket is fd 3
+    if os.environ.get("LISTEN_PID") == str(os.getpid()) and int(os.environ.get("LISTEN_FDS", "0") or 0) >= 1:
+        return 3
+    return None
+
+
+def _listen(host, port):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        sock.listen(128)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class ApiServer:
+    # Threaded WSGI server for the Flask app. The listening socket is bound in
+    # start() itself, so the port is known (and owned) before anything reads
+    # it: an inherited socket if one was passed in, else the configured port,
+    # else the port the last run fell back to (so the URL stays the same
+    # from one launch to the next), else any free port the OS hands out.
+    def __init__(self, app, host=SETTINGS_HOST, port=SETTINGS_PORT):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.access_log = True
+        self._server = None
+        self._thread = None
+
+    def url(self, path=""):
+        # A wildcard bind is reached locally through loopback
+        host = {"0.0.0.0": "127.0.0.1", "::": "::1", "": "127.0.0.1"}.get(self.host, self.host)
+        if ":" in host:
+            host = f"[{host}]"
+        return f"http://{host}:{self.port}{path}"
+
+    def _configured_host(self, settings):
+        # 0.0.0.0 makes /settings (passwords included) reachable from other
+        # machines; meant for containers behind their own network boundary
+        return (os.environ.get("ICECAST_API_HOST") or settings.get("api_host") or self.host).strip()
+
+    def _configured_port(self, settings):
+        value = os.environ.get("ICECAST_API_PORT") or settings.get("api_port")
+        try:
+            return int(value) if value else self.port
+        except ValueError:
+            return self.port
+
+    def start(self, settings=None):
+        if self._server is not None:
+            return self.port
+        settings = settings or {}
+        self.access_log = bool(settings.get("api_access_log", True))
+        fd = _activated_fd()
+        if fd is None:
+            self.host = self._configured_host(settings)
+            port = self._configured_port(settings)
+            try:
+                sock = _listen(self.host, port)
+            except OSError as e:
+                print(f"API port {port} unavailable ({e}); using a free port")
+                sock = None
+                last = startup_cache.get("api_port")
+                if isinstance(last, int) and last != port:
+                    try:
+                        sock = _listen(self.host, last)
+                    except OSError:
+                        pass
+                if sock is None:
+                    sock = _listen(self.host, 0)
+                startup_cache.update(api_port=sock.getsockname()[1])
+            # werkzeug duplicates the descriptor; ours can go
+            with sock:
+                self._server = make_server(self.host, 0, self.app, threaded=True, request_handler=_QuietHandler, fd=sock.fileno())
+        else:
+            self._server = make_server(self.host, 0, self.app, threaded=True, request_handler=_QuietHandler, fd=fd)
+        # Let stop() wait for in-flight requests instead of cutting them off
+        self._server.daemon_threads = False
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="icecast-api", daemon=True)
+        self._thread.start()
+        wildcard = self.host in ("0.0.0.0", "::", "")
+        print(f"Settings API listening on {self.url()}" + (" and every other interface" if wildcard else ""))
+        return self.port
+
+    def stop(self):
+        if self._server is None:
+            return
+        # Open /events streams would otherwise keep their threads busy forever
+        live_feed.close()
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+
+
+api_server = ApiServer(server)
+
+
+def run_server(settings=None):
+    try:
+        return api_server.start(settings)
+    except Exception as e:
+        print(f"Server error: {e}")
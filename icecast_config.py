@@ -0,0 +1,292 @@
+import os
+import sys
+import json
+import math
+import argparse
+import xml.etree.ElementTree as ET
+
+from icecast_status import normalize_mount
+
+ICECAST_XML = os.path.join(os.path.dirname(os.path.abspath(__file__)), "render", "icecast.xml")
+BURST_SECONDS = 3.0       # audio sent at once so players start without buffering
+QUEUE_SECONDS = 15.0      # backlog a slow listener may build before it is dropped
+HEADROOM = 0.25
+PROTOCOL_OVERHEAD = 1.05  # TCP/IP and HTTP framing on top of the audio bitrate
+SPARE_CLIENTS = 16        # status polls, admin requests and source connections
+
+
+def load(path=ICECAST_XML):
+    return ET.parse(path)
+
+
+def tostring(tree):
+    # Same layout as the hand-written file: two-space indent, no declaration
+    root = tree.getroot()
+    ET.indent(root, space="  ")
+    return ET.tostring(root, encoding="utf-8") + b"\n"
+
+
+def write(tree, path=ICECAST_XML):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(tostring(tree))
+    os.replace(tmp, path)
+
+
+def ensure_child(parent, tag, text=None):
+    node = parent.find(tag)
+    if node is None:
+        node = ET.SubElement(parent, tag)
+    if text is not None:
+        node.text = str(text)
+    return node
+
+
+def find_mount(root, mount):
+    mount = normalize_mount(mount)
+    for node in root.findall("mount"):
+        if normalize_mount(node.findtext("mount-name") or "") == mount:
+            return node
+    return None
+
+
+def ensure_mount(root, mount):
+    node = find_mount(root, mount)
+    if node is None:
+        node = ET.SubElement(root, "mount")
+        ensure_child(node, "mount-name", normalize_mount(mount))
+        ensure_child(node, "public", 1)
+    return node
+
+
+def set_fallback(root, mount, fallback, override=True):
+    # Listeners of `mount` move to `fallback` when its source drops and,
+    # with override, back again once the source returns
+    node = ensure_mount(root, mount)
+    if fallback:
+        ensure_child(node, "fallback-mount", normalize_mount(fallback))
+        ensure_child(node, "fallback-override", 1 if override else 0)
+        ensure_mount(root, fallback)
+    else:
+        for tag in ("fallback-mount", "fallback-override"):
+            child = node.find(tag)
+            if child is not None:
+                node.remove(child)
+    return node
+
+
+def apply_fallback(settings, path=ICECAST_XML):
+    # A backup mount on the same server becomes the primary's fallback-mount;
+    # returns True when the file changed
+    primary = normalize_mount(settings.get("mountpoint") or "/live")
+    backup = (settings.get("backup_mountpoint") or "").strip()
+    backup_host = (settings.get("backup_host") or "").strip()
+    same_server = not backup_host or (
+        backup_host == (settings.get("host") or "localhost").strip()
+        and str(settings.get("backup_port") or settings.get("port") or "8000").strip()
+        == str(settings.get("port") or "8000").strip()
+    )
+    fallback = normalize_mount(backup) if backup and same_server and settings.get("failover_enabled") else None
+    tree = load(path)
+    node = find_mount(tree.getroot(), primary)
+    current = node.findtext("fallback-mount") if node is not None else None
+    if (current and normalize_mount(current)) == fallback:
+        return False
+    set_fallback(tree.getroot(), primary, fallback)
+    write(tree, path)
+    return True
+
+
+def plan(mounts, headroom=HEADROOM, burst_seconds=BURST_SECONDS, queue_seconds=QUEUE_SECONDS):
+    # mounts: [{"mount": "/live", "bitrate": 128, "listeners": 500}, ...] with
+    # bitrate in kbps and listeners the expected peak. Returns the <limits>
+    # and per-mount values that load needs, plus the bandwidth it implies.
+    rows = []
+    for m in mounts:
+        bitrate = int(m.get("bitrate") or 128)
+        listeners = int(m.get("listeners") or 0)
+        bytes_per_sec = bitrate * 1000 / 8
+        rows.append({
+            "mount": normalize_mount(m.get("mount") or "/live"),
+            "bitrate": bitrate,
+            "listeners": listeners,
+            "max_listeners": int(math.ceil(listeners * (1 + headroom))),
+            "burst_size": int(bytes_per_sec * burst_seconds),
+            "peak_mbps": round(listeners * bitrate * PROTOCOL_OVERHEAD / 1000, 1),
+        })
+    burst = max((r["burst_size"] for r in rows), default=65536)
+    top_rate = max((r["bitrate"] for r in rows), default=128) * 1000 / 8
+    # The queue has to hold at least the burst plus some seconds of backlog
+    queue = max(int(top_rate * queue_seconds), burst * 2)
+    listeners = sum(r["max_listeners"] for r in rows)
+    peak_mbps = sum(r["peak_mbps"] for r in rows)
+    return {
+        "mounts": rows,
+        "limits": {
+            "clients": listeners + len(rows) + SPARE_CLIENTS,
+            "sources": len(rows) + 2,
+            "queue-size": queue,
+            "burst-size": burst,
+        },
+        "peak_mbps": round(peak_mbps, 1),
+        "peak_mbps_with_headroom": round(peak_mbps * (1 + headroom), 1),
+        # Worst case: every listener connected around the clock
+        "tb_per_month_at_peak": round(peak_mbps * 1e6 / 8 * 86400 * 30 / 1e12, 2),
+        # Each queued client can hold up to queue-size bytes in memory
+        "worst_case_queue_mb": round(listeners * queue / 1e6, 1),
+    }
+
+
+def render(result, base=ICECAST_XML):
+    # A complete icecast.xml: the base file with <limits> and the planned
+    # <mount> blocks filled in; everything else (auth, paths) is kept
+    tree = load(base)
+    root = tree.getroot()
+    limits = ensure_child(root, "limits")
+    for tag, value in result["limits"].items():
+        ensure_child(limits, tag, value)
+    for row in result["mounts"]:
+        node = ensure_mount(root, row["mount"])
+        ensure_child(node, "max-listeners", row["max_listeners"])
+        ensure_child(node, "burst-size", row["burst_size"])
+        ensure_child(node, "bitrate", row["bitrate"])
+    return tree
+
+
+def read_limits(path=ICECAST_XML):
+    root = load(path).getroot()
+    limits = {}
+    for child in (root.find("limits") if root.find("limits") is not None else []):
+        try:
+            limits[child.tag] = int(child.text)
+        except (TypeError, ValueError):
+            continue
+    mounts = {}
+    for node in root.findall("mount"):
+        try:
+            mounts[normalize_mount(node.findtext("mount-name") or "")] = int(node.findtext("max-listeners") or 0) or None
+        except ValueError:
+            continue
+    return limits, mounts
+
+
+def history_peaks(store, window=30 * 24 * 3600):
+    # Highest listener count per mount in the stats history, from 1-minute
+    # (or hourly) averages, so brief spikes are smoothed out
+    peaks = {}
+    for key in store.keys():
+        target, _, metric = key.rpartition("|")
+        if metric != "listeners":
+            continue
+        mount = normalize_mount("/" + target.split("/", 1)[1]) if "/" in target else "/"
+        values = [v for _, v in store.query(key, window)]
+        if values:
+            peaks[mount] = max(peaks.get(mount, 0), int(math.ceil(max(values))))
+    return peaks
+
+
+def recommendations(result, current_path=ICECAST_XML, peaks=None):
+    # Compares the plan (and observed peaks) with the config in use
+    notes = []
+    try:
+        limits, mounts = read_limits(current_path)
+    except (OSError, ET.ParseError) as e:
+        return [f"Cannot read {current_path}: {e}"]
+    for tag, planned in result["limits"].items():
+        current = limits.get(tag)
+        if current is None:
+            notes.append(f"<{tag}> is not set; plan: {planned}")
+        elif tag == "clients" and current < planned:
+            notes.append(f"<clients> {current} is below the planned {planned}; listeners beyond it are refused")
+        elif tag == "queue-size" and current < limits.get("burst-size", 0):
+            notes.append(f"<queue-size> {current} is smaller than <burst-size>; new listeners can be dropped at once")
+        elif tag in ("queue-size", "burst-size") and abs(current - planned) > planned * 0.5:
+            notes.append(f"<{tag}> {current} differs a lot from the planned {planned} for these bitrates")
+    total_clients = limits.get("clients")
+    for mount, peak in sorted((peaks or {}).items()):
+        limit = mounts.get(mount)
+        if limit and peak >= limit * 0.8:
+            notes.append(f"{mount} peaked at {peak} listeners, {peak * 100 // limit}% of its max-listeners {limit}")
+        if total_clients and peak >= total_clients * 0.8:
+            notes.append(f"{mount} peaked at {peak} listeners against <clients> {total_clients}; raise it")
+    for row in result["mounts"]:
+        observed = (peaks or {}).get(row["mount"])
+        if observed and observed > row["listeners"]:
+            notes.append(f"{row['mount']}: history shows {observed} listeners, more than the planned {row['listeners']}")
+    return notes or ["Current config covers the planned load."]
+
+
+def plan_for_settings(settings, listeners=None, headroom=HEADROOM, peaks=None):
+    # The controller's own mount at its bitrate; without an explicit
+    # listener target the observed peak from the stats history is used
+    mount = normalize_mount(settings.get("mountpoint") or "/live")
+    try:
+        bitrate = int(str(settings.get("bitrate") or "128").strip())
+    except ValueError:
+        bitrate = 128
+    peaks = peaks or {}
+    result = plan([{"mount": mount, "bitrate": bitrate, "listeners": listeners or peaks.get(mount) or 100}], headroom)
+    path = (settings.get("icecast_config") or "").strip() or ICECAST_XML
+    result["base"] = path
+    result["recommendations"] = recommendations(result, path, peaks)
+    return result
+
+
+def parse_mount_arg(value):
+    # "/live:128:500" -> mount, bitrate kbps, peak listeners
+    parts = value.split(":")
+    try:
+        return {"mount": parts[0], "bitrate": int(parts[1]) if len(parts) > 1 else 128,
+                "listeners": int(parts[2]) if len(parts) > 2 else 0}
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected MOUNT[:BITRATE[:LISTENERS]], got {value!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan Icecast capacity and write a tuned icecast.xml")
+    parser.add_argument("--mount", action="append", type=parse_mount_arg, default=[],
+                        help="MOUNT:BITRATE:PEAK_LISTENERS, e.g. /live:128:500 (repeatable)")
+    parser.add_argument("--headroom", type=float, default=HEADROOM)
+    parser.add_argument("--base", default=ICECAST_XML, help="config to start from and compare against")
+    parser.add_argument("--history", help="listener history file to take observed peaks from")
+    parser.add_argument("--output", help="write the generated icecast.xml here")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    peaks = {}
+    if args.history:
+        from icecast_metrics import MetricsStore
+        store = MetricsStore()
+        store.load(args.history)
+        peaks = history_peaks(store)
+    mounts = args.mount or [{"mount": m, "bitrate": 128, "listeners": p} for m, p in peaks.items()]
+    for m in mounts:
+        if not m["listeners"]:
+            m["listeners"] = peaks.get(normalize_mount(m["mount"]), 100)
+    if not mounts:
+        parser.error("give at least one --mount or a --history with listener data")
+    result = plan(mounts, args.headroom)
+    result["recommendations"] = recommendations(result, args.base, peaks)
+    if args.output:
+        write(render(result, args.base), args.output)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+    print(summarize(result))
+    if args.output:
+        print(f"Wrote {args.output}")
+    return 0
+
+
+def summarize(result):
+    lines = [" ".join(f"<{tag}> {value}" for tag, value in result["limits"].items())]
+    for row in result["mounts"]:
+        lines.append(f"{row['mount']}: {row['bitrate']} kbps, {row['listeners']} peak -> max-listeners "
+                     f"{row['max_listeners']}, burst {row['burst_size']} B, {row['peak_mbps']} Mbps")
+    lines.append(f"Bandwidth: {result['peak_mbps']} Mbps at peak ({result['peak_mbps_with_headroom']} with headroom), "
+                 f"up to {result['tb_per_month_at_peak']} TB/month; queues up to {result['worst_case_queue_mb']} MB")
+    lines.extend(f"- {note}" for note in result.get("recommendations", []))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
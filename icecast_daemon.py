@@ -0,0 +1,123 @@
+import signal
+import threading
+
+import icecast_status
+import stream_probe
+from butt_process import build_butt_command, butt_supervisor
+from config_store import config_store
+from icecast_metadata import metadata_queue
+from now_playing import now_playing_feed
+from failover import failover_monitor
+from relay_topology import topology_monitor
+from icecast_api import run_server, api_server
+from icecast_services import init_services
+from icecast_status import status_cache, PollScheduler
+
+STARTUP_PROBE_DELAY = 4.0
+
+
+class HeadlessController:
+    # The controller without a window: settings API, the status poller and
+    # BUTT supervision, driven by config.json. Nothing here imports Qt.
+    def __init__(self, config_file="config.json", stream=False):
+        self.config_file = config_file
+        self.stream = stream
+        self.settings = {}
+        self.poll_scheduler = PollScheduler()
+        self._stop = threading.Event()
+
+    def load_settings(self):
+        config_store.set_path(self.config_file)
+        try:
+            self.settings = config_store.load()
+        except FileNotFoundError:
+            print(f"No config file found at {self.config_file}. Using default settings.")
+            self.settings = {}
+        except ValueError as e:
+            print(f"Invalid config file {self.config_file}: {e}. Using default settings.")
+            self.settings = {}
+        init_services(self.settings)
+
+    def on_settings_changed(self, settings, source):
+        # Edits through /settings or to the file itself apply without a restart
+        print(f"Settings changed ({source}), reloading")
+        self.settings = settings
+        init_services(settings)
+        self.poll_scheduler.boost()
+
+    def target(self):
+        host = (self.settings.get("host") or "localhost").strip()
+        try:
+            port = int(str(self.settings.get("port") or "8000").strip())
+        except ValueError:
+            port = 8000
+        mount = icecast_status.normalize_mount(self.settings.get("mountpoint") or "/live")
+        return host, port, mount
+
+    def poll_once(self):
+        host, port, mount = self.target()
+        try:
+            snapshot = status_cache.get(host, port)
+        except Exception as e:
+            self.poll_scheduler.record_failure()
+            print(f"Status poll failed: {e}")
+            return None
+        if snapshot.ok:
+            self.poll_scheduler.record_success()
+        else:
+            self.poll_scheduler.record_failure()
+        servers = [s for s in self.settings.get("servers", []) if s.get("host") and s.get("port")]
+        if servers:
+            icecast_status.poll_servers(servers)
+        return snapshot
+
+    def on_butt_event(self, event, info):
+        print(f"BUTT {event}: {info}")
+        if event == "started":
+            metadata_queue.forget()
+            self.poll_scheduler.boost()
+            timer = threading.Timer(STARTUP_PROBE_DELAY, self.probe_stream)
+            timer.daemon = True
+            timer.start()
+
+    def probe_stream(self):
+        host, port, mount = self.target()
+        try:
+            expected = int(self.settings.get("bitrate") or 0) or None
+        except ValueError:
+            expected = None
+        print(f"Stream probe: {stream_probe.summarize(stream_probe.probe_stream(host, port, mount, expected_kbps=expected))}")
+
+    def start_butt(self):
+        try:
+            butt_supervisor.start(build_butt_command(self.settings))
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"Failed to start BUTT: {e}")
+            return False
+        return True
+
+    def stop(self, *args):
+        self._stop.set()
+
+    def run(self):
+        self.load_settings()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        run_server(self.settings)
+        butt_supervisor.subscribe(self.on_butt_event)
+        config_store.subscribe(self.on_settings_changed)
+        now_playing_feed.subscribe(lambda title: print(f"Now playing: {title}"))
+        failover_monitor.subscribe(lambda event, info: self.poll_scheduler.boost())
+        if self.stream:
+            self.start_butt()
+        while not self._stop.is_set():
+            self.poll_once()
+            self._stop.wait(self.poll_scheduler.next_interval())
+        api_server.stop()
+        failover_monitor.stop()
+        topology_monitor.stop()
+        config_store.stop()
+        now_playing_feed.stop()
+        metadata_queue.close()
+        butt_supervisor.stop()
+        return 0
@@ -0,0 +1,1354 @@
+import time
+import webbrowser
+from concurrent.futures import CancelledError
+from PyQt5.QtWidgets import (
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QFormLayout,
+    QLineEdit, QPushButton, QLabel, QComboBox, QMessageBox, QGroupBox, QTabWidget,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QPlainTextEdit, QCheckBox, QFileDialog
+)
+from PyQt5.QtCore import Qt, QTimer, QObject, QEvent, QPointF, pyqtSignal
+from PyQt5.QtGui import QPainter, QPen, QColor, QPolygonF
+
+import icecast_config
+import icecast_net
+import icecast_status
+import relay_topology
+import stream_probe
+from butt_process import build_butt_command, butt_supervisor
+from icecast_services import init_services
+from icecast_metadata import metadata_queue
+from config_store import config_store, ConfigError
+from now_playing import now_playing_feed
+from icecast_net import NetworkEngine
+from icecast_status import status_cache, PollScheduler
+from icecast_metrics import metrics_store, throughput, latency, profiler
+from access_log import access_log
+from failover import failover_monitor
+from relay_topology import topology_monitor
+from startup import startup_cache, startup_clock
+# Give BUTT time to connect and Icecast time to publish the mount
+STARTUP_PROBE_DELAY_MS = 4000
+# A timer this often; how late it fires is how long the GUI thread was busy
+EVENT_LOOP_PROBE_MS = 100
+DIAGNOSTICS_REFRESH_MS = 2000
+
+
+class NetworkBridge(QObject):
+    # Emitted from engine worker threads; Qt queues it onto the GUI thread.
+    result_ready = pyqtSignal(object, object)
+    call_requested = pyqtSignal(object, object)
+
+    def __init__(self, engine, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.result_ready.connect(self._deliver)
+        self.call_requested.connect(lambda fn, args: fn(*args))
+
+    def call_soon(self, fn, *args):
+        # Safe from any thread: fn runs on the GUI thread
+        self.call_requested.emit(fn, args)
+
+    def run(self, fn, *args, on_result=None, on_error=None, key=None, **kwargs):
+        handlers = (on_result, on_error)
+        return self.engine.submit(
+            fn, *args, key=key,
+            on_done=lambda future: self.result_ready.emit(handlers, future),
+            **kwargs
+        )
+
+    def watch(self, future, on_result=None, on_error=None):
+        # Delivers a future completed elsewhere (e.g. the metadata queue)
+        handlers = (on_result, on_error)
+        future.add_done_callback(lambda f: self.result_ready.emit(handlers, f))
+        return future
+
+    def _deliver(self, handlers, future):
+        # Runs on the GUI thread; each handler is timed since a slow one
+        # freezes the window
+        on_result, on_error = handlers
+        try:
+            result = future.result()
+        except CancelledError:
+            return
+        except Exception as e:
+            if on_error:
+                with latency.timer(f"gui {getattr(on_error, '__name__', 'on_error')}"):
+                    on_error(e)
+            else:
+                print(f"Background task failed: {type(e).__name__}: {e}")
+            return
+        if on_result:
+            with latency.timer(f"gui {getattr(on_result, '__name__', 'on_result')}"):
+                on_result(result)
+
+
+class Sparkline(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.points = []
+        self.setMinimumHeight(60)
+
+    def set_points(self, points):
+        self.points = points
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = self.rect().adjusted(2, 14, -2, -2)
+        painter.setPen(QColor("#999999"))
+        if len(self.points) < 2:
+            painter.drawText(self.rect(), Qt.AlignCenter, "No history yet")
+            return
+        t0, t1 = self.points[0][0], self.points[-1][0]
+        values = [v for _, v in self.points]
+        low, high = min(values), max(values)
+        painter.drawText(2, 11, f"min {low:g}  max {high:g}")
+        span_t = (t1 - t0) or 1
+        span_v = (high - low) or 1
+        polygon = QPolygonF([
+            QPointF(rect.left() + (t - t0) / span_t * rect.width(),
+                    rect.bottom() - (v - low) / span_v * rect.height())
+            for t, v in self.points
+        ])
+        painter.setPen(QPen(QColor("#2e7d32"), 1.5))
+        painter.drawPolyline(polygon)
+
+
+class IcecastButtController(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Unified Icecast/BUTT Controller")
+        self.setGeometry(100, 100, 800, 600)
+
+        self.network = NetworkBridge(NetworkEngine(), self)
+        self._status_listener = lambda events: self.network.call_soon(self.on_status_events, events)
+        status_cache.subscribe(self._status_listener)
+        self._butt_listener = lambda event, info: self.network.call_soon(self.on_butt_event, event, info)
+        butt_supervisor.subscribe(self._butt_listener)
+        self._now_playing_listener = lambda title: self.network.call_soon(self.stream_title_input.setText, title)
+        now_playing_feed.subscribe(self._now_playing_listener)
+        self._failover_listener = lambda event, info: self.network.call_soon(self.on_failover_event, event, info)
+        failover_monitor.subscribe(self._failover_listener)
+        self.config_file = "config.json"
+        config_store.set_path(self.config_file)
+        self._settings_listener = lambda settings, source: self.network.call_soon(self.on_settings_changed, settings, source)
+        config_store.subscribe(self._settings_listener)
+        self.servers = []
+        self._dashboard_pending = False
+        self.poll_scheduler = PollScheduler()
+        self.host = "localhost"
+        self.port = 8000
+        # Last run's discovery; the real search runs after the window shows
+        self.butt_path = startup_cache.butt_path() or "butt"
+        self._butt_path_configured = False
+        self._startup_finished = False
+
+        with startup_clock.phase("window build"):
+            self.init_ui()
+        with startup_clock.phase("settings load"):
+            self.load_initial_settings()
+
+    def init_ui(self):
+        main_layout = QVBoxLayout()
+        tab_widget = QTabWidget()
+        controller_page = QWidget()
+        controller_layout = QVBoxLayout()
+        controller_page.setLayout(controller_layout)
+        admin_page = QWidget()
+        admin_layout = QVBoxLayout()
+        admin_page.setLayout(admin_layout)
+
+        # Connection & Auth Section
+        connection_auth_group = QGroupBox("Connection & Authentication")
+        connection_auth_layout = QFormLayout()
+
+        self.admin_user_input = QLineEdit("admin")
+        self.admin_password_input = QLineEdit("")
+        self.admin_password_input.setEchoMode(QLineEdit.Password)
+        self.source_password_input = QLineEdit("")
+        self.source_password_input.setEchoMode(QLineEdit.Password)
+        self.relay_password_input = QLineEdit()
+        self.relay_password_input.setEchoMode(QLineEdit.Password)
+        self.host_input = QLineEdit(self.host)
+        self.port_input = QLineEdit(str(self.port))
+        self.port_input.setValidator(None)
+        self.butt_path_input = QLineEdit(self.butt_path)
+
+        connection_auth_layout.addRow("Admin User:", self.admin_user_input)
+        connection_auth_layout.addRow("Admin Password:", self.admin_password_input)
+        connection_auth_layout.addRow("Source Password:", self.source_password_input)
+        connection_auth_layout.addRow("Relay Password (Optional):", self.relay_password_input)
+        connection_auth_layout.addRow("Host:", self.host_input)
+        connection_auth_layout.addRow("Port:", self.port_input)
+        connection_auth_layout.addRow("BUTT Path:", self.butt_path_input)
+
+        self.test_connection_button = QPushButton("Test Connection")
+        self.test_connection_button.clicked.connect(self.test_icecast_connection)
+        connection_auth_layout.addRow(self.test_connection_button)
+
+        connection_auth_group.setLayout(connection_auth_layout)
+        controller_layout.addWidget(connection_auth_group)
+
+        # Stream Info Section
+        stream_info_group = QGroupBox("Stream Information")
+        stream_info_layout = QFormLayout()
+
+        self.stream_title_input = QLineEdit("My Awesome Stream")
+        self.stream_description_input = QLineEdit("A fantastic audio experience")
+        self.stream_genre_input = QLineEdit("Various")
+        self.bitrate_combo = QComboBox()
+        self.bitrate_combo.addItems(["64", "96", "128", "192", "256", "320"])
+        self.bitrate_combo.setCurrentText("128")
+        self.channels_combo = QComboBox()
+        self.channels_combo.addItems(["1", "2"])
+        self.channels_combo.setCurrentText("2")
+        self.samplerate_combo = QComboBox()
+        self.samplerate_combo.addItems(["22050", "44100", "48000"])
+        self.samplerate_combo.setCurrentText("44100")
+        self.mountpoint_input = QLineEdit("/live")
+        self.now_playing_file_input = QLineEdit()
+        self.now_playing_file_input.setPlaceholderText("Track log or playlist to follow (optional)")
+        self.update_metadata_button = QPushButton("Update Metadata")
+        self.update_metadata_button.clicked.connect(self.update_metadata)
+        self.check_mount_button = QPushButton("Check Mount")
+        self.check_mount_button.clicked.connect(self.check_mount_exists)
+        self.probe_stream_button = QPushButton("Probe Stream")
+        self.probe_stream_button.clicked.connect(lambda: self.probe_stream(show_result=True))
+
+        stream_info_layout.addRow("Title:", self.stream_title_input)
+        stream_info_layout.addRow("Description:", self.stream_description_input)
+        stream_info_layout.addRow("Genre:", self.stream_genre_input)
+        stream_info_layout.addRow("Bitrate (kbps):", self.bitrate_combo)
+        stream_info_layout.addRow("Channels:", self.channels_combo)
+        stream_info_layout.addRow("Samplerate (Hz):", self.samplerate_combo)
+        stream_info_layout.addRow("Mountpoint:", self.mountpoint_input)
+        stream_info_layout.addRow("Now Playing File:", self.now_playing_file_input)
+
+        stream_info_group.setLayout(stream_info_layout)
+        controller_layout.addWidget(stream_info_group)
+
+        # Stream Control Section
+        stream_control_group = QGroupBox("Stream Control")
+        stream_control_layout = QHBoxLayout()
+
+        self.start_stream_button = QPushButton("Start Stream")
+        self.start_stream_button.clicked.connect(self.start_stream)
+        self.stop_stream_button = QPushButton("Stop Stream")
+        self.stop_stream_button.clicked.connect(self.stop_stream)
+        self.status_indicator = QLabel("Status: Idle")
+        self.status_indicator.setStyleSheet("color: orange;")
+
+        stream_control_layout.addWidget(self.start_stream_button)
+        stream_control_layout.addWidget(self.stop_stream_button)
+        stream_control_layout.addWidget(self.status_indicator)
+
+        stream_control_group.setLayout(stream_control_layout)
+        controller_layout.addWidget(stream_control_group)
+
+        # Live Stats Section
+        live_stats_group = QGroupBox("Live Statistics")
+        live_stats_layout = QFormLayout()
+
+        self.listeners_label = QLabel("Current: 0")
+        self.peak_listeners_label = QLabel("Peak: 0")
+        self.bytes_sent_label = QLabel("Total Bytes Sent: 0")
+        self.bitrate_label = QLabel("-")
+        self.throughput_label = QLabel("-")
+        self.stream_start_label = QLabel("-")
+        self.stream_health_label = QLabel("Not probed")
+        self.stream_health_label.setWordWrap(True)
+        self.stream_url_label = QLineEdit("http://localhost:8000/live")
+        self.stream_url_label.setReadOnly(True)
+        self.copy_url_button = QPushButton("Copy URL")
+        self.copy_url_button.clicked.connect(self.copy_stream_url)
+        self.open_url_button = QPushButton("Open URL")
+        self.open_url_button.clicked.connect(self.open_stream_url)
+
+        live_stats_layout.addRow("Listeners:", self.listeners_label)
+        live_stats_layout.addRow("Peak Listeners:", self.peak_listeners_label)
+        live_stats_layout.addRow("Bytes Sent:", self.bytes_sent_label)
+        live_stats_layout.addRow("Bitrate:", self.bitrate_label)
+        live_stats_layout.addRow("Throughput:", self.throughput_label)
+        live_stats_layout.addRow("Stream Health:", self.stream_health_label)
+        live_stats_layout.addRow("Stream Start:", self.stream_start_label)
+        self.history_range_combo = QComboBox()
+        self.history_range_combo.addItem("Last hour", 3600)
+        self.history_range_combo.addItem("Last 24 hours", 24 * 3600)
+        self.history_range_combo.addItem("Last 30 days", 30 * 24 * 3600)
+        self.history_range_combo.currentIndexChanged.connect(self.update_history_graph)
+        self.listeners_sparkline = Sparkline()
+        live_stats_layout.addRow("History:", self.history_range_combo)
+        live_stats_layout.addRow("", self.listeners_sparkline)
+        live_stats_layout.addRow("Stream URL:", self.stream_url_label)
+        live_stats_layout.addRow("", self.copy_url_button)
+        live_stats_layout.addRow("", self.open_url_button)
+
+        live_stats_group.setLayout(live_stats_layout)
+        controller_layout.addWidget(live_stats_group)
+
+        # Multi-server Dashboard Section
+        servers_group = QGroupBox("Servers")
+        servers_layout = QVBoxLayout()
+
+        server_form_layout = QHBoxLayout()
+        self.server_name_input = QLineEdit()
+        self.server_name_input.setPlaceholderText("Name")
+        self.server_address_input = QLineEdit()
+        self.server_address_input.setPlaceholderText("host:port")
+        self.server_mounts_input = QLineEdit()
+        self.server_mounts_input.setPlaceholderText("/live, /backup (empty = all)")
+        self.add_server_button = QPushButton("Add Server")
+        self.add_server_button.clicked.connect(self.add_server)
+        self.remove_server_button = QPushButton("Remove Selected")
+        self.remove_server_button.clicked.connect(self.remove_selected_server)
+        server_form_layout.addWidget(self.server_name_input)
+        server_form_layout.addWidget(self.server_address_input)
+        server_form_layout.addWidget(self.server_mounts_input)
+        server_form_layout.addWidget(self.add_server_button)
+        server_form_layout.addWidget(self.remove_server_button)
+
+        self.servers_table = QTableWidget(0, 7)
+        self.servers_table.setHorizontalHeaderLabels(["Server", "Mount", "State", "Listeners", "Peak", "Bitrate", "Bytes Sent"])
+        self.servers_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.servers_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.servers_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.servers_total_label = QLabel("Total listeners: 0")
+
+        servers_layout.addLayout(server_form_layout)
+        servers_layout.addWidget(self.servers_table)
+        servers_layout.addWidget(self.servers_total_label)
+        servers_group.setLayout(servers_layout)
+        controller_layout.addWidget(servers_group)
+
+        # Config Management Section
+        config_management_group = QGroupBox("Configuration Management")
+        config_management_layout = QHBoxLayout()
+
+        self.save_settings_button = QPushButton("Save Settings")
+        self.save_settings_button.clicked.connect(self.save_settings)
+        self.load_settings_button = QPushButton("Load Settings")
+        self.load_settings_button.clicked.connect(self.load_settings)
+
+        config_management_layout.addWidget(self.save_settings_button)
+        config_management_layout.addWidget(self.load_settings_button)
+        self.open_admin_button = QPushButton("Open Admin")
+        self.open_admin_button.clicked.connect(self.open_admin)
+        config_management_layout.addWidget(self.open_admin_button)
+        self.test_admin_button = QPushButton("Test Admin")
+        self.test_admin_button.clicked.connect(self.test_admin)
+        config_management_layout.addWidget(self.test_admin_button)
+
+        config_management_group.setLayout(config_management_layout)
+        admin_layout.addWidget(config_management_group)
+
+        admin_tools_group = QGroupBox("Mount & Metadata")
+        admin_tools_layout = QHBoxLayout()
+        admin_tools_layout.addWidget(self.update_metadata_button)
+        admin_tools_layout.addWidget(self.check_mount_button)
+        admin_tools_layout.addWidget(self.probe_stream_button)
+        admin_tools_group.setLayout(admin_tools_layout)
+        admin_layout.addWidget(admin_tools_group)
+
+        settings_api_group = QGroupBox("Settings API")
+        settings_api_layout = QFormLayout()
+        self.settings_url_field = QLineEdit()
+        self.settings_url_field.setPlaceholderText("Starting...")
+        self.settings_url_field.setReadOnly(True)
+        self.copy_settings_url_button = QPushButton("Copy Settings URL")
+        self.copy_settings_url_button.clicked.connect(self.copy_settings_url)
+        self.open_settings_url_button = QPushButton("Open Settings URL")
+        self.open_settings_url_button.clicked.connect(self.open_settings_url)
+        self.settings_status_label = QLabel("Status: Unknown")
+        self.test_settings_api_button = QPushButton("Test Settings API")
+        self.test_settings_api_button.clicked.connect(self.test_settings_api)
+        settings_api_layout.addRow("URL:", self.settings_url_field)
+        settings_api_layout.addRow("", self.copy_settings_url_button)
+        settings_api_layout.addRow("", self.open_settings_url_button)
+        settings_api_layout.addRow("Status:", self.settings_status_label)
+        settings_api_layout.addRow("", self.test_settings_api_button)
+        self.http_pool_label = QLabel("Requests: 0")
+        settings_api_layout.addRow("Icecast HTTP:", self.http_pool_label)
+        settings_api_group.setLayout(settings_api_layout)
+        admin_layout.addWidget(settings_api_group)
+
+        failover_group = QGroupBox("Failover")
+        failover_layout = QFormLayout()
+        self.failover_enabled_checkbox = QCheckBox("Switch BUTT to the backup when the stream stalls")
+        self.backup_address_input = QLineEdit()
+        self.backup_address_input.setPlaceholderText("host:port (empty = same server)")
+        self.backup_mountpoint_input = QLineEdit()
+        self.backup_mountpoint_input.setPlaceholderText("/backup")
+        self.failover_timeout_input = QLineEdit("10")
+        self.failover_status_label = QLabel("Disabled")
+        failover_layout.addRow(self.failover_enabled_checkbox)
+        failover_layout.addRow("Backup Server:", self.backup_address_input)
+        failover_layout.addRow("Backup Mount:", self.backup_mountpoint_input)
+        failover_layout.addRow("Detect After (s):", self.failover_timeout_input)
+        failover_layout.addRow("Status:", self.failover_status_label)
+        failover_group.setLayout(failover_layout)
+        admin_layout.addWidget(failover_group)
+
+        relays_group = QGroupBox("Relay Topology")
+        relays_layout = QVBoxLayout()
+        relays_form = QFormLayout()
+        self.relays_input = QLineEdit()
+        self.relays_input.setPlaceholderText("edge1:8000:500, edge2:8000 (host:port[:max listeners])")
+        relays_form.addRow("Edge Nodes:", self.relays_input)
+        self.relays_table = QTableWidget(0, 8)
+        self.relays_table.setHorizontalHeaderLabels(["Node", "Role", "Listeners", "Share", "Load", "Lag", "Rate", "State"])
+        self.relays_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.relays_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.relays_total_label = QLabel("No relays configured")
+        self.write_relay_configs_button = QPushButton("Write Relay Configs...")
+        self.write_relay_configs_button.clicked.connect(self.write_relay_configs)
+        relays_layout.addLayout(relays_form)
+        relays_layout.addWidget(self.relays_table)
+        relays_layout.addWidget(self.relays_total_label)
+        relays_layout.addWidget(self.write_relay_configs_button)
+        relays_group.setLayout(relays_layout)
+        admin_layout.addWidget(relays_group)
+
+        analytics_group = QGroupBox("Listener Analytics (access.log)")
+        analytics_layout = QVBoxLayout()
+        analytics_controls = QHBoxLayout()
+        self.analytics_range_combo = QComboBox()
+        self.analytics_range_combo.addItem("Last 24 hours", 24)
+        self.analytics_range_combo.addItem("Last 7 days", 7 * 24)
+        self.analytics_range_combo.addItem("Last 30 days", 30 * 24)
+        self.analytics_range_combo.addItem("All", 0)
+        self.analyze_log_button = QPushButton("Analyze")
+        self.analyze_log_button.clicked.connect(self.analyze_access_log)
+        analytics_controls.addWidget(self.analytics_range_combo)
+        analytics_controls.addWidget(self.analyze_log_button)
+        self.analytics_summary = QPlainTextEdit()
+        self.analytics_summary.setReadOnly(True)
+        self.analytics_summary.setMaximumHeight(140)
+        self.concurrency_sparkline = Sparkline()
+        analytics_layout.addLayout(analytics_controls)
+        analytics_layout.addWidget(self.concurrency_sparkline)
+        analytics_layout.addWidget(self.analytics_summary)
+        analytics_group.setLayout(analytics_layout)
+        admin_layout.addWidget(analytics_group)
+
+        capacity_group = QGroupBox("Capacity Planner")
+        capacity_layout = QVBoxLayout()
+        capacity_form = QFormLayout()
+        self.capacity_listeners_input = QLineEdit()
+        self.capacity_listeners_input.setPlaceholderText("empty = peak from history")
+        self.capacity_headroom_input = QLineEdit(str(int(icecast_config.HEADROOM * 100)))
+        capacity_form.addRow("Peak Listeners:", self.capacity_listeners_input)
+        capacity_form.addRow("Headroom (%):", self.capacity_headroom_input)
+        capacity_buttons = QHBoxLayout()
+        self.plan_capacity_button = QPushButton("Plan")
+        self.plan_capacity_button.clicked.connect(self.plan_capacity)
+        self.write_capacity_button = QPushButton("Write icecast.xml")
+        self.write_capacity_button.clicked.connect(self.write_capacity_config)
+        self.write_capacity_button.setEnabled(False)
+        capacity_buttons.addWidget(self.plan_capacity_button)
+        capacity_buttons.addWidget(self.write_capacity_button)
+        self.capacity_summary = QPlainTextEdit()
+        self.capacity_summary.setReadOnly(True)
+        self.capacity_summary.setMaximumHeight(140)
+        capacity_layout.addLayout(capacity_form)
+        capacity_layout.addLayout(capacity_buttons)
+        capacity_layout.addWidget(self.capacity_summary)
+        capacity_group.setLayout(capacity_layout)
+        admin_layout.addWidget(capacity_group)
+        self.capacity_plan = None
+
+        butt_log_group = QGroupBox("BUTT Process")
+        butt_log_layout = QVBoxLayout()
+        self.butt_status_label = QLabel("Stopped")
+        self.butt_log_view = QPlainTextEdit()
+        self.butt_log_view.setReadOnly(True)
+        self.butt_log_view.setMaximumBlockCount(500)
+        butt_log_layout.addWidget(self.butt_status_label)
+        butt_log_layout.addWidget(self.butt_log_view)
+        butt_log_group.setLayout(butt_log_layout)
+        admin_layout.addWidget(butt_log_group)
+
+        diagnostics_page = QWidget()
+        diagnostics_layout = QVBoxLayout()
+        diagnostics_page.setLayout(diagnostics_layout)
+        self.diagnostics_table = QTableWidget(0, 8)
+        self.diagnostics_table.setHorizontalHeaderLabels(["Operation", "Count", "Failed", "p50 ms", "p95 ms", "p99 ms", "Max ms", "Last Error"])
+        self.diagnostics_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.diagnostics_table.horizontalHeader().setStretchLastSection(True)
+        self.diagnostics_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.diagnostics_table.setSortingEnabled(True)
+        diagnostics_buttons = QHBoxLayout()
+        self.profiler_checkbox = QCheckBox("Sampling profiler")
+        self.profiler_checkbox.toggled.connect(self.toggle_profiler)
+        self.save_profile_button = QPushButton("Save Profile...")
+        self.save_profile_button.clicked.connect(self.save_profile)
+        self.reset_diagnostics_button = QPushButton("Reset")
+        self.reset_diagnostics_button.clicked.connect(self.reset_diagnostics)
+        diagnostics_buttons.addWidget(self.profiler_checkbox)
+        diagnostics_buttons.addWidget(self.save_profile_button)
+        diagnostics_buttons.addWidget(self.reset_diagnostics_button)
+        self.profile_summary = QPlainTextEdit()
+        self.profile_summary.setReadOnly(True)
+        self.profile_summary.setMaximumHeight(160)
+        diagnostics_layout.addWidget(self.diagnostics_table)
+        diagnostics_layout.addLayout(diagnostics_buttons)
+        diagnostics_layout.addWidget(self.profile_summary)
+        self.diagnostics_page = diagnostics_page
+
+        tab_widget.addTab(controller_page, "Stream")
+        tab_widget.addTab(admin_page, "Admin")
+        tab_widget.addTab(diagnostics_page, "Diagnostics")
+        tab_widget.currentChanged.connect(lambda index: self.refresh_diagnostics())
+        self.tab_widget = tab_widget
+
+        main_layout.addWidget(tab_widget)
+
+        self.setLayout(main_layout)
+
+        # Timer for updating live stats; re-armed after every poll with an
+        # interval chosen by the poll scheduler
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setSingleShot(True)
+        self.stats_timer.timeout.connect(self.update_live_stats)
+        self.schedule_next_poll()
+
+        self._loop_probe_at = time.perf_counter()
+        self.loop_probe_timer = QTimer(self)
+        self.loop_probe_timer.timeout.connect(self._probe_event_loop)
+        self.loop_probe_timer.start(EVENT_LOOP_PROBE_MS)
+        self.diagnostics_timer = QTimer(self)
+        self.diagnostics_timer.timeout.connect(self.refresh_diagnostics)
+        self.diagnostics_timer.start(DIAGNOSTICS_REFRESH_MS)
+
+    def test_icecast_connection(self):
+        host = (self.host_input.text() or self.host).strip()
+        try:
+            port = int((self.port_input.text() or str(self.port)).strip())
+        except Exception:
+            port = self.port
+        self.test_connection_button.setEnabled(False)
+        self.network.run(
+            icecast_status.probe_icecast, host, port,
+            on_result=self._on_test_connection_result,
+            on_error=self._on_test_connection_error,
+        )
+
+    def _on_test_connection_result(self, result):
+        self.test_connection_button.setEnabled(True)
+        ok, status_code = result
+        if ok:
+            QMessageBox.information(self, "Test Connection", "Successfully connected to Icecast server!")
+        else:
+            QMessageBox.warning(self, "Test Connection", f"Could not connect to Icecast server. Status code: {status_code}")
+
+    def _on_test_connection_error(self, e):
+        import requests
+        self.test_connection_button.setEnabled(True)
+        if isinstance(e, requests.exceptions.ConnectionError):
+            QMessageBox.critical(self, "Test Connection", "Failed to connect to Icecast server. Is it running?")
+        else:
+            QMessageBox.critical(self, "Test Connection", f"An error occurred: {e}")
+
+    def start_stream(self):
+        if butt_supervisor.running():
+            QMessageBox.warning(self, "Start Stream", "BUTT is already running.")
+            return
+
+        butt_command = build_butt_command(self.collect_settings())
+
+        try:
+            butt_supervisor.start(butt_command)
+            QMessageBox.information(self, "Start Stream", "BUTT started successfully!")
+            # "Streaming" only once a listener connection actually gets audio
+            self.status_indicator.setText("Status: Starting...")
+            self.status_indicator.setStyleSheet("color: orange;")
+            self.poll_soon()
+            QTimer.singleShot(STARTUP_PROBE_DELAY_MS, self.probe_stream)
+        except FileNotFoundError:
+            QMessageBox.critical(self, "Start Stream Error", "BUTT executable not found. Make sure 'butt.exe' is in your system's PATH.")
+        except Exception as e:
+            QMessageBox.critical(self, "Start Stream Error", f"Failed to start BUTT: {e}")
+
+    def stop_stream(self):
+        if butt_supervisor.running():
+            # terminate() plus a bounded wait runs off the GUI thread
+            self.stop_stream_button.setEnabled(False)
+            self.network.run(
+                butt_supervisor.stop,
+                on_result=lambda stopped: self._on_stream_stopped(),
+                on_error=lambda e: self._on_stream_stopped(),
+            )
+        else:
+            butt_supervisor.stop()
+            QMessageBox.warning(self, "Stop Stream", "BUTT is not running.")
+
+    def _on_stream_stopped(self):
+        self.stop_stream_button.setEnabled(True)
+        QMessageBox.information(self, "Stop Stream", "BUTT stopped successfully.")
+        self.status_indicator.setText("Status: Idle")
+        self.status_indicator.setStyleSheet("color: orange;")
+
+    def probe_stream(self, show_result=False):
+        host = (self.host_input.text() or self.host).strip()
+        try:
+            port = int((self.port_input.text() or str(self.port)).strip())
+        except Exception:
+            port = self.port
+        mount = icecast_status.normalize_mount(self.mountpoint_input.text() or "/live")
+        self.probe_stream_button.setEnabled(False)
+        self.stream_health_label.setText("Probing...")
+        self.network.run(
+            stream_probe.probe_stream, host, port, mount,
+            expected_kbps=int(self.bitrate_combo.currentText()),
+            key="stream_probe",
+            on_result=lambda result: self._on_stream_probe(result, show_result),
+        )
+
+    def _on_stream_probe(self, result, show_result):
+        self.probe_stream_button.setEnabled(True)
+        summary = stream_probe.summarize(result)
+        self.stream_health_label.setText(summary)
+        self.stream_health_label.setStyleSheet("color: green;" if result["healthy"] else "color: red;")
+        if butt_supervisor.running():
+            if result["healthy"]:
+                self.status_indicator.setText("Status: Streaming")
+                self.status_indicator.setStyleSheet("color: green;")
+            else:
+                self.status_indicator.setText("Status: BUTT running, no healthy audio on mount")
+                self.status_indicator.setStyleSheet("color: red;")
+        if show_result:
+            if result["healthy"]:
+                QMessageBox.information(self, "Probe Stream", summary)
+            else:
+                QMessageBox.warning(self, "Probe Stream", summary)
+
+    def on_butt_event(self, event, info):
+        if event == "started":
+            # A fresh source connection starts with empty metadata
+            metadata_queue.forget()
+        if event == "exited":
+            self.status_indicator.setText(f"Status: BUTT exited (code {info['code']})")
+            self.status_indicator.setStyleSheet("color: red;")
+        elif event == "restarting":
+            self.status_indicator.setText(f"Status: Restarting BUTT in {info['delay']:g} s")
+            self.status_indicator.setStyleSheet("color: orange;")
+        elif event == "started" and butt_supervisor.restarts:
+            self.status_indicator.setText("Status: Starting...")
+            self.status_indicator.setStyleSheet("color: orange;")
+            self.poll_soon()
+            QTimer.singleShot(STARTUP_PROBE_DELAY_MS, self.probe_stream)
+        elif event == "failed":
+            self.status_indicator.setText("Status: BUTT restart failed")
+            self.status_indicator.setStyleSheet("color: red;")
+        self.update_butt_log()
+
+    def on_failover_event(self, event, info):
+        self.status_indicator.setText(f"Status: Streaming to {info['to']} ({info['reason']})")
+        self.status_indicator.setStyleSheet("color: orange;" if info["to"] == "backup" else "color: green;")
+        self.update_failover_label()
+        self.poll_soon()
+
+    def update_failover_label(self):
+        status = failover_monitor.status()
+        if not status["enabled"]:
+            self.failover_status_label.setText("Disabled")
+            return
+        text = f"On {status['active']} ({status[status['active']]}), {status['failovers']} failovers"
+        if status["last_reason"]:
+            text += f"; last: {status['last_reason']}"
+        self.failover_status_label.setText(text)
+
+    def update_relay_table(self):
+        status = topology_monitor.status()
+        nodes = status["nodes"]
+        self.relays_table.setRowCount(len(nodes))
+        for i, node in enumerate(nodes):
+            values = [
+                node["node"],
+                node["role"],
+                str(node["listeners"]),
+                f"{node['share']}%",
+                "-" if node["load"] is None else f"{node['load']}%",
+                "-" if node["lag"] is None else f"{node['lag']} s",
+                "-" if node["rate_ratio"] is None else f"{node['rate_ratio']:.2f}",
+                node["state"],
+            ]
+            for column, value in enumerate(values):
+                self.relays_table.setItem(i, column, QTableWidgetItem(value))
+        if nodes:
+            self.relays_total_label.setText(
+                f"Total listeners: {status['listeners']} of {status['capacity'] or '?'} across {len(nodes)} nodes")
+
+    def write_relay_configs(self):
+        try:
+            settings = config_store.load()
+        except (OSError, ValueError):
+            settings = {}
+        settings.update(self.collect_settings())
+        if not settings["relays"]:
+            QMessageBox.warning(self, "Relay Topology", "Add at least one edge node first.")
+            return
+        directory = QFileDialog.getExistingDirectory(self, "Write master and edge configs to")
+        if not directory:
+            return
+        base = (settings.get("icecast_config") or "").strip() or icecast_config.ICECAST_XML
+        try:
+            written = relay_topology.write_configs(settings, directory, base)
+        except ValueError as e:
+            QMessageBox.warning(self, "Relay Topology", str(e))
+            return
+        except (OSError, SyntaxError) as e:
+            QMessageBox.critical(self, "Relay Topology", f"Could not write configs: {e}")
+            return
+        QMessageBox.information(self, "Relay Topology", "Wrote:\n" + "\n".join(written))
+
+    def update_butt_log(self):
+        status = butt_supervisor.status()
+        self.butt_status_label.setText(
+            f"{'Running' if status['running'] else 'Stopped'}, pid {status['pid'] or '-'}, "
+            f"restarts {status['restarts']}, last exit code {status['last_exit_code'] if status['last_exit_code'] is not None else '-'}"
+        )
+        self.butt_log_view.setPlainText("\n".join(butt_supervisor.log_tail(200)))
+        self.butt_log_view.verticalScrollBar().setValue(self.butt_log_view.verticalScrollBar().maximum())
+
+    def _probe_event_loop(self):
+        now = time.perf_counter()
+        lag = max(now - self._loop_probe_at - EVENT_LOOP_PROBE_MS / 1000, 0.0)
+        self._loop_probe_at = now
+        latency.observe("gui_event_loop_lag", lag)
+
+    def refresh_diagnostics(self):
+        if self.tab_widget.currentWidget() is not self.diagnostics_page:
+            return
+        summary = latency.summary()
+        self.diagnostics_table.setSortingEnabled(False)
+        self.diagnostics_table.setRowCount(len(summary))
+        for i, (operation, stats) in enumerate(sorted(summary.items())):
+            errors = ", ".join(f"{name} x{n}" for name, n in stats["error_types"].items())
+            values = [operation, stats["count"], stats["failed"], stats["p50_ms"], stats["p95_ms"], stats["p99_ms"],
+                      stats["max_ms"], stats["last_error"] or ""]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                item.setData(Qt.DisplayRole, value)
+                if column == 7 and errors:
+                    item.setToolTip(errors)
+                self.diagnostics_table.setItem(i, column, item)
+        self.diagnostics_table.setSortingEnabled(True)
+        status = profiler.status()
+        if status["samples"]:
+            lines = [f"{status['samples']} samples every {status['interval'] * 1000:g} ms"
+                     + (" (running)" if status["running"] else "")]
+            lines.extend(f"{row['percent']:>5}%  {row['function']}" for row in profiler.top(10))
+            self.profile_summary.setPlainText("\n".join(lines))
+        elif not status["running"]:
+            self.profile_summary.setPlainText("Profiler off. It samples every thread's stack while enabled.")
+
+    def toggle_profiler(self, enabled):
+        if enabled:
+            profiler.start()
+        else:
+            profiler.stop()
+        self.refresh_diagnostics()
+
+    def save_profile(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save collapsed stacks", "profile.folded", "Collapsed stacks (*.folded *.txt)")
+        if not path:
+            return
+        try:
+            with open(path, "w") as f:
+                f.write(profiler.collapsed())
+        except OSError as e:
+            QMessageBox.critical(self, "Save Profile", f"Could not write {path}: {e}")
+
+    def reset_diagnostics(self):
+        latency.reset()
+        profiler.reset()
+        self.refresh_diagnostics()
+
+    def update_live_stats(self):
+        host = (self.host_input.text() or self.host).strip()
+        try:
+            port = int((self.port_input.text() or str(self.port)).strip())
+        except Exception:
+            port = self.port
+        mount = (self.mountpoint_input.text() or "/live").strip()
+        if not mount.startswith("/"):
+            mount = "/" + mount
+        # Skipped while the previous poll is still in flight
+        submitted = self.network.run(
+            icecast_status.fetch_mount_stats, host, port, mount,
+            key="live_stats",
+            on_result=self._on_live_stats,
+            on_error=self._on_live_stats_error,
+        )
+        if submitted is None and not self.stats_timer.isActive():
+            self.schedule_next_poll()
+        self.refresh_dashboard()
+
+    def schedule_next_poll(self):
+        self.stats_timer.start(int(self.poll_scheduler.next_interval() * 1000))
+
+    def poll_soon(self):
+        # Fast polling for a while so changes show up right away
+        self.poll_scheduler.boost()
+        status_cache.invalidate()
+        self.stats_timer.start(0)
+
+    def _on_live_stats_error(self, e):
+        self.update_http_pool_label()
+        self.poll_scheduler.record_failure()
+        self.schedule_next_poll()
+
+    def _on_live_stats(self, stats):
+        self.update_http_pool_label()
+        self.update_butt_log()
+        self.update_failover_label()
+        self.update_relay_table()
+        # Silent failure is preferable to disruptive popups for periodic updates
+        if not stats:
+            self.poll_scheduler.record_failure()
+            self.schedule_next_poll()
+            return
+        self.poll_scheduler.record_success()
+        self.schedule_next_poll()
+        self.listeners_label.setText(f"Current: {stats['listeners']}")
+        self.peak_listeners_label.setText(f"Peak: {stats['peak']}")
+        self.bytes_sent_label.setText(f"Total Bytes Sent: {stats['bytes']}")
+        self.bitrate_label.setText(f"{stats['bitrate']} kbps" if stats["bitrate"] else "-")
+        self.stream_start_label.setText(stats["stream_start"] or "-")
+        self.stream_url_label.setText(stats["listenurl"])
+        self.update_throughput_label()
+        self.update_history_graph()
+
+    def update_throughput_label(self):
+        host = (self.host_input.text() or self.host).strip()
+        try:
+            port = int((self.port_input.text() or str(self.port)).strip())
+        except Exception:
+            port = self.port
+        mount = icecast_status.normalize_mount(self.mountpoint_input.text() or "/live")
+        rate = throughput.rate(host, port, mount)
+        if rate is None:
+            self.throughput_label.setText("-")
+            return
+        estimate = " (estimated)" if rate["estimated"] else ""
+        self.throughput_label.setText(
+            f"{rate['kbps']} kbps{estimate}, {rate['per_listener_kbps']} kbps/listener, "
+            f"~{rate['gb_per_day']} GB/day, ~{rate['gb_per_month']} GB/month"
+        )
+
+    def update_history_graph(self):
+        host = (self.host_input.text() or self.host).strip()
+        try:
+            port = int((self.port_input.text() or str(self.port)).strip())
+        except Exception:
+            port = self.port
+        mount = icecast_status.normalize_mount(self.mountpoint_input.text() or "/live")
+        key = metrics_store.series_key(host, port, mount, "listeners")
+        self.listeners_sparkline.set_points(metrics_store.query(key, self.history_range_combo.currentData()))
+
+    def refresh_dashboard(self):
+        if not self.servers:
+            return
+        if self.network.engine.busy("dashboard"):
+            # Re-poll once the current fan-out lands; the server list may have changed
+            self._dashboard_pending = True
+            return
+        self._dashboard_pending = False
+        self.network.run(
+            icecast_status.poll_servers, [dict(server) for server in self.servers],
+            key="dashboard",
+            on_result=self._on_dashboard_rows,
+            on_error=lambda e: self._on_dashboard_rows(None),
+        )
+
+    def _on_dashboard_rows(self, rows):
+        if self._dashboard_pending:
+            self.refresh_dashboard()
+        if rows is None:
+            return
+        self.servers_table.setRowCount(len(rows))
+        total = 0
+        for i, row in enumerate(rows):
+            listeners = row.get("listeners", 0)
+            total += listeners
+            values = [
+                row["server"], row["mount"], row["state"],
+                str(listeners), str(row.get("peak", 0)),
+                f"{row['bitrate']} kbps" if row.get("bitrate") else "-",
+                str(row.get("bytes", 0)),
+            ]
+            for column, value in enumerate(values):
+                self.servers_table.setItem(i, column, QTableWidgetItem(value))
+        self.servers_total_label.setText(f"Total listeners: {total} across {len(self.servers)} servers")
+
+    def add_server(self):
+        address = self.server_address_input.text().strip()
+        host, _, port = address.rpartition(":")
+        if not host or not port.isdigit():
+            QMessageBox.warning(self, "Add Server", "Enter the server address as host:port.")
+            return
+        mounts = [icecast_status.normalize_mount(m) for m in self.server_mounts_input.text().split(",") if m.strip()]
+        self.servers.append({
+            "name": self.server_name_input.text().strip() or address,
+            "host": host,
+            "port": port,
+            "mounts": mounts,
+        })
+        self.server_name_input.clear()
+        self.server_address_input.clear()
+        self.server_mounts_input.clear()
+        self.refresh_dashboard()
+
+    def remove_selected_server(self):
+        labels = {self.servers_table.item(index.row(), 0).text() for index in self.servers_table.selectionModel().selectedRows()}
+        if not labels:
+            return
+        self.servers = [server for server in self.servers if icecast_status.server_label(server) not in labels]
+        if not self.servers:
+            self.servers_table.setRowCount(0)
+            self.servers_total_label.setText("Total listeners: 0")
+        self.refresh_dashboard()
+
+    def on_status_events(self, events):
+        # The cache also holds dashboard servers, relay edges and the backup
+        # server; only the configured server's mount drives the main status
+        host = (self.host_input.text() or self.host).strip()
+        try:
+            port = int((self.port_input.text() or str(self.port)).strip())
+        except Exception:
+            port = self.port
+        mount = icecast_status.normalize_mount(self.mountpoint_input.text() or "/live")
+        running = butt_supervisor.running()
+        for event in events:
+            if event["server"] != (host, port) or event["mount"] != mount:
+                continue
+            if event["type"] == "listeners":
+                self.listeners_label.setText(f"Current: {event['new']}")
+            elif event["type"] == "mount_removed" and running:
+                self.status_indicator.setText("Status: Streaming (mount offline)")
+                self.status_indicator.setStyleSheet("color: red;")
+            elif event["type"] == "mount_added" and running:
+                self.status_indicator.setText("Status: Streaming")
+                self.status_indicator.setStyleSheet("color: green;")
+
+    def update_http_pool_label(self):
+        pool = icecast_net.http_client.connection_stats()
+        self.http_pool_label.setText(
+            f"Requests: {pool['requests']}, connections opened: {pool['connections_opened']}, "
+            f"reused: {pool['connections_reused']}, avg {pool['avg_latency_ms']} ms, "
+            f"not modified: {status_cache.not_modified}, next poll in {self.poll_scheduler.next_interval():g} s"
+        )
+
+    def copy_stream_url(self):
+        clipboard = QApplication.clipboard()
+        clipboard.setText(self.stream_url_label.text())
+        QMessageBox.information(self, "Copy URL", "Stream URL copied to clipboard!")
+
+    def copy_settings_url(self):
+        clipboard = QApplication.clipboard()
+        clipboard.setText(self.settings_url_field.text())
+        QMessageBox.information(self, "Copy Settings URL", "Settings URL copied to clipboard!")
+
+    def test_settings_api(self):
+        url = self.settings_url_field.text().strip()
+        self.network.run(
+            icecast_net.probe_url, url.replace("/settings", "/"), timeout=3,
+            on_result=lambda result: self._on_settings_api_result(result[0]),
+            on_error=lambda e: self._on_settings_api_result(False),
+        )
+
+    def _on_settings_api_result(self, ok):
+        if ok:
+            self.settings_status_label.setText("Status: Online")
+            self.settings_status_label.setStyleSheet("color: green;")
+            QMessageBox.information(self, "Settings API", "Settings API is reachable.")
+            return
+        self.settings_status_label.setText("Status: Offline")
+        self.settings_status_label.setStyleSheet("color: red;")
+        QMessageBox.warning(self, "Settings API", "Settings API is not reachable.")
+
+    def collect_settings(self):
+        return {
+            "admin_user": self.admin_user_input.text(),
+            "admin_password": self.admin_password_input.text(),
+            "source_password": self.source_password_input.text(),
+            "relay_password": self.relay_password_input.text(),
+            "host": (self.host_input.text() or self.host).strip(),
+            "port": (self.port_input.text() or str(self.port)).strip(),
+            "butt_path": self.butt_path_input.text(),
+            "stream_title": self.stream_title_input.text(),
+            "stream_description": self.stream_description_input.text(),
+            "stream_genre": self.stream_genre_input.text(),
+            "bitrate": self.bitrate_combo.currentText(),
+            "channels": self.channels_combo.currentText(),
+            "samplerate": self.samplerate_combo.currentText(),
+            "mountpoint": (self.mountpoint_input.text() or "/live").strip(),
+            "status_ttl": str(status_cache.ttl),
+            "servers": self.servers,
+            "history_file": metrics_store.history_file or "",
+            "now_playing_file": self.now_playing_file_input.text().strip(),
+            "failover_enabled": self.failover_enabled_checkbox.isChecked(),
+            "backup_host": self.backup_address()[0],
+            "backup_port": self.backup_address()[1],
+            "backup_mountpoint": self.backup_mountpoint_input.text().strip(),
+            "failover_timeout": self.failover_timeout_input.text().strip() or "10",
+            "relays": relay_topology.parse_relays(self.relays_input.text()),
+        }
+
+    def backup_address(self):
+        address = self.backup_address_input.text().strip()
+        host, _, port = address.rpartition(":")
+        if not host or not port.isdigit():
+            return address, ""
+        return host, port
+
+    def save_settings(self):
+        # Keys the window has no field for (api_port, ...) are kept as stored
+        try:
+            settings = config_store.load()
+        except (OSError, ValueError):
+            settings = {}
+        settings.update(self.collect_settings())
+        try:
+            # on_settings_changed skips the GUI's own saves, so failover,
+            # relays and the rest are applied here
+            init_services(config_store.save(settings, source="gui"))
+            QMessageBox.information(self, "Save Settings", "Settings saved successfully!")
+        except ConfigError as e:
+            QMessageBox.warning(self, "Save Settings", "Settings not saved:\n" + "\n".join(e.errors))
+        except Exception as e:
+            QMessageBox.critical(self, "Save Settings Error", f"Failed to save settings: {e}")
+
+    def load_initial_settings(self):
+        # Same as Load Settings but without the dialog on success, which would
+        # hold the window back until it was dismissed
+        try:
+            self.apply_settings(config_store.load())
+        except FileNotFoundError:
+            print(f"No config file found at {self.config_file}. Using default settings.")
+            init_services({})
+        except Exception as e:
+            init_services({})
+            message = f"Failed to load settings: {e}"
+            QTimer.singleShot(0, lambda: QMessageBox.critical(self, "Load Settings Error", message))
+
+    def load_settings(self):
+        try:
+            self.apply_settings(config_store.load())
+            QMessageBox.information(self, "Load Settings", "Settings loaded successfully!")
+        except FileNotFoundError:
+            init_services({})
+            QMessageBox.warning(self, "Load Settings", "No config file found. Using default settings.")
+        except Exception as e:
+            QMessageBox.critical(self, "Load Settings Error", f"Failed to load settings: {e}")
+
+    def on_settings_changed(self, settings, source):
+        # Saved through /settings or edited on disk while the window is open
+        if source == "gui":
+            return
+        self.apply_settings(settings)
+        self.refresh_dashboard()
+        self.poll_soon()
+
+    def apply_settings(self, settings):
+        self.admin_user_input.setText(settings.get("admin_user", "admin"))
+        self.admin_password_input.setText(settings.get("admin_password", ""))
+        self.source_password_input.setText(settings.get("source_password", ""))
+        self.relay_password_input.setText(settings.get("relay_password", ""))
+        self.host_input.setText(settings.get("host", self.host))
+        self.port_input.setText(settings.get("port", str(self.port)))
+        self._butt_path_configured = "butt_path" in settings
+        self.butt_path_input.setText(settings.get("butt_path", self.butt_path))
+        self.stream_title_input.setText(settings.get("stream_title", "My Awesome Stream"))
+        self.stream_description_input.setText(settings.get("stream_description", "A fantastic audio experience"))
+        self.stream_genre_input.setText(settings.get("stream_genre", "Various"))
+        self.bitrate_combo.setCurrentText(settings.get("bitrate", "128"))
+        self.channels_combo.setCurrentText(settings.get("channels", "2"))
+        self.samplerate_combo.setCurrentText(settings.get("samplerate", "44100"))
+        self.mountpoint_input.setText(settings.get("mountpoint", "/live"))
+        self.now_playing_file_input.setText(settings.get("now_playing_file", ""))
+        self.failover_enabled_checkbox.setChecked(bool(settings.get("failover_enabled", False)))
+        backup_host = settings.get("backup_host", "")
+        backup_port = settings.get("backup_port", "")
+        self.backup_address_input.setText(f"{backup_host}:{backup_port}" if backup_host and backup_port else backup_host)
+        self.backup_mountpoint_input.setText(settings.get("backup_mountpoint", ""))
+        self.failover_timeout_input.setText(str(settings.get("failover_timeout", "10")))
+        self.servers = [server for server in settings.get("servers", []) if server.get("host") and server.get("port")]
+        self.relays_input.setText(relay_topology.format_relays(settings.get("relays", [])))
+        init_services(settings)
+        try:
+            host = (self.host_input.text() or self.host).strip()
+            port = int((self.port_input.text() or str(self.port)).strip())
+        except Exception:
+            host = self.host
+            port = self.port
+        mount = (self.mountpoint_input.text() or "/live").strip()
+        if not mount.startswith("/"):
+            mount = "/" + mount
+        self.stream_url_label.setText(f"http://{host}:{port}{mount}")
+
+    def analyze_access_log(self):
+        hours = self.analytics_range_combo.currentData()
+        since = time.time() - hours * 3600 if hours else None
+        resolution = 300 if hours and hours <= 24 else 3600
+        self.analyze_log_button.setEnabled(False)
+        self.analytics_summary.setPlainText("Reading access.log...")
+        self.network.run(
+            self._analyze_access_log, since, resolution,
+            key="access_log",
+            on_result=self._on_access_log_report,
+            on_error=self._on_access_log_error,
+        )
+
+    def _analyze_access_log(self, since, resolution):
+        added = access_log.update()
+        return added, access_log.report(since=since, resolution=resolution)
+
+    def _on_access_log_report(self, result):
+        self.analyze_log_button.setEnabled(True)
+        added, report = result
+        self.concurrency_sparkline.set_points(report["concurrency"])
+        if not report["sessions"]:
+            self.analytics_summary.setPlainText(f"No listener sessions found in {access_log.path} ({added} new).")
+            return
+        lines = [
+            f"Sessions: {report['sessions']} ({added} new), {report['listener_hours']} listener-hours, peak {report['peak_concurrent']} concurrent",
+            f"Duration: avg {report['duration_avg']:.0f} s, median {report['duration_p50']} s, p90 {report['duration_p90']} s",
+            f"Per session: avg {report['bytes_per_session_avg'] / 1e6:.1f} MB, total {report['bytes_total'] / 1e9:.2f} GB",
+            "Mounts: " + ", ".join(f"{m} {n}" for m, n in report["mounts"].items()),
+            "Top agents: " + "; ".join(f"{a[:40]} ({n})" for a, n in report["top_agents"][:5]),
+            "Top referrers: " + ("; ".join(f"{r} ({n})" for r, n in report["top_referrers"][:5]) or "none"),
+        ]
+        self.analytics_summary.setPlainText("\n".join(lines))
+
+    def _on_access_log_error(self, e):
+        self.analyze_log_button.setEnabled(True)
+        self.analytics_summary.setPlainText(f"Could not read access log: {e}")
+
+    def plan_capacity(self):
+        try:
+            listeners = int(self.capacity_listeners_input.text()) if self.capacity_listeners_input.text().strip() else None
+            headroom = float(self.capacity_headroom_input.text() or 0) / 100
+        except ValueError:
+            QMessageBox.warning(self, "Capacity Planner", "Peak listeners and headroom must be numbers.")
+            return
+        try:
+            settings = config_store.load()
+        except (OSError, ValueError):
+            settings = {}
+        settings.update(self.collect_settings())
+        self.capacity_plan = icecast_config.plan_for_settings(
+            settings, listeners, headroom, icecast_config.history_peaks(metrics_store))
+        self.capacity_summary.setPlainText(icecast_config.summarize(self.capacity_plan))
+        self.write_capacity_button.setEnabled(True)
+
+    def write_capacity_config(self):
+        if self.capacity_plan is None:
+            return
+        path = self.capacity_plan["base"]
+        try:
+            icecast_config.write(icecast_config.render(self.capacity_plan, path), path)
+        except (OSError, SyntaxError) as e:
+            QMessageBox.critical(self, "Capacity Planner", f"Could not write {path}: {e}")
+            return
+        QMessageBox.information(self, "Capacity Planner", f"Wrote {path}. Restart Icecast to apply the new limits.")
+
+    def open_stream_url(self):
+        url = self.stream_url_label.text().strip()
+        if url:
+            webbrowser.open(url)
+
+    def open_settings_url(self):
+        url = self.settings_url_field.text().strip()
+        if url:
+            webbrowser.open(url)
+
+    def check_mount_exists(self):
+        host = (self.host_input.text() or self.host).strip()
+        try:
+            port = int((self.port_input.text() or str(self.port)).strip())
+        except Exception:
+            port = self.port
+        mount = (self.mountpoint_input.text() or "/live").strip()
+        if not mount.startswith("/"):
+            mount = "/" + mount
+        self.check_mount_button.setEnabled(False)
+        self.network.run(
+            icecast_status.mount_is_active, host, port, mount,
+            on_result=lambda result: self._on_check_mount_result(mount, result),
+            on_error=self._on_check_mount_error,
+        )
+
+    def _on_check_mount_result(self, mount, result):
+        self.check_mount_button.setEnabled(True)
+        status_code, found = result
+        if status_code >= 400:
+            QMessageBox.warning(self, "Check Mount", f"Failed to fetch status. Code: {status_code}")
+        elif found:
+            QMessageBox.information(self, "Check Mount", f"Mount {mount} is active.")
+        else:
+            QMessageBox.warning(self, "Check Mount", f"Mount {mount} not found or inactive.")
+
+    def _on_check_mount_error(self, e):
+        self.check_mount_button.setEnabled(True)
+        QMessageBox.critical(self, "Check Mount Error", f"Error checking mount: {e}")
+
+    def update_metadata(self):
+        host = (self.host_input.text() or self.host).strip()
+        try:
+            port = int((self.port_input.text() or str(self.port)).strip())
+        except Exception:
+            port = self.port
+        mount = (self.mountpoint_input.text() or "/live").strip()
+        if not mount.startswith("/"):
+            mount = "/" + mount
+        title = self.stream_title_input.text().strip()
+        description = self.stream_description_input.text().strip()
+        genre = self.stream_genre_input.text().strip()
+        admin_user = self.admin_user_input.text().strip()
+        admin_pass = self.admin_password_input.text()
+        source_pass = self.source_password_input.text()
+        self.update_metadata_button.setEnabled(False)
+        self.network.watch(
+            metadata_queue.submit(host, port, mount, title, description, genre, (admin_user, admin_pass), source_pass),
+            on_result=self._on_metadata_result,
+            on_error=self._on_metadata_error,
+        )
+
+    def _on_metadata_result(self, result):
+        self.update_metadata_button.setEnabled(True)
+        if result is None:
+            QMessageBox.information(self, "Update Metadata", "Metadata unchanged, nothing sent.")
+            return
+        (ok1, code1), (ok2, code2) = result
+        if ok1 or ok2:
+            self.poll_soon()
+            QMessageBox.information(self, "Update Metadata", "Metadata updated.")
+        else:
+            QMessageBox.warning(self, "Update Metadata", f"Failed. Codes: {code1}, {code2}")
+
+    def _on_metadata_error(self, e):
+        self.update_metadata_button.setEnabled(True)
+        QMessageBox.critical(self, "Update Metadata Error", f"Error updating metadata: {e}")
+
+    def open_admin(self):
+        host = (self.host_input.text() or self.host).strip()
+        try:
+            port = int((self.port_input.text() or str(self.port)).strip())
+        except Exception:
+            port = self.port
+        url = f"http://{host}:{port}/admin"
+        self.network.run(
+            icecast_net.probe_url, url,
+            on_result=lambda result: self._on_open_admin_probe(url, result),
+            on_error=lambda e: self._open_admin_browser(url),
+        )
+
+    def _on_open_admin_probe(self, url, result):
+        ok, status_code = result
+        if not ok:
+            QMessageBox.warning(self, "Open Admin", f"Admin unreachable (code {status_code}). Opening browser anyway.")
+        self._open_admin_browser(url)
+
+    def _open_admin_browser(self, url):
+        opened = webbrowser.open(url)
+        if not opened:
+            clipboard = QApplication.clipboard()
+            clipboard.setText(url)
+            QMessageBox.information(self, "Open Admin", "Failed to open browser. URL copied to clipboard.")
+
+    def test_admin(self):
+        host = (self.host_input.text() or self.host).strip()
+        try:
+            port = int((self.port_input.text() or str(self.port)).strip())
+        except Exception:
+            port = self.port
+        url = f"http://{host}:{port}/admin"
+        self.test_admin_button.setEnabled(False)
+        self.network.run(
+            icecast_net.probe_url, url,
+            on_result=self._on_test_admin_result,
+            on_error=self._on_test_admin_error,
+        )
+
+    def _on_test_admin_result(self, result):
+        self.test_admin_button.setEnabled(True)
+        ok, status_code = result
+        if ok:
+            QMessageBox.information(self, "Test Admin", "Admin is reachable.")
+        else:
+            QMessageBox.warning(self, "Test Admin", f"Admin responded with status {status_code}.")
+
+    def _on_test_admin_error(self, e):
+        import requests
+        self.test_admin_button.setEnabled(True)
+        if isinstance(e, requests.exceptions.ConnectionError):
+            QMessageBox.critical(self, "Test Admin", "Failed to connect to Admin. Is Icecast running?")
+        else:
+            QMessageBox.critical(self, "Test Admin", f"Error testing Admin: {e}")
+
+    def showEvent(self, event):
+        self.poll_scheduler.set_visible(True)
+        super().showEvent(event)
+        if not self._startup_finished:
+            self._startup_finished = True
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        # Runs once the window is on screen: the settings API (and Flask with
+        # it) and the BUTT search start on worker threads instead of holding
+        # back the first paint
+        startup_clock.mark("window shown")
+        self.network.run(self._start_api, on_result=self._on_api_started)
+        self.network.run(startup_cache.discover_butt_path, on_result=self._on_butt_path_discovered)
+
+    def _start_api(self):
+        with startup_clock.phase("api start"):
+            from icecast_api import api_server, run_server
+            try:
+                settings = config_store.load()
+            except (OSError, ValueError):
+                settings = {}
+            run_server(settings)
+        return api_server.url("/settings")
+
+    def _on_api_started(self, url):
+        self.settings_url_field.setText(url)
+
+    def _on_butt_path_discovered(self, path):
+        # Only a default shown in the field is replaced, never a configured path
+        if not self._butt_path_configured and self.butt_path_input.text() == self.butt_path:
+            self.butt_path_input.setText(path)
+        self.butt_path = path
+
+    def hideEvent(self, event):
+        self.poll_scheduler.set_visible(False)
+        super().hideEvent(event)
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.WindowStateChange:
+            visible = not self.isMinimized()
+            self.poll_scheduler.set_visible(visible)
+            if visible and self.stats_timer.remainingTime() > self.poll_scheduler.next_interval() * 1000:
+                self.schedule_next_poll()
+        super().changeEvent(event)
+
+    def closeEvent(self, event):
+        self.stats_timer.stop()
+        self.loop_probe_timer.stop()
+        self.diagnostics_timer.stop()
+        profiler.stop()
+        status_cache.unsubscribe(self._status_listener)
+        butt_supervisor.unsubscribe(self._butt_listener)
+        config_store.unsubscribe(self._settings_listener)
+        config_store.stop()
+        failover_monitor.unsubscribe(self._failover_listener)
+        failover_monitor.stop()
+        topology_monitor.stop()
+        now_playing_feed.unsubscribe(self._now_playing_listener)
+        now_playing_feed.stop()
+        metadata_queue.close()
+        self.network.engine.shutdown()
+        icecast_net.http_client.close()
+        super().closeEvent(event)
@@ -0,0 +1,143 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import icecast_net
+from icecast_status import normalize_mount
+
+METADATA_DEBOUNCE = 0.5
+METADATA_CONCURRENCY = 8
+
+
+class MetadataQueue:
+    # Collects metadata updates per (host, port, mount) and pushes them from
+    # one worker thread. A burst of title changes within `debounce` seconds
+    # collapses into a single push of the newest one, pushes that would
+    # repeat what a mount already has are skipped, and whatever is due at the
+    # same time goes out together across servers.
+    def __init__(self, debounce=METADATA_DEBOUNCE, max_workers=METADATA_CONCURRENCY):
+        self.debounce = debounce
+        self.max_workers = max_workers
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._sent = {}
+        self._thread = None
+        self._closed = False
+        self.pushed = 0
+        self.skipped = 0
+        self.coalesced = 0
+
+    def submit(self, host, port, mount, title, description="", genre="", admin_auth=None, source_pass="",
+               force=False, debounce=None):
+        # Returns a Future resolving to push_metadata's result, or None when
+        # the push was skipped as unchanged. Updates superseded by a newer one
+        # for the same mount resolve with the newer one's result.
+        future = Future()
+        key = (host, port, normalize_mount(mount))
+        payload = (title or "", description or "", genre or "")
+        due = time.monotonic() + (self.debounce if debounce is None else debounce)
+        with self._cond:
+            if self._closed:
+                future.set_exception(RuntimeError("metadata queue closed"))
+                return future
+            entry = self._pending.get(key)
+            if entry is not None:
+                self.coalesced += 1
+                futures = entry["futures"]
+                force = force or entry["force"]
+            else:
+                futures = []
+            futures.append(future)
+            self._pending[key] = {
+                "payload": payload,
+                "auth": (admin_auth, source_pass),
+                "force": force,
+                "due": due,
+                "futures": futures,
+            }
+            self._ensure_worker()
+            self._cond.notify()
+        return future
+
+    def forget(self, host=None, port=None):
+        # Drops the remembered "already sent" payloads, e.g. after a source
+        # reconnect where Icecast starts the mount with empty metadata.
+        with self._cond:
+            for key in list(self._sent):
+                if (host is None or key[0] == host) and (port is None or key[1] == port):
+                    del self._sent[key]
+
+    def stats(self):
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "pushed": self.pushed,
+                "skipped": self.skipped,
+                "coalesced": self.coalesced,
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._cond.notify()
+        for entry in pending:
+            for future in entry["futures"]:
+                future.cancel()
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="icecast-metadata-queue", daemon=True)
+            self._thread.start()
+
+    def _take_due(self):
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                due = [key for key, entry in self._pending.items() if entry["due"] <= now]
+                if due:
+                    batch = []
+                    for key in due:
+                        entry = self._pending.pop(key)
+                        if not entry["force"] and self._sent.get(key) == entry["payload"]:
+                            self.skipped += 1
+                            for future in entry["futures"]:
+                                future.set_result(None)
+                            continue
+                        batch.append((key, entry))
+                    if batch:
+                        return batch
+                    continue
+                if self._pending:
+                    self._cond.wait(min(entry["due"] for entry in self._pending.values()) - now)
+                else:
+                    self._cond.wait()
+            return None
+
+    def _run(self):
+        while True:
+            batch = self._take_due()
+            if batch is None:
+                return
+            results = icecast_net.fan_out(self._push, batch, self.max_workers)
+            with self._cond:
+                for (key, entry), result, error in results:
+                    if error is None and (result[0][0] or result[1][0]):
+                        self._sent[key] = entry["payload"]
+                        self.pushed += 1
+            for (key, entry), result, error in results:
+                for future in entry["futures"]:
+                    if error is not None:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(result)
+
+    def _push(self, item):
+        (host, port, mount), entry = item
+        title, description, genre = entry["payload"]
+        admin_auth, source_pass = entry["auth"]
+        return icecast_net.push_metadata(host, port, mount, title, description, genre, admin_auth, source_pass)
+
+
+metadata_queue = MetadataQueue()
@@ -0,0 +1,602 @@
+import os
+import sys
+import threading
+import time
+from array import array
+from collections import Counter, deque
+
+RAW_CAPACITY = 720        # 1 hour of 5 s polls
+MINUTE_CAPACITY = 1440    # 24 hours
+HOUR_CAPACITY = 720       # 30 days
+HISTORY_RETENTION = 30 * 24 * 3600
+
+
+class RingBuffer:
+    # Fixed-size (timestamp, value) storage in two flat arrays: ~16 bytes per
+    # sample, no per-sample Python objects, oldest samples overwritten.
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._times = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, t, value):
+        end = (self._start + self._size) % self.capacity
+        self._times[end] = t
+        self._values[end] = value
+        if self._size < self.capacity:
+            self._size += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+
+    def first(self):
+        if not self._size:
+            return None
+        return self._times[self._start], self._values[self._start]
+
+    def last(self):
+        if not self._size:
+            return None
+        i = (self._start + self._size - 1) % self.capacity
+        return self._times[i], self._values[i]
+
+    def items(self, since=None):
+        out = []
+        for n in range(self._size):
+            i = (self._start + n) % self.capacity
+            t = self._times[i]
+            if since is None or t >= since:
+                out.append((t, self._values[i]))
+        return out
+
+
+class DownsampledTier:
+    # Averages samples into fixed buckets (60 s, 3600 s) and keeps the
+    # finished buckets in a ring buffer.
+    def __init__(self, resolution, capacity):
+        self.resolution = resolution
+        self.buffer = RingBuffer(capacity)
+        self._bucket = None
+        self._sum = 0.0
+        self._count = 0
+
+    def add(self, t, value):
+        bucket = int(t // self.resolution)
+        closed = None
+        if self._bucket is not None and bucket != self._bucket:
+            closed = self.flush()
+        self._bucket = bucket
+        self._sum += value
+        self._count += 1
+        return closed
+
+    def flush(self):
+        if self._bucket is None or not self._count:
+            return None
+        closed = (self._bucket * self.resolution, self._sum / self._count)
+        self.buffer.append(*closed)
+        self._bucket = None
+        self._sum = 0.0
+        self._count = 0
+        return closed
+
+    def items(self, since=None):
+        out = self.buffer.items(since)
+        if self._count:
+            out.append((self._bucket * self.resolution, self._sum / self._count))
+        return out
+
+
+class MetricSeries:
+    def __init__(self):
+        self.raw = RingBuffer(RAW_CAPACITY)
+        self.minute = DownsampledTier(60, MINUTE_CAPACITY)
+        self.hour = DownsampledTier(3600, HOUR_CAPACITY)
+
+    def add(self, t, value):
+        self.raw.append(t, value)
+        closed = self.minute.add(t, value)
+        if closed is not None:
+            self.hour.add(*closed)
+        return closed
+
+    def add_minute(self, t, value):
+        # Replay of a persisted 1-minute average
+        self.minute.buffer.append(t, value)
+        self.hour.add(t, value)
+
+    def absorb(self, live):
+        # Takes over a series recorded while this one was replayed. Minutes
+        # it closed during the replay may already be in the file, so only
+        # those after the last replayed one are added again.
+        last = self.minute.buffer.last()
+        for t, value in live.minute.buffer.items():
+            if last is None or t > last[0]:
+                self.add_minute(t, value)
+        self.raw = live.raw
+        self.minute._bucket = live.minute._bucket
+        self.minute._sum = live.minute._sum
+        self.minute._count = live.minute._count
+
+    def query(self, window, now=None):
+        now = time.time() if now is None else now
+        since = now - window
+        if window <= RAW_CAPACITY * 5:
+            # Raw samples when they cover the window, or when nothing older exists
+            oldest = self.raw.first()
+            older = self.minute.buffer.first()
+            if oldest is not None and (oldest[0] <= since or older is None or older[0] >= oldest[0]):
+                return self.raw.items(since)
+        if window <= MINUTE_CAPACITY * 60:
+            return self.minute.items(since)
+        return self.hour.items(since)
+
+
+class MetricsStore:
+    def __init__(self, history_file=None):
+        self.history_file = history_file
+        self._lock = threading.Lock()
+        self._series = {}
+        # Files already replayed; switching away and back must not add the
+        # same samples twice, and later lines were written from memory anyway
+        self._loaded = set()
+
+    def series_key(self, host, port, mount, metric):
+        return f"{host}:{port}{mount}|{metric}"
+
+    def _get_series(self, key):
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = MetricSeries()
+        return series
+
+    def record(self, key, value, t=None):
+        t = time.time() if t is None else t
+        with self._lock:
+            closed = self._get_series(key).add(t, float(value))
+        if closed is not None:
+            self._persist(key, closed)
+
+    def record_snapshot(self, snapshot):
+        if not snapshot.ok:
+            return
+        t = time.time()
+        for mount, record in snapshot.mounts.items():
+            self.record(self.series_key(snapshot.host, snapshot.port, mount, "listeners"), record.listeners, t)
+            self.record(self.series_key(snapshot.host, snapshot.port, mount, "bytes"), record.bytes, t)
+
+    def query(self, key, window):
+        with self._lock:
+            series = self._series.get(key)
+            return series.query(window) if series is not None else []
+
+    def keys(self):
+        with self._lock:
+            return list(self._series)
+
+    def _persist(self, key, sample):
+        # Only finished 1-minute averages hit the disk: one short line per
+        # series per minute, appended, never rewritten in place.
+        if not self.history_file:
+            return
+        try:
+            with open(self.history_file, "a") as f:
+                f.write(f"{sample[0]:.0f}\t{sample[1]:.3f}\t{key}\n")
+        except OSError as e:
+            print(f"History write error: {e}")
+
+    def load(self, history_file=None):
+        if history_file is not None:
+            self.history_file = history_file
+        return self._replay(self.history_file)
+
+    def _replay(self, history_file):
+        if not history_file:
+            return 0
+        path = os.path.abspath(history_file)
+        with self._lock:
+            if path in self._loaded:
+                return 0
+            self._loaded.add(path)
+        if not os.path.exists(path):
+            return 0
+        cutoff = time.time() - HISTORY_RETENTION
+        loaded = 0
+        stale = 0
+        # Parsed into series of its own so queries and polls aren't held up
+        # for the whole file; only the swap below takes the lock
+        replayed = {}
+        with open(path, "r") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t", 2)
+                if len(parts) != 3:
+                    continue
+                try:
+                    t = float(parts[0])
+                    value = float(parts[1])
+                except ValueError:
+                    continue
+                if t < cutoff:
+                    stale += 1
+                    continue
+                series = replayed.get(parts[2])
+                if series is None:
+                    series = replayed[parts[2]] = MetricSeries()
+                series.add_minute(t, value)
+                loaded += 1
+        with self._lock:
+            for key, series in replayed.items():
+                live = self._series.get(key)
+                if live is not None:
+                    series.absorb(live)
+                self._series[key] = series
+        if stale > loaded:
+            self._compact(path, cutoff)
+        return loaded
+
+    def load_in_background(self, history_file):
+        # The file can hold a month of samples; the caller (the GUI thread
+        # while the window is built) only waits for the name to switch
+        self.history_file = history_file
+        thread = threading.Thread(target=self._load_quietly, args=(history_file,), name="history-load", daemon=True)
+        thread.start()
+        return thread
+
+    def _load_quietly(self, history_file):
+        try:
+            self._replay(history_file)
+        except OSError as e:
+            print(f"History load error: {e}")
+
+    def _compact(self, path, cutoff):
+        tmp = path + ".tmp"
+        with open(path, "r") as src, open(tmp, "w") as dst:
+            for line in src:
+                try:
+                    if float(line.split("\t", 1)[0]) >= cutoff:
+                        dst.write(line)
+                except ValueError:
+                    continue
+        os.replace(tmp, path)
+
+
+metrics_store = MetricsStore()
+
+
+class ThroughputTracker:
+    # Turns the cumulative byte counter of each mount into a rate. A counter
+    # that goes backwards or a new stream_start means the source reconnected;
+    # that interval is skipped instead of producing a huge or negative rate.
+    def __init__(self, smoothing=0.3):
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._last = {}
+        self._rates = {}
+
+    def record_snapshot(self, snapshot):
+        # A 304 repeats the previous document; its counters say nothing new
+        if not snapshot.ok or snapshot.status_code == 304:
+            return
+        with self._lock:
+            for mount, record in snapshot.mounts.items():
+                self._record(f"{snapshot.host}:{snapshot.port}{mount}", record, snapshot.fetched_at)
+
+    def _record(self, key, record, t):
+        previous = self._last.get(key)
+        self._last[key] = (t, record.bytes, record.stream_start)
+        rate = self._rates.get(key)
+        if rate is None:
+            rate = self._rates[key] = {"bytes_per_sec": 0.0, "listeners": 0, "bitrate": 0, "resets": 0, "measured": False}
+        rate["listeners"] = record.listeners
+        rate["bitrate"] = record.bitrate
+        if previous is None:
+            return
+        prev_t, prev_bytes, prev_start = previous
+        dt = t - prev_t
+        if dt <= 0:
+            return
+        if record.bytes < prev_bytes or (record.stream_start and record.stream_start != prev_start):
+            rate["resets"] += 1
+            return
+        if not record.bytes:
+            return
+        current = (record.bytes - prev_bytes) / dt
+        if rate["measured"]:
+            current = self.smoothing * current + (1 - self.smoothing) * rate["bytes_per_sec"]
+        rate["bytes_per_sec"] = current
+        rate["measured"] = True
+
+    def rates(self):
+        out = {}
+        with self._lock:
+            items = [(key, dict(rate)) for key, rate in self._rates.items()]
+        for key, rate in items:
+            bytes_per_sec = rate["bytes_per_sec"]
+            if not rate["measured"]:
+                # No byte counter from the server: estimate from bitrate x listeners
+                bytes_per_sec = rate["bitrate"] * 1000 / 8 * rate["listeners"]
+            listeners = rate["listeners"]
+            out[key] = {
+                "bytes_per_sec": round(bytes_per_sec, 1),
+                "kbps": round(bytes_per_sec * 8 / 1000, 1),
+                "per_listener_kbps": round(bytes_per_sec * 8 / 1000 / listeners, 1) if listeners else 0.0,
+                "listeners": listeners,
+                "estimated": not rate["measured"],
+                "counter_resets": rate["resets"],
+                "gb_per_day": round(bytes_per_sec * 86400 / 1e9, 2),
+                "gb_per_month": round(bytes_per_sec * 86400 * 30 / 1e9, 1),
+            }
+        return out
+
+    def rate(self, host, port, mount):
+        return self.rates().get(f"{host}:{port}{mount}")
+
+
+throughput = ThroughputTracker()
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LATENCY_WINDOW = 512
+PROFILE_INTERVAL = 0.005
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.last = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+        self.last = seconds
+
+
+class LatencyRecorder:
+    # Durations and outcomes per operation. The histograms feed /metrics; a
+    # window of the most recent samples per operation gives p50/p95/p99 for
+    # the Diagnostics panel, and failures are counted by exception type.
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._recent = {}
+        self._last = {}
+        self._errors = {}
+        self._last_error = {}
+
+    def observe(self, operation, seconds, outcome="ok", error=None):
+        with self._lock:
+            key = (operation, outcome)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.observe(seconds)
+            recent = self._recent.get(operation)
+            if recent is None:
+                recent = self._recent[operation] = deque(maxlen=self.window)
+            recent.append(seconds)
+            self._last[operation] = seconds
+            if error is not None:
+                name = error if isinstance(error, str) else type(error).__name__
+                self._errors.setdefault(operation, Counter())[name] += 1
+                self._last_error[operation] = (time.time(), name if isinstance(error, str) else f"{name}: {error}")
+
+    def timer(self, operation):
+        return _Timer(self, operation)
+
+    def histograms(self):
+        with self._lock:
+            return {key: (list(h.counts), h.count, h.sum, h.last, h.buckets) for key, h in self._histograms.items()}
+
+    def summary(self):
+        with self._lock:
+            recent = {op: sorted(samples) for op, samples in self._recent.items()}
+            outcomes = {}
+            for (operation, outcome), h in self._histograms.items():
+                outcomes.setdefault(operation, {})[outcome] = h.count
+            last = dict(self._last)
+            errors = {op: dict(c) for op, c in self._errors.items()}
+            last_error = dict(self._last_error)
+        result = {}
+        for operation, samples in recent.items():
+            counts = outcomes.get(operation, {})
+            result[operation] = {
+                "count": sum(counts.values()),
+                "failed": sum(n for outcome, n in counts.items() if outcome != "ok"),
+                "outcomes": counts,
+                "error_types": errors.get(operation, {}),
+                "last_error": last_error[operation][1] if operation in last_error else None,
+                "last_error_at": last_error[operation][0] if operation in last_error else None,
+                "p50_ms": round(_quantile(samples, 0.50) * 1000, 2),
+                "p95_ms": round(_quantile(samples, 0.95) * 1000, 2),
+                "p99_ms": round(_quantile(samples, 0.99) * 1000, 2),
+                "max_ms": round(samples[-1] * 1000, 2) if samples else 0.0,
+                "last_ms": round(last.get(operation, 0.0) * 1000, 2),
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._recent.clear()
+            self._last.clear()
+            self._errors.clear()
+            self._last_error.clear()
+
+
+def _quantile(sorted_samples, q):
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(int(len(sorted_samples) * q), len(sorted_samples) - 1)]
+
+
+class _Timer:
+    # with latency.timer("op") as t: ... records the duration as "ok", or as
+    # "error" with the exception type if the block raises; set t.outcome to
+    # report something else (e.g. "http_error")
+    def __init__(self, recorder, operation):
+        self.recorder = recorder
+        self.operation = operation
+        self.outcome = "ok"
+        self.error = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.outcome, self.error = "error", exc
+        self.recorder.observe(self.operation, time.perf_counter() - self.started, self.outcome, self.error)
+        return False
+
+
+latency = LatencyRecorder()
+
+
+class SamplingProfiler:
+    # Off by default. While running, a background thread snapshots every
+    # thread's stack (sys._current_frames) each `interval` seconds and counts
+    # identical stacks, so the cost is one frame walk per thread per sample
+    # and nothing at all while stopped. collapsed() is the "a;b;c count"
+    # format flame graph tools read.
+    def __init__(self, interval=PROFILE_INTERVAL, max_depth=48):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self._stacks = Counter()
+        self._samples = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self.started_at = None
+
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=None):
+        if interval:
+            self.interval = max(float(interval), 0.001)
+        if self.running():
+            return
+        self._stop.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self._samples = 0
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            sample = Counter()
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                sample[";".join(reversed(stack))] += 1
+            with self._lock:
+                self._stacks.update(sample)
+                self._samples += 1
+
+    def status(self):
+        with self._lock:
+            samples = self._samples
+        return {"running": self.running(), "interval": self.interval, "samples": samples, "started_at": self.started_at}
+
+    def collapsed(self):
+        with self._lock:
+            return "".join(f"{stack} {n}\n" for stack, n in self._stacks.most_common())
+
+    def top(self, n=20):
+        # Functions by share of samples in which they were on top of a stack,
+        # idle waits left out so the busy code stands out
+        leaves = Counter()
+        with self._lock:
+            samples = self._samples
+            for stack, count in self._stacks.items():
+                leaf = stack.rsplit(";", 1)[-1]
+                if tuple(leaf.split(":", 1)) not in _IDLE_FRAMES:
+                    leaves[leaf] += count
+        return [{"function": leaf, "samples": count, "percent": round(count * 100 / samples, 1) if samples else 0.0}
+                for leaf, count in leaves.most_common(n)]
+
+
+# (file, function) of leaf frames whose thread is only blocked waiting, in
+# the stdlib modules that do the blocking; a bare name would also hide real
+# work such as StatusCache.get. The GUI thread sits in run_gui while Qt's
+# event loop (C++) is idle.
+_IDLE_FRAMES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"), ("thread.py", "_worker"),
+    ("selectors.py", "select"), ("socket.py", "accept"), ("socket.py", "readinto"),
+    ("ssl.py", "read"), ("ssl.py", "recv_into"), ("subprocess.py", "_try_wait"),
+    ("icecast_butt_controller.py", "run_gui"),
+}
+
+profiler = SamplingProfiler()
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class PrometheusWriter:
+    # Minimal text exposition format (0.0.4) writer
+    def __init__(self):
+        self.lines = []
+        self._declared = set()
+
+    def declare(self, name, kind, help_text):
+        if name in self._declared:
+            return
+        self._declared.add(name)
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name, value, labels=None):
+        if labels:
+            label_text = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels.items())
+            self.lines.append(f"{name}{{{label_text}}} {value}")
+        else:
+            self.lines.append(f"{name} {value}")
+
+    def histogram(self, name, help_text, histograms):
+        self.declare(name, "histogram", help_text)
+        for (operation, outcome), (counts, count, total, _, buckets) in sorted(histograms.items()):
+            labels = {"operation": operation, "outcome": outcome}
+            cumulative = 0
+            for bound, n in zip(buckets, counts):
+                cumulative += n
+                self.sample(f"{name}_bucket", cumulative, dict(labels, le=f"{bound:g}"))
+            self.sample(f"{name}_bucket", count, dict(labels, le="+Inf"))
+            self.sample(f"{name}_sum", f"{total:.6f}", labels)
+            self.sample(f"{name}_count", count, labels)
+
+    def text(self):
+        return "\n".join(self.lines) + "\n"
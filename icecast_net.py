@@ -0,0 +1,264 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from icecast_metrics import latency
+
+DEFAULT_TIMEOUT = 5
+
+
+class NetworkEngine:
+    # Runs blocking HTTP work on a small thread pool so callers (the Qt GUI
+    # thread in particular) never wait on the network themselves.
+    def __init__(self, max_workers=8):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="icecast-net")
+        self._inflight = set()
+        self._lock = threading.Lock()
+
+    def busy(self, key):
+        with self._lock:
+            return key in self._inflight
+
+    def submit(self, fn, *args, on_done=None, key=None, **kwargs):
+        # With a key, a job that is still running is not queued a second time
+        # (a slow server must not pile up one stats poll per timer tick).
+        if key is not None:
+            with self._lock:
+                if key in self._inflight:
+                    return None
+                self._inflight.add(key)
+
+        def _done(future):
+            if key is not None:
+                with self._lock:
+                    self._inflight.discard(key)
+            if on_done:
+                on_done(future)
+
+        operation = f"task {key or getattr(fn, '__name__', 'call')}"
+        queued = time.perf_counter()
+
+        def _run():
+            # Time spent waiting for a worker is its own operation: a full
+            # pool looks like slow requests otherwise
+            started = time.perf_counter()
+            latency.observe("task_queue_wait", started - queued)
+            with latency.timer(operation):
+                return fn(*args, **kwargs)
+
+        try:
+            future = self._executor.submit(_run)
+        except RuntimeError:
+            # Engine already shut down
+            if key is not None:
+                with self._lock:
+                    self._inflight.discard(key)
+            return None
+        future.add_done_callback(_done)
+        return future
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def fan_out(fn, items, max_workers=8):
+    # Calls fn(item) for every item with at most max_workers in flight and
+    # returns (item, result, error) tuples in input order.
+    items = list(items)
+    if not items:
+        return []
+    results = [None] * len(items)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items))), thread_name_prefix="icecast-fanout") as pool:
+        futures = [pool.submit(fn, item) for item in items]
+        for i, future in enumerate(futures):
+            try:
+                results[i] = (items[i], future.result(), None)
+            except Exception as e:
+                results[i] = (items[i], None, e)
+    return results
+
+
+class HttpClient:
+    # One long-lived keep-alive session shared by every caller. urllib3 keeps
+    # up to pool_maxsize idle sockets per host, so repeated polls and metadata
+    # pushes skip the TCP/TLS handshake. requests itself (~100 ms to import)
+    # is loaded on the first call, which is always on a worker thread.
+    def __init__(self, pool_hosts=32, pool_maxsize=8, retries=2, backoff=0.3):
+        self.pool_hosts = pool_hosts
+        self.pool_maxsize = pool_maxsize
+        self.retries = retries
+        self.backoff = backoff
+        self.session = None
+        self.adapter = None
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._total_time = 0.0
+
+    def _session(self):
+        with self._lock:
+            if self.session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+                retry = Retry(
+                    total=self.retries,
+                    connect=self.retries,
+                    read=1,
+                    status=self.retries,
+                    backoff_factor=self.backoff,
+                    status_forcelist=(502, 503, 504),
+                    allowed_methods=frozenset(["GET", "HEAD"]),
+                    raise_on_status=False,
+                )
+                self.adapter = HTTPAdapter(pool_connections=self.pool_hosts, pool_maxsize=self.pool_maxsize, max_retries=retry)
+                session = requests.Session()
+                session.headers["User-Agent"] = "IcecastButtController"
+                session.mount("http://", self.adapter)
+                session.mount("https://", self.adapter)
+                self.session = session
+            return self.session
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        session = self._session()
+        started = time.perf_counter()
+        try:
+            return session.get(url, **kwargs)
+        except Exception:
+            with self._lock:
+                self._errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._requests += 1
+                self._total_time += time.perf_counter() - started
+
+    def connection_stats(self):
+        # urllib3 counts sockets opened and requests issued per host pool;
+        # the difference is the number of requests served on a reused socket.
+        opened = 0
+        issued = 0
+        pools = self.adapter.poolmanager.pools if self.adapter is not None else {}
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            issued += pool.num_requests
+        with self._lock:
+            requests_made = self._requests
+            errors = self._errors
+            total_time = self._total_time
+        return {
+            "requests": requests_made,
+            "errors": errors,
+            "connections_opened": opened,
+            "connections_reused": max(issued - opened, 0),
+            "avg_latency_ms": round(total_time / requests_made * 1000, 1) if requests_made else 0.0,
+        }
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+
+http_client = HttpClient()
+
+
+def http_get(url, **kwargs):
+    return http_client.get(url, **kwargs)
+
+
+def probe_status_page(host, port):
+    response = http_get(f"http://{host}:{port}/status.xsl")
+    return response.ok, response.status_code
+
+
+def fetch_status_json(host, port, etag=None, last_modified=None):
+    # Returns (status_code, data, validators). A 304 comes back with data None
+    # and the caller keeps its previous document.
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    resp = http_get(f"http://{host}:{port}/status-json.xsl", headers=headers)
+    validators = (resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+    if resp.status_code == 304 or not resp.ok:
+        return resp.status_code, None, validators
+    if not resp.headers.get("Content-Type", "").lower().startswith("application/json"):
+        return resp.status_code, None, validators
+    try:
+        return resp.status_code, resp.json(), validators
+    except ValueError:
+        return resp.status_code, None, validators
+
+
+def push_metadata(host, port, mount, title, description, genre, admin_auth, source_pass):
+    started = time.perf_counter()
+    try:
+        result = _push_metadata(host, port, mount, title, description, genre, admin_auth, source_pass)
+    except Exception as e:
+        latency.observe("metadata_push", time.perf_counter() - started, "error", e)
+        raise
+    ok = result[0][0] or result[1][0]
+    latency.observe("metadata_push", time.perf_counter() - started, "ok" if ok else "http_error")
+    return result
+
+
+# Which credential /admin/metadata last accepted per server ("admin" or
+# "source"), so only the first push to a server pays for a 401 round-trip.
+_metadata_auth = {}
+_metadata_lock = threading.Lock()
+_metadata_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="icecast-metadata")
+
+
+def _metadata_get(url, params, server, admin_auth, source_pass):
+    credentials = {"admin": admin_auth, "source": ("source", source_pass)}
+    with _metadata_lock:
+        first = _metadata_auth.get(server, "admin")
+    order = [first, "source" if first == "admin" else "admin"]
+    for name in order:
+        # Per attempt, so a 401 followed by a retry with the other
+        # credential shows up as its own cost
+        with latency.timer(f"metadata_request {name}") as t:
+            resp = http_get(url, params=params, auth=credentials[name])
+            if resp.status_code == 401:
+                t.outcome, t.error = "unauthorized", "HTTP 401"
+            elif not resp.ok:
+                t.outcome, t.error = "http_error", f"HTTP {resp.status_code}"
+        if resp.status_code != 401:
+            if resp.ok:
+                with _metadata_lock:
+                    _metadata_auth[server] = name
+            return resp
+    with _metadata_lock:
+        _metadata_auth.pop(server, None)
+    return resp
+
+
+def _push_metadata(host, port, mount, title, description, genre, admin_auth, source_pass):
+    url = f"http://{host}:{port}/admin/metadata"
+    params = {
+        "mount": mount,
+        "mode": "updinfo",
+        "song": title or "Untitled"
+    }
+    params2 = {"mount": mount, "mode": "updmeta"}
+    if title:
+        params2["title"] = title
+    if description:
+        params2["description"] = description
+    if genre:
+        params2["genre"] = genre
+    # updinfo and updmeta are independent; send them side by side
+    second = _metadata_pool.submit(_metadata_get, url, params2, (host, port), admin_auth, source_pass)
+    resp = _metadata_get(url, params, (host, port), admin_auth, source_pass)
+    resp2 = second.result()
+    return (resp.ok, resp.status_code), (resp2.ok, resp2.status_code)
+
+
+def probe_url(url, timeout=DEFAULT_TIMEOUT):
+    resp = http_get(url, timeout=timeout)
+    return resp.ok, resp.status_code
@@ -0,0 +1,39 @@
+import os
+
+import icecast_status
+from access_log import access_log, ACCESS_LOG, ACCESS_LOG_CACHE
+from failover import failover_monitor
+from icecast_metrics import metrics_store, throughput, profiler
+from icecast_status import status_cache
+from live_events import live_feed
+from now_playing import now_playing_feed
+from relay_topology import topology_monitor
+
+# Kept apart from icecast_api so the GUI can apply settings before Flask is
+# loaded; the API starts in the background once the window is up.
+
+_observers_installed = False
+
+
+def init_services(settings):
+    # Shared by GUI and headless mode: wire the samplers to the status cache
+    # once and apply the runtime options from config.json
+    global _observers_installed
+    if not _observers_installed:
+        status_cache.observe(metrics_store.record_snapshot)
+        status_cache.observe(throughput.record_snapshot)
+        _observers_installed = True
+    try:
+        status_cache.ttl = float(settings.get("status_ttl", icecast_status.STATUS_TTL))
+    except (TypeError, ValueError):
+        status_cache.ttl = icecast_status.STATUS_TTL
+    history_file = settings.get("history_file", "listener_history.log")
+    if history_file != metrics_store.history_file:
+        metrics_store.load_in_background(history_file)
+    now_playing_feed.configure(settings)
+    live_feed.install()
+    if os.environ.get("ICECAST_PROFILE"):
+        profiler.start()
+    failover_monitor.configure(settings)
+    topology_monitor.configure(settings)
+    access_log.configure(settings.get("access_log") or ACCESS_LOG, settings.get("access_log_cache", ACCESS_LOG_CACHE))
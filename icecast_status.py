@@ -0,0 +1,418 @@
+import threading
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import icecast_net
+from icecast_metrics import latency
+
+STATUS_TTL = 4.0
+DASHBOARD_CONCURRENCY = 32
+
+
+def source_list(icestats):
+    source = (icestats or {}).get("source")
+    if isinstance(source, list):
+        return [s for s in source if isinstance(s, dict)]
+    if isinstance(source, dict):
+        return [source]
+    return []
+
+
+def normalize_mount(mount):
+    mount = (mount or "").strip()
+    if "://" in mount:
+        mount = urlparse(mount).path
+    mount = "/" + mount.strip("/")
+    while "//" in mount:
+        mount = mount.replace("//", "/")
+    return mount
+
+
+def extract_bytes(s):
+    if isinstance(s, dict):
+        if "total_bytes" in s:
+            return int(s.get("total_bytes") or 0)
+        if "total_kbytes" in s:
+            try:
+                return int(float(s.get("total_kbytes") or 0) * 1024)
+            except Exception:
+                return 0
+    return 0
+
+
+def source_bytes(record):
+    # Bytes read from the source (or, on a relay, from its master); keeps
+    # rising while audio arrives
+    raw = record.raw if isinstance(record.raw, dict) else {}
+    try:
+        return int(raw.get("total_bytes_read") or record.bytes or 0)
+    except (TypeError, ValueError):
+        return record.bytes or 0
+
+
+def _int(value):
+    try:
+        return int(float(value or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def extract_bitrate(s):
+    # kbps; Icecast reports it under different keys depending on the source client
+    for key in ("bitrate", "ice-bitrate", "audio_bitrate"):
+        value = _int(s.get(key))
+        if value:
+            return value // 1000 if value >= 10000 else value
+    return 0
+
+
+def parse_stream_start(value):
+    # Icecast sends stream_start_iso8601 ("2026-10-18T10:00:00+0000") and the
+    # older RFC 2822 stream_start ("Sun, 18 Oct 2026 10:00:00 +0000")
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z").timestamp()
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class MountStats:
+    __slots__ = ("mount", "listenurl", "listeners", "peak", "bytes", "bitrate",
+                 "stream_start", "stream_start_ts", "title", "server_name", "genre", "raw")
+
+    def __init__(self, source):
+        self.raw = source
+        self.listenurl = source.get("listenurl", "")
+        self.mount = normalize_mount(self.listenurl)
+        self.listeners = _int(source.get("listeners"))
+        self.peak = _int(source.get("listener_peak"))
+        self.bytes = extract_bytes(source)
+        self.bitrate = extract_bitrate(source)
+        self.stream_start = source.get("stream_start_iso8601") or source.get("stream_start") or ""
+        self.stream_start_ts = parse_stream_start(self.stream_start)
+        self.title = source.get("title") or ""
+        self.server_name = source.get("server_name") or ""
+        self.genre = source.get("genre") or ""
+
+    def uptime(self, now=None):
+        if self.stream_start_ts is None:
+            return None
+        return max((time.time() if now is None else now) - self.stream_start_ts, 0.0)
+
+    def as_dict(self):
+        return {
+            "mount": self.mount,
+            "listenurl": self.listenurl,
+            "listeners": self.listeners,
+            "peak": self.peak,
+            "bytes": self.bytes,
+            "bitrate": self.bitrate,
+            "stream_start": self.stream_start,
+            "title": self.title,
+        }
+
+
+class StatusSnapshot:
+    def __init__(self, host, port, status_code, icestats, fetched_at, validators=(None, None)):
+        self.host = host
+        self.port = port
+        self.status_code = status_code
+        self.icestats = icestats
+        self.fetched_at = fetched_at
+        self.etag, self.last_modified = validators
+        self.ok = icestats is not None
+        self.single_source = isinstance((icestats or {}).get("source"), dict)
+        # Parsed once per fetch; every lookup afterwards is a dict hit on the
+        # exact mount path, so /live no longer matches /backup/live.
+        self.mounts = {}
+        for s in source_list(icestats):
+            record = MountStats(s)
+            self.mounts[record.mount] = record
+
+    def mount(self, mount):
+        record = self.mounts.get(normalize_mount(mount))
+        if record is None and self.single_source and self.mounts:
+            # A lone source whose listenurl gave no mount path can't be told
+            # apart from the one asked about; one with a path is another mount
+            only = next(iter(self.mounts.values()))
+            if only.mount == "/":
+                record = only
+        return record
+
+    def age(self):
+        return time.monotonic() - self.fetched_at
+
+    def refreshed(self, fetched_at, validators):
+        # 304 Not Modified: same document, new timestamp, no re-parse
+        snapshot = StatusSnapshot.__new__(StatusSnapshot)
+        snapshot.__dict__.update(self.__dict__)
+        snapshot.fetched_at = fetched_at
+        snapshot.status_code = 304
+        snapshot.etag = validators[0] or self.etag
+        snapshot.last_modified = validators[1] or self.last_modified
+        return snapshot
+
+
+class StatusCache:
+    # Single owner of /status-json.xsl: one fetch per host/port per TTL, with
+    # concurrent callers waiting on the in-flight fetch instead of issuing
+    # their own, and subscribers told only about what changed. Changes are
+    # measured against the last successful snapshot, so a failed fetch (or
+    # invalidate()) in between does not re-announce every mount.
+    def __init__(self, ttl=STATUS_TTL, fetch=None):
+        self.ttl = ttl
+        self._fetch = fetch or icecast_net.fetch_status_json
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._last_good = {}
+        self._fetch_locks = {}
+        self._subscribers = []
+        self._observers = []
+        self.not_modified = 0
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def observe(self, callback):
+        # callback(snapshot) after every fetch, changed or not (samplers)
+        with self._lock:
+            self._observers.append(callback)
+
+    def _notify_observers(self, snapshot):
+        with self._lock:
+            observers = list(self._observers)
+        for callback in observers:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"Status observer error: {e}")
+
+    def peek(self, host, port):
+        with self._lock:
+            return self._snapshots.get((host, port))
+
+    def snapshots(self):
+        with self._lock:
+            return list(self._snapshots.values())
+
+    def last_good(self, host, port):
+        # The newest snapshot that was fetched successfully, however old
+        with self._lock:
+            return self._last_good.get((host, port))
+
+    def good_snapshots(self):
+        with self._lock:
+            return list(self._last_good.values())
+
+    def invalidate(self, host=None, port=None):
+        with self._lock:
+            if host is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop((host, port), None)
+
+    def get(self, host, port, max_age=None):
+        key = (host, port)
+        max_age = self.ttl if max_age is None else max_age
+        snapshot = self.peek(host, port)
+        if snapshot is not None and snapshot.age() < max_age:
+            return snapshot
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(key, threading.Lock())
+        with fetch_lock:
+            # Another caller may have refreshed it while we waited
+            snapshot = self.peek(host, port)
+            if snapshot is not None and snapshot.age() < max_age:
+                return snapshot
+            with self._lock:
+                previous = self._last_good.get(key)
+            started = time.perf_counter()
+            try:
+                if previous is not None:
+                    status_code, data, validators = self._fetch(host, port, previous.etag, previous.last_modified)
+                else:
+                    status_code, data, validators = self._fetch(host, port)
+            except Exception as e:
+                latency.observe("status_fetch", time.perf_counter() - started, "error", e)
+                raise
+            latency.observe("status_fetch", time.perf_counter() - started, "ok" if status_code < 400 else "http_error",
+                            None if status_code < 400 else f"HTTP {status_code}")
+            if status_code == 304 and previous is not None:
+                snapshot = previous.refreshed(time.monotonic(), validators)
+                with self._lock:
+                    self._snapshots[key] = snapshot
+                    self._last_good[key] = snapshot
+                    self.not_modified += 1
+                self._notify_observers(snapshot)
+                return snapshot
+            icestats = data.get("icestats", {}) if data is not None else None
+            snapshot = StatusSnapshot(host, port, status_code, icestats, time.monotonic(), validators)
+            with self._lock:
+                self._snapshots[key] = snapshot
+                if snapshot.ok:
+                    self._last_good[key] = snapshot
+                subscribers = list(self._subscribers)
+        self._notify_observers(snapshot)
+        events = diff_snapshots(previous, snapshot)
+        if events:
+            for callback in subscribers:
+                try:
+                    callback(events)
+                except Exception as e:
+                    print(f"Status subscriber error: {e}")
+        return snapshot
+
+
+class PollScheduler:
+    # Decides how long to wait before the next status poll: fast right after
+    # the stream or its metadata changed, exponentially slower while the
+    # server is failing, and never faster than hidden_interval while the
+    # window is not visible.
+    def __init__(self, base=5.0, fast=1.0, hidden=30.0, max_backoff=120.0, boost_duration=20.0):
+        self.base = base
+        self.fast = fast
+        self.hidden = hidden
+        self.max_backoff = max_backoff
+        self.boost_duration = boost_duration
+        self.failures = 0
+        self.visible = True
+        self._boost_until = 0.0
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+
+    def set_visible(self, visible):
+        self.visible = visible
+
+    def boost(self, duration=None):
+        self._boost_until = time.monotonic() + (self.boost_duration if duration is None else duration)
+
+    def boosted(self):
+        return time.monotonic() < self._boost_until
+
+    def next_interval(self):
+        interval = self.fast if self.boosted() else self.base
+        if self.failures:
+            # Capped exponent: a day-long outage must not overflow the float
+            interval = min(interval * (2 ** min(self.failures, 16)), self.max_backoff)
+        if not self.visible:
+            interval = max(interval, self.hidden)
+        return interval
+
+
+def diff_snapshots(old, new):
+    # Failed fetches carry no mount information; don't report every mount as
+    # gone just because one poll timed out or returned an error. `old` is the
+    # last successful snapshot, not merely the previous fetch.
+    if not new.ok:
+        return []
+    server = (new.host, new.port)
+    old_mounts = old.mounts if old is not None and old.ok else {}
+    events = []
+    for mount in new.mounts.keys() - old_mounts.keys():
+        events.append({"type": "mount_added", "server": server, "mount": mount})
+    for mount in old_mounts.keys() - new.mounts.keys():
+        events.append({"type": "mount_removed", "server": server, "mount": mount})
+    for mount in new.mounts.keys() & old_mounts.keys():
+        before = old_mounts[mount].listeners
+        after = new.mounts[mount].listeners
+        if before != after:
+            events.append({"type": "listeners", "server": server, "mount": mount, "old": before, "new": after})
+        old_record, new_record = old_mounts[mount], new.mounts[mount]
+        if (old_record.title, old_record.bitrate) != (new_record.title, new_record.bitrate):
+            events.append({"type": "metadata", "server": server, "mount": mount,
+                           "title": new_record.title, "bitrate": new_record.bitrate})
+    return events
+
+
+status_cache = StatusCache()
+
+
+def mount_stats(snapshot, mount):
+    mount = normalize_mount(mount)
+    stats = {
+        "mount": mount,
+        "listenurl": f"http://{snapshot.host}:{snapshot.port}{mount}",
+        "listeners": 0,
+        "peak": 0,
+        "bytes": 0,
+        "bitrate": 0,
+        "stream_start": "",
+        "title": "",
+    }
+    record = snapshot.mount(mount)
+    if record is not None:
+        stats.update(record.as_dict())
+        stats["listenurl"] = record.listenurl or stats["listenurl"]
+    return stats
+
+
+def fetch_mount_stats(host, port, mount):
+    snapshot = status_cache.get(host, port)
+    if not snapshot.ok:
+        return None
+    return mount_stats(snapshot, mount)
+
+
+def mount_is_active(host, port, mount):
+    snapshot = status_cache.get(host, port)
+    return snapshot.status_code, snapshot.ok and snapshot.mount(mount) is not None
+
+
+def probe_icecast(host, port):
+    # Prefer JSON status endpoint when available
+    snapshot = status_cache.get(host, port)
+    if snapshot.ok:
+        return True, snapshot.status_code
+    # Fallback to classic status page
+    return icecast_net.probe_status_page(host, port)
+
+
+def server_label(server):
+    return server.get("name") or f"{server.get('host')}:{server.get('port')}"
+
+
+def poll_servers(servers, max_workers=DASHBOARD_CONCURRENCY):
+    # One status fetch per server, all in parallel, so the refresh costs about
+    # one round-trip (or one timeout) however many servers are configured.
+    def poll(server):
+        return status_cache.get(server["host"], int(server["port"]))
+
+    rows = []
+    for server, snapshot, error in icecast_net.fan_out(poll, servers, max_workers):
+        label = server_label(server)
+        if error is not None:
+            rows.append({"server": label, "mount": "", "state": f"error: {type(error).__name__}"})
+            continue
+        if not snapshot.ok:
+            rows.append({"server": label, "mount": "", "state": f"HTTP {snapshot.status_code}"})
+            continue
+        mounts = server.get("mounts") or sorted(snapshot.mounts)
+        for mount in mounts:
+            record = snapshot.mounts.get(normalize_mount(mount))
+            row = {"server": label, "mount": normalize_mount(mount), "state": "offline"}
+            if record is not None:
+                row.update(record.as_dict())
+                row["state"] = "live"
+            rows.append(row)
+    return rows
@@ -0,0 +1,297 @@
+import sys
+import json
+import asyncio
+import argparse
+import statistics
+
+import icecast_status
+import stream_probe
+
+# Load-test a mount with many concurrent listeners:
+#   python listener_swarm.py --host 127.0.0.1 --port 8000 --mount /live --clients 200 --ramp 20 --duration 60
+# or against a built-in stand-in server that mimics Icecast's <limits>:
+#   python listener_swarm.py --stand-in --clients 300 --bitrate 128
+
+
+class ClientStats:
+    def __init__(self, index):
+        self.index = index
+        self.status_code = None
+        self.connect_at = None
+        self.ttfb = None
+        self.bytes = 0
+        self.burst_bytes = 0
+        self.started = None
+        self.ended = None
+        self.stalls = 0
+        self.stall_time = 0.0
+        self.disconnected = False
+        self.error = ""
+
+    def kbps(self):
+        # Steady rate: the burst Icecast sends on connect is left out, as in
+        # stream_probe, or a short run reads as twice the bitrate
+        if not self.started or not self.ended or self.ended - self.started <= stream_probe.BURST_WINDOW:
+            return 0.0
+        return (self.bytes - self.burst_bytes) * 8 / 1000 / (self.ended - self.started - stream_probe.BURST_WINDOW)
+
+
+async def run_client(stats, host, port, mount, until, stall_threshold, timeout=10.0):
+    loop = asyncio.get_running_loop()
+    begin = loop.time()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError) as e:
+        stats.error = f"connect: {e or type(e).__name__}"
+        return stats
+    stats.connect_at = loop.time() - begin
+    try:
+        writer.write(
+            f"GET {mount} HTTP/1.0\r\nHost: {host}\r\nUser-Agent: listener-swarm/{stats.index}\r\n"
+            "Icy-MetaData: 0\r\n\r\n".encode("ascii")
+        )
+        await writer.drain()
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+        stats.ttfb = loop.time() - begin
+        try:
+            stats.status_code = int(head.split(b" ", 2)[1])
+        except (IndexError, ValueError):
+            stats.error = "bad response"
+            return stats
+        if stats.status_code != 200:
+            stats.error = f"HTTP {stats.status_code}"
+            return stats
+        stats.started = loop.time()
+        last_data = stats.started
+        while True:
+            now = loop.time()
+            if now >= until:
+                break
+            try:
+                chunk = await asyncio.wait_for(reader.read(65536), min(stall_threshold, until - now))
+            except asyncio.TimeoutError:
+                # No data for stall_threshold seconds: count it, keep listening
+                if loop.time() < until:
+                    stats.stalls += 1
+                continue
+            now = loop.time()
+            if not chunk:
+                stats.disconnected = True
+                stats.error = "closed by server"
+                break
+            gap = now - last_data
+            if gap > stall_threshold:
+                stats.stall_time += gap
+            last_data = now
+            stats.bytes += len(chunk)
+            if now - stats.started <= stream_probe.BURST_WINDOW:
+                stats.burst_bytes += len(chunk)
+    except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError) as e:
+        stats.disconnected = True
+        stats.error = str(e) or type(e).__name__
+    finally:
+        stats.ended = loop.time()
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+    return stats
+
+
+async def poll_status(host, port, mount, clients, start, until, interval, samples):
+    # Correlates the swarm with what the controller's stats path reports
+    loop = asyncio.get_running_loop()
+    cache = icecast_status.StatusCache(ttl=0)
+    while loop.time() < until:
+        active = sum(1 for c in clients if c.started and not c.ended)
+        try:
+            snapshot = await asyncio.to_thread(cache.get, host, port)
+            record = snapshot.mount(mount) if snapshot.ok else None
+            reported = record.listeners if record else None
+        except Exception as e:
+            reported = None
+            print(f"status poll failed: {e}", file=sys.stderr)
+        samples.append({"t": round(loop.time() - start, 1), "swarm_active": active, "icecast_listeners": reported})
+        await asyncio.sleep(interval)
+
+
+async def swarm(host, port, mount, clients=50, ramp=10.0, duration=30.0, stall_threshold=2.0, status_interval=2.0):
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    until = start + ramp + duration
+    stats = [ClientStats(i) for i in range(clients)]
+    samples = []
+    poller = asyncio.create_task(poll_status(host, port, mount, stats, start, until, status_interval, samples))
+    tasks = []
+    for i, client in enumerate(stats):
+        # Linear ramp: client i connects at i/clients * ramp seconds
+        delay = start + (ramp * i / clients if clients else 0) - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(run_client(client, host, port, mount, until, stall_threshold)))
+    await asyncio.gather(*tasks)
+    await poller
+    return stats, samples
+
+
+def summarize(stats, samples, expected_kbps=None):
+    connected = [c for c in stats if c.status_code == 200]
+    rates = sorted(c.kbps() for c in connected)
+    summary = {
+        "clients": len(stats),
+        "connected": len(connected),
+        "refused": sum(1 for c in stats if c.status_code and c.status_code != 200),
+        "connect_errors": sum(1 for c in stats if c.status_code is None),
+        "disconnects": sum(1 for c in connected if c.disconnected),
+        "stalls": sum(c.stalls for c in connected),
+        "stalled_clients": sum(1 for c in connected if c.stalls),
+        "ttfb_ms_p50": round(statistics.median(c.ttfb for c in connected) * 1000, 1) if connected else None,
+        "kbps_min": round(rates[0], 1) if rates else None,
+        "kbps_p5": round(rates[int(len(rates) * 0.05)], 1) if rates else None,
+        "kbps_p50": round(statistics.median(rates), 1) if rates else None,
+        "total_mbps": round(sum(rates) / 1000, 2),
+        "errors": sorted({c.error for c in stats if c.error}),
+        "status_samples": samples,
+    }
+    if expected_kbps and rates:
+        summary["below_expected"] = sum(1 for r in rates if r < expected_kbps * 0.9)
+    reported = [s["icecast_listeners"] for s in samples if s["icecast_listeners"] is not None]
+    if reported:
+        summary["icecast_listeners_max"] = max(reported)
+        summary["swarm_active_max"] = max(s["swarm_active"] for s in samples)
+    return summary
+
+
+class StandInServer:
+    # Minimal local Icecast stand-in: one mount fed with silence at a fixed
+    # bitrate, Icecast's burst on connect, the <clients> limit, and clients
+    # dropped once their unsent backlog exceeds <queue-size>. It also serves
+    # /status-json.xsl so the controller's stats path can be exercised.
+    def __init__(self, mount="/live", bitrate=128, limits=None):
+        limits = stream_probe.read_limits() if limits is None else limits
+        self.mount = icecast_status.normalize_mount(mount)
+        self.bitrate = bitrate
+        self.max_clients = limits.get("clients", 256)
+        self.queue_size = limits.get("queue-size", 102400)
+        self.burst_size = limits.get("burst-size", stream_probe.BURST_SIZE)
+        self.listeners = 0
+        self.peak = 0
+        self.total_bytes = 0
+        self.dropped = 0
+        self.server = None
+        self._streams = set()
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        for task in list(self._streams):
+            task.cancel()
+        await asyncio.gather(*self._streams, return_exceptions=True)
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 15)
+            path = request.split(b" ", 2)[1].decode("latin-1").split("?", 1)[0]
+            if path == "/status-json.xsl":
+                body = json.dumps({"icestats": {"source": {
+                    "listenurl": f"http://127.0.0.1{self.mount}",
+                    "listeners": self.listeners,
+                    "listener_peak": self.peak,
+                    "total_bytes": self.total_bytes,
+                    "bitrate": self.bitrate,
+                }}}).encode()
+                writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: application/json\r\nContent-Length: "
+                             + str(len(body)).encode() + b"\r\n\r\n" + body)
+                await writer.drain()
+                return
+            if path != self.mount:
+                writer.write(b"HTTP/1.0 404 Not Found\r\n\r\n")
+                return
+            if self.listeners >= self.max_clients:
+                writer.write(b"HTTP/1.0 403 Forbidden\r\n\r\n")
+                return
+            task = asyncio.ensure_future(self._stream(writer))
+            self._streams.add(task)
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self._streams.discard(task)
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, IndexError):
+            pass
+        finally:
+            writer.close()
+
+    async def _stream(self, writer):
+        self.listeners += 1
+        self.peak = max(self.peak, self.listeners)
+        try:
+            writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: audio/mpeg\r\nicy-br: "
+                         + str(self.bitrate).encode() + b"\r\n\r\n" + bytes(self.burst_size))
+            self.total_bytes += self.burst_size
+            tick = 0.1
+            chunk = bytes(int(self.bitrate * 1000 / 8 * tick))
+            while True:
+                await asyncio.sleep(tick)
+                if writer.transport.get_write_buffer_size() > self.queue_size:
+                    self.dropped += 1
+                    return
+                writer.write(chunk)
+                self.total_bytes += len(chunk)
+                if writer.transport.is_closing():
+                    return
+        finally:
+            self.listeners -= 1
+
+
+async def _main(args):
+    host, port, mount = args.host, args.port, icecast_status.normalize_mount(args.mount)
+    stand_in = None
+    if args.stand_in:
+        stand_in = StandInServer(mount, args.bitrate)
+        host = "127.0.0.1"
+        port = await stand_in.start(host, args.port if args.port != 8000 else 0)
+        print(f"stand-in Icecast on {host}:{port}{mount} ({stand_in.max_clients} clients, "
+              f"burst {stand_in.burst_size}, queue {stand_in.queue_size})", file=sys.stderr)
+    stats, samples = await swarm(host, port, mount, args.clients, args.ramp, args.duration,
+                                 args.stall_threshold, args.status_interval)
+    summary = summarize(stats, samples, args.bitrate)
+    if stand_in is not None:
+        summary["stand_in_dropped"] = stand_in.dropped
+        await stand_in.stop()
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for key, value in summary.items():
+            if key != "status_samples":
+                print(f"{key:>22}: {value}")
+        print("status samples (t, swarm active, icecast listeners):")
+        for s in samples:
+            print(f"  {s['t']:>7} {s['swarm_active']:>6} {s['icecast_listeners']}")
+    return 0 if summary["connected"] == summary["clients"] and not summary["disconnects"] else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate many concurrent Icecast listeners")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--mount", default="/live")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--ramp", type=float, default=10.0, help="seconds over which clients connect")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to listen after the ramp")
+    parser.add_argument("--bitrate", type=int, default=128, help="expected (or stand-in) bitrate in kbps")
+    parser.add_argument("--stall-threshold", type=float, default=2.0)
+    parser.add_argument("--status-interval", type=float, default=2.0)
+    parser.add_argument("--stand-in", action="store_true", help="serve the mount from a local stand-in server")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    return asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import json
+import queue
+import threading
+import time
+
+from config_store import config_store
+from icecast_status import normalize_mount, status_cache
+from now_playing import now_playing_feed
+
+LIVE_QUEUE_SIZE = 256
+LIVE_HEARTBEAT = 15.0
+
+
+class LiveFeed:
+    # Fans status changes out to any number of Server-Sent Events clients.
+    # Events come from the status cache's diff stream and the now-playing
+    # feed, so every client rides on the controller's own poll of
+    # status-json.xsl; connecting a browser never adds a request to Icecast.
+    def __init__(self, queue_size=LIVE_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._clients = set()
+        self._installed = False
+        self._closed = False
+        self.dropped = 0
+
+    def install(self):
+        with self._lock:
+            if self._installed:
+                return
+            self._installed = True
+        status_cache.subscribe(self._on_status_events)
+        now_playing_feed.subscribe(self._on_now_playing)
+
+    def clients(self):
+        with self._lock:
+            return len(self._clients)
+
+    def publish(self, event, data):
+        message = f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.put_nowait(message)
+            except queue.Full:
+                # A client this far behind gets disconnected; it reconnects
+                # and starts again from a fresh snapshot.
+                self._drop(client)
+
+    def _drop(self, client):
+        with self._lock:
+            if client in self._clients:
+                self._clients.discard(client)
+                self.dropped += 1
+        try:
+            client.get_nowait()
+        except queue.Empty:
+            pass
+        client.put_nowait(None)
+
+    def snapshot(self):
+        mounts = {}
+        # Last known numbers per server, so a client connecting during an
+        # outage still gets every mount
+        for snapshot in status_cache.good_snapshots():
+            for mount, record in snapshot.mounts.items():
+                mounts[f"{snapshot.host}:{snapshot.port}{mount}"] = {
+                    "listeners": record.listeners,
+                    "bitrate": record.bitrate,
+                    "title": record.title,
+                }
+        return {"time": time.time(), "mounts": mounts, "primary": self.primary(),
+                "now_playing": now_playing_feed.status()["current"]}
+
+    def primary(self):
+        # "host:port/mount" the controller streams to, in the same form as
+        # the snapshot keys; relays and dashboard servers share the cache
+        try:
+            settings = config_store.load()
+        except (OSError, ValueError):
+            settings = {}
+        host = (settings.get("host") or "localhost").strip()
+        try:
+            port = int(str(settings.get("port") or "8000").strip())
+        except ValueError:
+            port = 8000
+        return f"{host}:{port}{normalize_mount(settings.get('mountpoint') or '/live')}"
+
+    def stream(self, heartbeat=LIVE_HEARTBEAT):
+        # Generator of SSE frames for one client; ends when the feed closes
+        # or the client falls too far behind.
+        client = queue.Queue(self.queue_size)
+        with self._lock:
+            if self._closed:
+                return
+            self._clients.add(client)
+        try:
+            yield "retry: 3000\n\n"
+            yield f"event: snapshot\ndata: {json.dumps(self.snapshot(), separators=(',', ':'))}\n\n"
+            while True:
+                try:
+                    message = client.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            with self._lock:
+                self._clients.discard(client)
+
+    def close(self):
+        # Ends every open stream so a graceful server shutdown isn't held up
+        with self._lock:
+            self._closed = True
+            clients = list(self._clients)
+            self._clients.clear()
+        for client in clients:
+            try:
+                client.put_nowait(None)
+            except queue.Full:
+                self._drop(client)
+
+    def _on_status_events(self, events):
+        for event in events:
+            host, port = event["server"]
+            data = {"server": f"{host}:{port}", "mount": event["mount"]}
+            if event["type"] == "listeners":
+                data["listeners"] = event["new"]
+            elif event["type"] == "metadata":
+                data["title"] = event["title"]
+                data["bitrate"] = event["bitrate"]
+            elif event["type"] == "mount_added":
+                record = status_cache.last_good(host, port)
+                record = record.mounts.get(event["mount"]) if record is not None else None
+                if record is not None:
+                    data.update(listeners=record.listeners, bitrate=record.bitrate, title=record.title)
+            self.publish(event["type"], data)
+
+    def _on_now_playing(self, title):
+        self.publish("now_playing", {"title": title})
+
+
+live_feed = LiveFeed()
@@ -0,0 +1,254 @@
+import json
+import os
+import threading
+import time
+
+from icecast_metadata import metadata_queue
+from icecast_metrics import latency
+from icecast_status import normalize_mount
+
+NOW_PLAYING_INTERVAL = 0.25
+# Bytes before the read offset remembered to notice an in-place rewrite
+FINGERPRINT_BYTES = 64
+NOW_PLAYING_DEBOUNCE = 0.1
+AUDIO_EXTENSIONS = (".mp3", ".ogg", ".opus", ".flac", ".m4a", ".aac", ".wav")
+
+
+def parse_entry(line, pending_extinf=None):
+    # One line of a track log or playlist -> (title or None, extinf state).
+    # Understands plain "Artist - Title" lines, tab-separated logs whose last
+    # two fields are artist and title, and extended M3U (#EXTINF + path).
+    line = line.strip()
+    if not line:
+        return None, pending_extinf
+    if line.startswith("#EXTINF:"):
+        _, _, title = line.partition(",")
+        return None, title.strip() or None
+    if line.startswith("#"):
+        return None, pending_extinf
+    if pending_extinf:
+        # The path line that follows an #EXTINF entry; the EXTINF title wins
+        return pending_extinf, None
+    if line.lower().endswith(AUDIO_EXTENSIONS):
+        name = os.path.splitext(os.path.basename(line.replace("\\", "/")))[0]
+        return name.replace("_", " ").strip() or None, None
+    fields = [f.strip() for f in line.split("\t") if f.strip()]
+    if len(fields) >= 3:
+        return f"{fields[-2]} - {fields[-1]}", None
+    if len(fields) == 2:
+        return fields[1], None
+    return line, None
+
+
+class TrackLogWatcher:
+    # Follows a file by (inode, offset): each poll is one stat() and, when
+    # the file grew, one read of just the new bytes. Only complete lines are
+    # consumed. A replaced or truncated file (log rotation, a "now playing"
+    # file rewritten in place) is read again from the start; so is one
+    # rewritten longer in place, caught by the bytes just before offset no
+    # longer matching what was read there last time.
+    def __init__(self, path, on_entries, state_file=None, interval=NOW_PLAYING_INTERVAL):
+        self.path = path
+        self.on_entries = on_entries
+        self.state_file = state_file if state_file is not None else path + ".sent"
+        self.interval = interval
+        self.inode = None
+        self.offset = None
+        self.sent_offset = None
+        self.mtime = None
+        self.fingerprint = None
+        self._extinf = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("path") == os.path.abspath(self.path):
+            self.inode = state.get("inode")
+            self.offset = self.sent_offset = state.get("offset")
+
+    def mark_sent(self, inode, offset):
+        # Called once the entries up to offset reached Icecast; after a
+        # restart the watcher resumes from here instead of re-pushing them.
+        if self.sent_offset == offset and self.inode == inode:
+            return
+        self.sent_offset = offset
+        tmp = self.state_file + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"path": os.path.abspath(self.path), "inode": inode, "offset": offset}, f)
+            os.replace(tmp, self.state_file)
+        except OSError as e:
+            print(f"Now playing state write error: {e}")
+
+    def poll(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return []
+        if self.offset is None:
+            # First run on this file: the last complete line is the current
+            # track; everything before it is history and is not pushed.
+            self.inode = st.st_ino
+            self.offset = self._last_line_start(st.st_size)
+        rewritten = self.mtime is not None and st.st_mtime_ns != self.mtime and st.st_size == self.offset
+        self.mtime = st.st_mtime_ns
+        if st.st_ino != self.inode or st.st_size < self.offset or rewritten:
+            self.inode = st.st_ino
+            self.offset = 0
+            self.fingerprint = None
+            self._extinf = None
+        if st.st_size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            # The same read covers the fingerprint and the new bytes
+            start = self.offset - len(self.fingerprint or b"")
+            f.seek(start)
+            data = f.read(st.st_size - start)
+            if self.fingerprint and not data.startswith(self.fingerprint):
+                self.offset = 0
+                self._extinf = None
+                f.seek(0)
+                data = f.read(st.st_size)
+            else:
+                data = data[self.offset - start:]
+        end = data.rfind(b"\n")
+        if end < 0:
+            # A line still being written
+            return []
+        self.offset += end + 1
+        self.fingerprint = data[max(end + 1 - FINGERPRINT_BYTES, 0):end + 1]
+        entries = []
+        for raw in data[:end].split(b"\n"):
+            title, self._extinf = parse_entry(raw.decode("utf-8", "replace"), self._extinf)
+            if title:
+                entries.append(title)
+        return entries
+
+    def _last_line_start(self, size, window=65536):
+        start = max(size - window, 0)
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            data = f.read(size - start)
+        end = data.rfind(b"\n")
+        if end < 0:
+            return start
+        return start + data.rfind(b"\n", 0, end) + 1
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="now-playing", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with latency.timer("now_playing_poll"):
+                    entries = self.poll()
+            except OSError as e:
+                print(f"Now playing read error: {e}")
+                entries = []
+            if entries:
+                self.on_entries(entries, self.inode, self.offset)
+            self._stop.wait(self.interval)
+
+
+class NowPlayingFeed:
+    # Connects a TrackLogWatcher to the metadata queue using the current
+    # settings. Of several entries found in one poll only the newest is
+    # pushed; the others were already over by the time they were read.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.watcher = None
+        self.settings = {}
+        self.current = None
+        self.updated_at = None
+        self.last_error = ""
+
+    def subscribe(self, fn):
+        self._listeners.append(fn)
+
+    def unsubscribe(self, fn):
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def configure(self, settings):
+        path = (settings.get("now_playing_file") or "").strip()
+        with self._lock:
+            self.settings = dict(settings)
+            if self.watcher is not None and self.watcher.path == path:
+                return
+            if self.watcher is not None:
+                self.watcher.stop()
+                self.watcher = None
+            if path:
+                self.watcher = TrackLogWatcher(path, self._on_entries, settings.get("now_playing_state") or None)
+                self.watcher.start()
+
+    def stop(self):
+        with self._lock:
+            if self.watcher is not None:
+                self.watcher.stop()
+                self.watcher = None
+
+    def status(self):
+        watcher = self.watcher
+        return {
+            "file": watcher.path if watcher else "",
+            "current": self.current,
+            "updated_at": self.updated_at,
+            "offset": watcher.offset if watcher else None,
+            "sent_offset": watcher.sent_offset if watcher else None,
+            "error": self.last_error,
+        }
+
+    def _on_entries(self, entries, inode, offset):
+        with self._lock:
+            settings = self.settings
+            watcher = self.watcher
+        title = entries[-1]
+        host = (settings.get("host") or "localhost").strip()
+        try:
+            port = int(str(settings.get("port") or "8000").strip())
+        except ValueError:
+            port = 8000
+        future = metadata_queue.submit(
+            host, port, normalize_mount(settings.get("mountpoint") or "/live"), title,
+            settings.get("stream_description", ""), settings.get("stream_genre", ""),
+            (settings.get("admin_user", "admin"), settings.get("admin_password", "")),
+            settings.get("source_password", ""), debounce=NOW_PLAYING_DEBOUNCE,
+        )
+        future.add_done_callback(lambda f: self._on_pushed(f, watcher, title, inode, offset))
+
+    def _on_pushed(self, future, watcher, title, inode, offset):
+        if future.cancelled():
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Now playing push failed: {e}")
+            return
+        if result is not None and not (result[0][0] or result[1][0]):
+            self.last_error = f"HTTP {result[0][1]}, {result[1][1]}"
+            print(f"Now playing push rejected: {self.last_error}")
+            return
+        self.last_error = ""
+        self.current = title
+        self.updated_at = time.time()
+        if watcher is not None:
+            watcher.mark_sent(inode, offset)
+        for fn in list(self._listeners):
+            fn(title)
+
+
+now_playing_feed = NowPlayingFeed()
@@ -0,0 +1,330 @@
+import os
+import sys
+import argparse
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import icecast_config
+import icecast_net
+from icecast_config import ICECAST_XML, ensure_child
+from icecast_metrics import latency
+from icecast_status import normalize_mount, source_bytes, status_cache
+
+RELAY_CHECK = 5.0
+RELAY_LAG_WARN = 15.0      # seconds a relay may trail the master's metadata
+RELAY_RATE_WARN = 0.9      # relay inbound bytes / master inbound bytes
+MASTER_UPDATE_INTERVAL = 120
+
+
+def _port(value, default=8000):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return default
+
+
+def node_label(node):
+    return node.get("name") or f"{node['host']}:{node['port']}"
+
+
+def parse_relays(text):
+    # "edge1:8000:500, 10.0.0.5:8010" -> [{"host", "port", "max_listeners"}]
+    relays = []
+    for item in text.replace(";", ",").split(","):
+        parts = [p.strip() for p in item.strip().split(":")]
+        if not parts[0]:
+            continue
+        relay = {"host": parts[0], "port": str(_port(parts[1] if len(parts) > 1 else "8000"))}
+        if len(parts) > 2 and parts[2].isdigit():
+            relay["max_listeners"] = int(parts[2])
+        relays.append(relay)
+    return relays
+
+
+def format_relays(relays):
+    return ", ".join(
+        f"{r['host']}:{r['port']}" + (f":{r['max_listeners']}" if r.get("max_listeners") else "") for r in relays)
+
+
+def master_config(settings, base=ICECAST_XML):
+    # The master only needs the relay password the edges authenticate with
+    tree = icecast_config.load(base)
+    password = settings.get("relay_password") or ""
+    if password:
+        ensure_child(ensure_child(tree.getroot(), "authentication"), "relay-password", password)
+    return tree
+
+
+def edge_config(settings, relay, base=ICECAST_XML, mounts=None, logdir=None):
+    # An edge either mirrors every mount of the master through <master-server>
+    # (needs the master's relay password; new mounts appear within
+    # MASTER_UPDATE_INTERVAL) or relays the given mounts with <relay> blocks,
+    # which any public mount allows without credentials.
+    tree = icecast_config.load(base)
+    root = tree.getroot()
+    for tag in ("relay", "master-server", "master-server-port", "master-update-interval",
+                "master-username", "master-password", "relays-on-demand"):
+        for node in root.findall(tag):
+            root.remove(node)
+    master_host = (settings.get("host") or "localhost").strip()
+    master_port = _port(settings.get("port"))
+    mounts = [normalize_mount(m) for m in (mounts or [])]
+    password = settings.get("relay_password") or ""
+    ensure_child(root, "hostname", relay["host"])
+    ensure_child(ensure_child(root, "listen-socket"), "port", _port(relay["port"]))
+    limits = ensure_child(root, "limits")
+    if relay.get("max_listeners"):
+        ensure_child(limits, "clients", int(relay["max_listeners"]) + icecast_config.SPARE_CLIENTS)
+    # Every relayed mount occupies a source slot on the edge
+    sources = int(limits.findtext("sources") or 0)
+    ensure_child(limits, "sources", max(sources, len(mounts) + 2))
+    if logdir:
+        ensure_child(ensure_child(root, "paths"), "logdir", logdir)
+    if not mounts:
+        if not password:
+            raise ValueError("mirroring the master needs a relay password; set one or list the mounts")
+        ensure_child(root, "master-server", master_host)
+        ensure_child(root, "master-server-port", master_port)
+        ensure_child(root, "master-update-interval", MASTER_UPDATE_INTERVAL)
+        ensure_child(root, "master-username", "relay")
+        ensure_child(root, "master-password", password)
+        ensure_child(root, "relays-on-demand", 0)
+    for mount in mounts:
+        block = ET.SubElement(root, "relay")
+        ensure_child(block, "server", master_host)
+        ensure_child(block, "port", master_port)
+        ensure_child(block, "mount", mount)
+        ensure_child(block, "local-mount", mount)
+        ensure_child(block, "on-demand", 0)
+        ensure_child(block, "relay-shoutcast-metadata", 1)
+    return tree
+
+
+def write_configs(settings, directory, base=ICECAST_XML, mounts=None, local=False):
+    # master.xml plus one edge-<host>-<port>.xml per relay; with local, every
+    # node logs to its own directory so several icecast2 processes can run
+    # side by side on one machine
+    os.makedirs(directory, exist_ok=True)
+    written = []
+
+    def logdir(name):
+        if not local:
+            return None
+        path = os.path.abspath(os.path.join(directory, name + "-log"))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    tree = master_config(settings, base)
+    if local:
+        ensure_child(ensure_child(tree.getroot(), "paths"), "logdir", logdir("master"))
+    path = os.path.join(directory, "master.xml")
+    icecast_config.write(tree, path)
+    written.append(path)
+    for relay in settings.get("relays") or []:
+        name = f"edge-{relay['host']}-{_port(relay['port'])}"
+        path = os.path.join(directory, name + ".xml")
+        icecast_config.write(edge_config(settings, relay, base, mounts, logdir(name)), path)
+        written.append(path)
+    return written
+
+
+class TopologyMonitor:
+    # Polls the master and every edge in parallel through the shared status
+    # cache and derives, per edge: whether it carries the mount, how far its
+    # metadata trails the master (time from a title change on the master to
+    # the same title on the edge, accurate to one check interval), whether it
+    # receives the stream at the master's rate, and its listener load.
+    def __init__(self, cache=status_cache, interval=RELAY_CHECK):
+        self.cache = cache
+        self.interval = interval
+        self.settings = {}
+        self.relays = []
+        self._lock = threading.Lock()
+        self._state = {}
+        self._title_changed = {}
+        self._status = {"nodes": [], "listeners": 0, "capacity": 0, "checked": None}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def configure(self, settings, start=True):
+        with self._lock:
+            self.settings = dict(settings)
+            self.relays = [r for r in settings.get("relays") or [] if r.get("host") and r.get("port")]
+            if not self.relays:
+                # Nothing to watch; the master alone is already on the dashboard
+                self._status = {"nodes": [], "listeners": 0, "capacity": 0, "checked": None}
+        if not self.relays:
+            self.stop()
+            return
+        if start and (self._thread is None or not self._thread.is_alive() or self._stop.is_set()):
+            # A fresh event per thread, so one still finishing a check after
+            # stop() exits instead of being revived alongside the new one
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop,), name="relay-topology", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        with self._lock:
+            return dict(self._status)
+
+    def _run(self, stop):
+        while not stop.is_set():
+            try:
+                with latency.timer("relay_check"):
+                    self.check()
+            except Exception as e:
+                print(f"Relay check error: {e}")
+            stop.wait(self.interval)
+
+    def _capacity(self, node):
+        if node.get("max_listeners"):
+            return int(node["max_listeners"])
+        path = (self.settings.get("icecast_config") or "").strip() or ICECAST_XML
+        try:
+            return icecast_config.read_limits(path)[0].get("clients") or None
+        except (OSError, SyntaxError):
+            return None
+
+    def check(self, now=None):
+        now = time.monotonic() if now is None else now
+        settings = self.settings
+        master = {"name": "master", "host": (settings.get("host") or "localhost").strip(),
+                  "port": _port(settings.get("port")), "role": "master"}
+        nodes = [master] + [dict(r, port=_port(r["port"]), role="edge") for r in self.relays]
+        mount = normalize_mount(settings.get("mountpoint") or "/live")
+        results = icecast_net.fan_out(lambda n: self.cache.get(n["host"], n["port"]), nodes, len(nodes))
+
+        master_record = None
+        _, master_snapshot, master_error = results[0]
+        if master_error is None and master_snapshot.ok:
+            master_record = master_snapshot.mount(mount)
+        if master_record is not None:
+            previous = self._title_changed.get(mount)
+            if previous is None:
+                # When the title was set before we started watching is unknown
+                self._title_changed[mount] = (master_record.title, None)
+            elif previous[0] != master_record.title:
+                self._title_changed[mount] = (master_record.title, now)
+        changed_title, changed_at = self._title_changed.get(mount, (None, None))
+
+        rows = []
+        for node, snapshot, error in results:
+            key = (node["host"], node["port"])
+            state = self._state.setdefault(key, {"bytes": None, "at": None, "rate": None, "lag": None, "title": None})
+            row = {"node": node_label(node), "role": node["role"], "listeners": 0, "capacity": self._capacity(node),
+                   "lag": None, "rate_ratio": None, "state": "ok"}
+            record = None
+            if error is not None:
+                row["state"] = f"unreachable ({type(error).__name__})"
+            elif not snapshot.ok:
+                row["state"] = f"HTTP {snapshot.status_code}"
+            else:
+                record = snapshot.mount(mount)
+                # Listeners across every mount the node serves
+                row["listeners"] = sum(r.listeners for r in snapshot.mounts.values())
+                if record is None:
+                    row["state"] = "not relaying" if node["role"] == "edge" else "no source"
+            if record is not None:
+                current = source_bytes(record)
+                if state["bytes"] is not None and current >= state["bytes"] and now > state["at"]:
+                    state["rate"] = (current - state["bytes"]) / (now - state["at"])
+                state["bytes"], state["at"] = current, now
+                if node["role"] == "edge":
+                    if changed_at is None:
+                        pass
+                    elif record.title == changed_title and state["title"] != changed_title:
+                        state["lag"] = now - changed_at
+                    elif record.title != changed_title and now - changed_at > RELAY_LAG_WARN:
+                        state["lag"] = now - changed_at
+                        row["state"] = "behind"
+                    state["title"] = record.title
+                    row["lag"] = None if state["lag"] is None else round(state["lag"], 1)
+            else:
+                state["bytes"] = state["rate"] = None
+            rows.append((row, state))
+
+        master_rate = rows[0][1]["rate"]
+        for row, state in rows[1:]:
+            if master_rate and state["rate"] is not None:
+                row["rate_ratio"] = round(state["rate"] / master_rate, 2)
+                if row["state"] == "ok" and row["rate_ratio"] < RELAY_RATE_WARN:
+                    row["state"] = "behind"
+        rows = [row for row, _ in rows]
+        # Each relaying edge is itself a client of the master; don't count it
+        # as an audience member there
+        relaying = sum(1 for row in rows[1:] if row["state"] in ("ok", "behind"))
+        rows[0]["listeners"] = max(rows[0]["listeners"] - relaying, 0)
+        total = sum(row["listeners"] for row in rows)
+        capacity = sum(row["capacity"] or 0 for row in rows)
+        for row in rows:
+            row["share"] = round(row["listeners"] * 100 / total, 1) if total else 0.0
+            row["load"] = round(row["listeners"] * 100 / row["capacity"], 1) if row["capacity"] else None
+        status = {"mount": mount, "nodes": rows, "listeners": total, "capacity": capacity, "checked": time.time()}
+        with self._lock:
+            # A check that was running when the relays were removed
+            if self.relays:
+                self._status = status
+        return status
+
+
+topology_monitor = TopologyMonitor()
+
+
+def format_status(status):
+    lines = [f"{'node':<24} {'role':<6} {'listeners':>9} {'share':>6} {'load':>6} {'lag':>6} {'rate':>5}  state"]
+    for row in status["nodes"]:
+        lines.append(f"{row['node']:<24} {row['role']:<6} {row['listeners']:>9} {row['share']:>5}% "
+                     f"{'-' if row['load'] is None else str(row['load']) + '%':>6} "
+                     f"{'-' if row['lag'] is None else str(row['lag']) + 's':>6} "
+                     f"{'-' if row['rate_ratio'] is None else row['rate_ratio']:>5}  {row['state']}")
+    lines.append(f"Total: {status['listeners']} listeners, capacity {status['capacity'] or 'unknown'}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    from config_store import config_store
+    parser = argparse.ArgumentParser(description="Generate and monitor a master/relay Icecast topology")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--relay", action="append", default=[], help="edge HOST:PORT[:MAX_LISTENERS] (repeatable; default: relays from the config)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    configs = sub.add_parser("configs", help="write master.xml and one icecast.xml per edge")
+    configs.add_argument("--output-dir", default="relays")
+    configs.add_argument("--base", default=ICECAST_XML)
+    configs.add_argument("--mount", action="append", default=[], help="relay only these mounts (default: mirror the master)")
+    configs.add_argument("--local", action="store_true", help="separate log directories so every node can run on this machine")
+    status = sub.add_parser("status", help="show listener distribution and relay health")
+    status.add_argument("--watch", type=float, default=0, help="repeat every N seconds")
+    args = parser.parse_args(argv)
+    config_store.set_path(args.config)
+    try:
+        settings = config_store.load()
+    except (FileNotFoundError, ValueError):
+        settings = {}
+    if args.relay:
+        settings["relays"] = parse_relays(",".join(args.relay))
+    if not settings.get("relays"):
+        parser.error("no relays: pass --relay or add \"relays\" to the config")
+    if args.command == "configs":
+        try:
+            written = write_configs(settings, args.output_dir, args.base, args.mount, args.local)
+        except ValueError as e:
+            parser.error(str(e))
+        for path in written:
+            print(f"icecast2 -c {os.path.abspath(path)}" if args.local else f"Wrote {path}")
+        return 0
+    monitor = TopologyMonitor()
+    monitor.configure(settings, start=False)
+    while True:
+        print(format_status(monitor.check()))
+        if not args.watch:
+            return 0
+        time.sleep(args.watch)
+        print()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from butt_process import detect_butt_path
+
+STARTUP_CACHE = "startup_cache.json"
+
+
+class StartupClock:
+    # Phases of one launch, measured from the moment this module is first
+    # imported (the controller imports it before anything heavy). Phases on
+    # the GUI thread follow each other; background ones overlap them, so
+    # each row keeps its start offset and thread.
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._phases = []
+        self._lock = threading.Lock()
+
+    def _record(self, name, start, end):
+        with self._lock:
+            self._phases.append((name, start - self.started, end - start, threading.current_thread().name))
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self._record(name, now, now)
+
+    def has(self, *names):
+        with self._lock:
+            seen = {p[0] for p in self._phases}
+        return all(name in seen for name in names)
+
+    def summary(self):
+        with self._lock:
+            phases = sorted(self._phases, key=lambda p: p[1])
+        return {
+            "total_ms": round(max((p[1] + p[2] for p in phases), default=0.0) * 1000, 1),
+            "phases": [{"name": name, "at_ms": round(at * 1000, 1), "ms": round(took * 1000, 1), "thread": thread}
+                       for name, at, took, thread in phases],
+        }
+
+    def format_report(self):
+        summary = self.summary()
+        lines = [f"{'phase':<28} {'at ms':>8} {'took ms':>8}  thread"]
+        for p in summary["phases"]:
+            lines.append(f"{p['name']:<28} {p['at_ms']:>8} {p['ms'] if p['ms'] else '':>8}  {p['thread']}")
+        lines.append(f"{'total':<28} {summary['total_ms']:>8}")
+        return "\n".join(lines)
+
+
+class _Phase:
+    # with startup_clock.phase("window build"): ...
+    def __init__(self, clock, name):
+        self.clock = clock
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.clock._record(self.name, self.started, time.perf_counter())
+        return False
+
+
+class StartupCache:
+    # Results of discovery kept between runs: the BUTT executable and the
+    # port the settings API last ended up on. Values read from here are
+    # hints for the first paint; they are checked again off the GUI thread.
+    def __init__(self, path=STARTUP_CACHE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path) as f:
+                    data = json.load(f)
+                self._data = data if isinstance(data, dict) else {}
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._load().get(key, default)
+
+    def update(self, **values):
+        with self._lock:
+            data = self._load()
+            if all(data.get(k) == v for k, v in values.items()):
+                return
+            data.update(values)
+            directory = os.path.dirname(os.path.abspath(self.path))
+            try:
+                fd, tmp = tempfile.mkstemp(prefix=".startup-", suffix=".tmp", dir=directory)
+                with os.fdopen(fd, "w") as f:
+                    json.dump(data, f, indent=4)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                # A read-only directory only costs the next launch its head start
+                print(f"Could not write {self.path}: {e}")
+
+    def butt_path(self):
+        # The last discovery if that file is still there; a bare name means
+        # PATH lookup, which BUTT's launch does anyway
+        path = self.get("butt_path")
+        if path and (not os.path.isabs(path) or os.path.exists(path)):
+            return path
+        return None
+
+    def discover_butt_path(self):
+        with startup_clock.phase("butt discovery"):
+            path = detect_butt_path()
+        self.update(butt_path=path)
+        return path
+
+
+startup_clock = StartupClock()
+startup_cache = StartupCache()
@@ -0,0 +1,159 @@
+import os
+import socket
+import ssl
+import time
+import xml.etree.ElementTree as ET
+
+ICECAST_XML = os.path.join(os.path.dirname(os.path.abspath(__file__)), "render", "icecast.xml")
+BURST_SIZE = 65536
+BURST_WINDOW = 0.5
+PROBE_DURATION = 5.0
+# A probe holds an API request thread for its whole duration
+PROBE_MAX_DURATION = 60.0
+
+# Last probe result, read by the API and /metrics
+last_result = {}
+
+
+def read_limits(path=ICECAST_XML):
+    # <limits> of an icecast.xml as ints, e.g. {"clients": 256, "burst-size": 65536}
+    try:
+        limits = ET.parse(path).getroot().find("limits")
+    except (OSError, ET.ParseError):
+        return {}
+    out = {}
+    for child in (limits if limits is not None else []):
+        try:
+            out[child.tag] = int(child.text)
+        except (TypeError, ValueError):
+            continue
+    return out
+
+
+def read_burst_size(path=ICECAST_XML):
+    return read_limits(path).get("burst-size", BURST_SIZE)
+
+
+def probe_stream(host, port, mount, duration=PROBE_DURATION, expected_kbps=None, burst_size=None, timeout=5.0):
+    # Connects to the mount like a listener and times each stage:
+    # TCP connect, first response byte, the initial burst (Icecast sends up
+    # to <burst-size> bytes at once) and the steady bitrate after it.
+    burst_size = read_burst_size() if burst_size is None else burst_size
+    result = {
+        "url": f"http://{host}:{port}{mount}",
+        "time": time.time(),
+        "healthy": False,
+        "status_code": None,
+        "connect_ms": None,
+        "ttfb_ms": None,
+        "burst_bytes": 0,
+        "burst_size": burst_size,
+        "burst_ratio": 0.0,
+        "bytes": 0,
+        "effective_kbps": 0.0,
+        "expected_kbps": expected_kbps,
+        "bitrate_ratio": None,
+        "content_type": "",
+        "error": "",
+    }
+    started = time.perf_counter()
+    try:
+        sock = socket.create_connection((host, port), timeout=timeout)
+    except OSError as e:
+        result["error"] = f"connect failed: {e}"
+        _finish(result)
+        return result
+    result["connect_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    try:
+        if port == 443:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+        sock.settimeout(timeout)
+        request_started = time.perf_counter()
+        sock.sendall(
+            f"GET {mount} HTTP/1.0\r\nHost: {host}\r\nUser-Agent: IcecastButtController-probe\r\n"
+            "Icy-MetaData: 0\r\nAccept: */*\r\n\r\n".encode("ascii")
+        )
+        data = sock.recv(16384)
+        if not data:
+            result["error"] = "connection closed before response"
+            return _finish(result)
+        result["ttfb_ms"] = round((time.perf_counter() - request_started) * 1000, 1)
+        while b"\r\n\r\n" not in data and len(data) < 65536:
+            chunk = sock.recv(16384)
+            if not chunk:
+                break
+            data += chunk
+        head, _, body = data.partition(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            result["status_code"] = int(lines[0].split()[1])
+        except (IndexError, ValueError):
+            result["error"] = f"bad response: {lines[0][:80]}"
+            return _finish(result)
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-type":
+                result["content_type"] = value.strip()
+        if result["status_code"] != 200:
+            result["error"] = f"HTTP {result['status_code']}"
+            return _finish(result)
+
+        body_started = time.perf_counter()
+        burst_bytes = len(body)
+        steady_bytes = 0
+        deadline = body_started + duration
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            sock.settimeout(max(min(deadline - now, timeout), 0.05))
+            try:
+                chunk = sock.recv(65536)
+            except socket.timeout:
+                break
+            if not chunk:
+                break
+            if time.perf_counter() - body_started <= BURST_WINDOW:
+                burst_bytes += len(chunk)
+            else:
+                steady_bytes += len(chunk)
+        elapsed = time.perf_counter() - body_started
+        result["burst_bytes"] = burst_bytes
+        result["burst_ratio"] = round(burst_bytes / burst_size, 2) if burst_size else None
+        result["bytes"] = burst_bytes + steady_bytes
+        if elapsed > BURST_WINDOW:
+            result["effective_kbps"] = round(steady_bytes * 8 / 1000 / (elapsed - BURST_WINDOW), 1)
+        if expected_kbps:
+            result["bitrate_ratio"] = round(result["effective_kbps"] / expected_kbps, 2)
+    except (OSError, ssl.SSLError) as e:
+        result["error"] = str(e)
+    finally:
+        sock.close()
+    return _finish(result)
+
+
+def _finish(result):
+    ok = result["status_code"] == 200 and result["bytes"] > 0
+    if ok and result["bitrate_ratio"] is not None:
+        ok = result["bitrate_ratio"] >= 0.8
+    result["healthy"] = ok
+    if not ok and not result["error"]:
+        if not result["bytes"]:
+            result["error"] = "no audio received"
+        else:
+            result["error"] = f"bitrate {result['effective_kbps']} kbps below {result['expected_kbps']} kbps"
+    last_result.clear()
+    last_result.update(result)
+    return result
+
+
+def summarize(result):
+    if result.get("error") and result.get("status_code") != 200:
+        return f"Unhealthy: {result['error']}"
+    return (
+        f"{'Healthy' if result['healthy'] else 'Unhealthy'}: connect {result['connect_ms']} ms, "
+        f"TTFB {result['ttfb_ms']} ms, burst {result['burst_bytes']} B "
+        f"({result['burst_ratio']} of {result['burst_size']}), {result['effective_kbps']} kbps"
+        + (f" of {result['expected_kbps']} expected" if result["expected_kbps"] else "")
+        + (f" - {result['error']}" if result["error"] else "")
+    )